@@ -12,5 +12,12 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'hotel_site.settings')
+# Serve main/async_views.py; set ASYNC_VIEWS=false to run the sync views under ASGI
+os.environ.setdefault('ASYNC_VIEWS', 'true')
 
 application = get_asgi_application()
+
+# Runs once per worker process: compile the templates before the first request
+from main.warmup import warm_up  # noqa: E402
+
+warm_up()
@@ -11,6 +11,8 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 # -----------------------
 SECRET_KEY = os.environ.get('SECRET_KEY', 'dev-secret-key')
 DEBUG = os.environ.get('DEBUG', 'False').lower() == 'true'
+# Route pages to main/async_views.py; hotel_site/asgi.py turns this on
+ASYNC_VIEWS = os.environ.get('ASYNC_VIEWS', 'False').lower() == 'true'
 
 ALLOWED_HOSTS = os.environ.get('ALLOWED_HOSTS', '').split(',')
 if not ALLOWED_HOSTS or ALLOWED_HOSTS == ['']:
@@ -37,24 +39,35 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'main.middleware.ServerTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'main.middleware.AsyncWhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'main.middleware.ProfilerMiddleware',
 ]
 
 ROOT_URLCONF = 'hotel_site.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates plus render timing for the Server-Timing header
+        'BACKEND': 'main.timing.TimedDjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
-        'APP_DIRS': True,
         'OPTIONS': {
+            # Compiled templates are kept per process even under DEBUG (the
+            # autoreloader clears them when a template changes); every worker
+            # compiles them all at startup, see main/warmup.py
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -70,13 +83,95 @@ WSGI_APPLICATION = 'hotel_site.wsgi.application'
 # -----------------------
 # Database
 # -----------------------
+# Every gunicorn worker writes to the same file. The tuned profile runs the
+# database in WAL mode, so readers never wait for the writer, and makes
+# writers queue on a busy timeout instead of failing with "database is
+# locked". transaction_mode IMMEDIATE takes the write lock when an atomic
+# block starts, as lock upgrades halfway through can't wait on the timeout.
+# SQLITE_PROFILE=default is Django's stock setup (manage.py bench_sqlite).
+SQLITE_PRAGMAS = [
+    'PRAGMA journal_mode = WAL',
+    # Durable at each checkpoint rather than each commit; safe with WAL
+    'PRAGMA synchronous = NORMAL',
+    'PRAGMA mmap_size = 268435456',
+    'PRAGMA temp_store = MEMORY',
+    'PRAGMA cache_size = -16000',
+]
+SQLITE_PROFILES = {
+    'default': {'CONN_MAX_AGE': 0, 'OPTIONS': {}},
+    'tuned': {
+        # Persistent connections don't outlive a request's thread under ASGI
+        'CONN_MAX_AGE': 0 if ASYNC_VIEWS else 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            # Busy timeout, seconds
+            'timeout': 20,
+            'transaction_mode': 'IMMEDIATE',
+            'init_command': '; '.join(SQLITE_PRAGMAS),
+        },
+    },
+}
+SQLITE_PROFILE = os.environ.get('SQLITE_PROFILE', 'tuned')
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'NAME': os.environ.get('SQLITE_PATH', BASE_DIR / 'db.sqlite3'),
+        **SQLITE_PROFILES[SQLITE_PROFILE],
     }
 }
 
+# -----------------------
+# Cache
+# -----------------------
+# File-based so every gunicorn worker on the host sees the same entries
+# (and the same invalidations from admin edits).
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('CACHE_DIR', str(BASE_DIR / '.cache')),
+        'OPTIONS': {'MAX_ENTRIES': 2000},
+    },
+    # Contact form token buckets (main/ratelimit.py): a file cache that
+    # sweeps expired buckets now and then instead of listing its directory
+    # on every write. Every accepted POST rewrites two of its files, so it
+    # goes on tmpfs where there is one; losing the buckets on a reboot
+    # only forgives a few clients
+    'ratelimit': {
+        'BACKEND': 'main.ratelimit.BucketCache',
+        'LOCATION': os.environ.get('RATELIMIT_CACHE_DIR') or (
+            '/dev/shm/hotel-ratelimit' if os.path.isdir('/dev/shm')
+            else os.path.join(os.environ.get('CACHE_DIR', str(BASE_DIR / '.cache')), 'ratelimit')
+        ),
+    },
+}
+
+# Contact form POSTs: token buckets of `burst` refilled at `per_minute`, per
+# client and site-wide; a burst of 0 turns that limit off
+CONTACT_RATE_LIMITS = {
+    'ip': {
+        'burst': int(os.environ.get('CONTACT_RATE_IP_BURST', 5)),
+        'per_minute': float(os.environ.get('CONTACT_RATE_IP_PER_MINUTE', 2)),
+    },
+    'global': {
+        'burst': int(os.environ.get('CONTACT_RATE_GLOBAL_BURST', 60)),
+        'per_minute': float(os.environ.get('CONTACT_RATE_GLOBAL_PER_MINUTE', 30)),
+    },
+}
+# Proxies in front of Django that append to X-Forwarded-For (Render's: 1)
+RATELIMIT_PROXY_HOPS = int(os.environ.get('RATELIMIT_PROXY_HOPS', 0 if DEBUG else 1))
+
+# Contact messages from whole months older than this many days move to
+# gzipped monthly archives (main/retention.py, manage.py archive_messages);
+# 0 keeps every message in the database
+CONTACT_RETENTION_DAYS = int(os.environ.get('CONTACT_RETENTION_DAYS', 365))
+CONTACT_ARCHIVE_ROOT = Path(os.environ.get('CONTACT_ARCHIVE_ROOT', BASE_DIR / 'archive' / 'messages'))
+
+# Images resized on request (main/resize.py, /media/r/<spec>/<path>), kept on
+# disk up to this size with the least recently served evicted first
+RESIZE_CACHE_ROOT = Path(os.environ.get('RESIZE_CACHE_ROOT', Path(os.environ.get('CACHE_DIR', BASE_DIR / '.cache')) / 'resized'))
+RESIZE_CACHE_MAX_BYTES = int(os.environ.get('RESIZE_CACHE_MAX_MB', 256)) * 2**20
+
 # -----------------------
 # Password Validation
 # -----------------------
@@ -100,21 +195,34 @@ USE_TZ = True
 # -----------------------
 STATIC_URL = '/static/'
 STATICFILES_DIRS = [BASE_DIR / 'static']
-STATIC_ROOT = BASE_DIR / 'staticfiles'
+STATIC_ROOT = Path(os.environ.get('STATIC_ROOT', BASE_DIR / 'staticfiles'))
+
+# Publish mode (main/publish.py): home, rooms, about and events baked to
+# static HTML and served without running their views
+PUBLISH_PAGES = os.environ.get('PUBLISH_PAGES', 'False').lower() == 'true'
+PUBLISH_ROOT = Path(os.environ.get('PUBLISH_ROOT', BASE_DIR / 'published'))
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
-if not DEBUG:
-    STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    # Hashed, compressed files plus the per-page bundles from main/bundles.py
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage' if DEBUG
+        else 'main.storage.BundledStaticFilesStorage',
+    },
+}
 
 # -----------------------
 # Email Configuration
 # -----------------------
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
-EMAIL_HOST = 'smtp.gmail.com'
-EMAIL_PORT = 587
-EMAIL_USE_TLS = True
+# Overridable so the outbox can be pointed at a local SMTP stand-in (aiosmtpd)
+EMAIL_HOST = os.environ.get('EMAIL_HOST', 'smtp.gmail.com')
+EMAIL_PORT = int(os.environ.get('EMAIL_PORT', 587))
+EMAIL_USE_TLS = os.environ.get('EMAIL_USE_TLS', 'True').lower() == 'true'
+EMAIL_TIMEOUT = 20
 EMAIL_HOST_USER = os.environ.get('EMAIL_HOST_USER')
 EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_HOST_PASSWORD')
 DEFAULT_FROM_EMAIL = EMAIL_HOST_USER
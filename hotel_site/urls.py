@@ -2,7 +2,11 @@ from django.contrib import admin
 from django.urls import path
 from django.conf import settings
 from django.conf.urls.static import static
-from main import views  # Import from main app only
+from main import async_views, views  # Import from main app only
+
+# Same routes, same names; the async views are for the ASGI stack
+if settings.ASYNC_VIEWS:
+    views = async_views
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -10,8 +14,13 @@ urlpatterns = [
     path('rooms/', views.rooms, name='rooms'),
     path('about/', views.about, name='about'),
     path('events/', views.events, name='events'),
+    path('events.ics', views.events_ics, name='events_ics'),
+    path('menu.json', views.menu_json, name='menu_json'),
+    path('media/r/<str:spec>/<path:path>', views.resized_image, name='resized_image'),
     path('contact/', views.contact, name='contact'),
     path('reservation/', views.reservation, name='reservation'),
+    path('search/', views.search, name='search'),
+    path('search/suggest/', views.search_suggest, name='search_suggest'),
     
 ]
 
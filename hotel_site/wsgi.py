@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'hotel_site.settings')
 
 application = get_wsgi_application()
+
+# Runs once per worker process: compile the templates before the first request
+from main.warmup import warm_up  # noqa: E402
+
+warm_up()
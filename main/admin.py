@@ -1,15 +1,89 @@
 # main/admin.py - Update the imports at the top
-from django.contrib import admin
+from django.conf import settings
+from django.contrib import admin, messages
+from django.contrib.admin import helpers
+from django.core.exceptions import ValidationError
+from django.http import Http404, HttpResponse, HttpResponseRedirect
+from django.shortcuts import get_object_or_404
+from django.template.response import TemplateResponse
+from django.urls import path, reverse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.html import format_html
 from .models import (
     AboutHeaderImage, EventsHeaderImage, AboutDescription, Leadership, Photo, History,
     RoomGallery, RoomType, SpecialOffer, Testimonial, HeaderImage, Event, RestaurantMenuItem,
-    ContactInfo, ContactMessage,RoomHeaderImage,HomePageDescription,ContactHeaderImage # Add these
+    ContactInfo, ContactMessage,RoomHeaderImage,HomePageDescription,ContactHeaderImage, # Add these
+    Reservation, RequestProfile,
 )
+from . import inbox, inventory, retention, search, transfer
+from .forms import ImportForm
+
+
+class SearchIndexAdmin(admin.ModelAdmin):
+    """Admin search through the FTS5 index (main/search.py) instead of LIKE scans."""
+    search_kind = None
+
+    def get_search_results(self, request, queryset, search_term):
+        if search_term and search.available():
+            matched = search.filter_queryset(queryset, self.search_kind, search_term)
+            if matched is not None:
+                return matched, False
+        return super().get_search_results(request, queryset, search_term)
+
+
+# Streamed downloads of the selected rows (main/transfer.py); with "select
+# all" that is every row matching the changelist's filters
+
+@admin.action(description='Export selected as CSV')
+def export_csv(modeladmin, request, queryset):
+    return transfer.export_response(queryset, 'csv')
+
+
+@admin.action(description='Export selected as JSON Lines')
+def export_jsonl(modeladmin, request, queryset):
+    return transfer.export_response(queryset, 'jsonl')
+
+
+class ImportAdmin(admin.ModelAdmin):
+    """An Import page next to Add, for CSV or JSON Lines files (main/transfer.py)."""
+    change_list_template = 'admin/main/change_list_import.html'
+
+    def get_urls(self):
+        opts = self.model._meta
+        return [
+            path('import/', self.admin_site.admin_view(self.import_view), name=f'{opts.app_label}_{opts.model_name}_import'),
+        ] + super().get_urls()
+
+    def import_view(self, request):
+        if not (self.has_add_permission(request) and self.has_change_permission(request)):
+            return HttpResponse(status=403)
+        opts = self.model._meta
+        form = ImportForm(request.POST or None, request.FILES or None)
+        if form.is_valid():
+            upload = form.cleaned_data['file']
+            try:
+                result = transfer.import_rows(self.model, transfer.read_rows(upload, form.cleaned_data['format']))
+            except ValidationError as e:
+                self.message_user(request, f"{' '.join(e.messages)} Rows before it were imported.", messages.ERROR)
+            else:
+                self.message_user(request, f'Created {result.created} and updated {result.updated} {opts.verbose_name_plural}.')
+                if result.ignored:
+                    self.message_user(request, f"Ignored columns: {', '.join(result.ignored)}.", messages.WARNING)
+                return HttpResponseRedirect(reverse(f'admin:{opts.app_label}_{opts.model_name}_changelist'))
+        return TemplateResponse(request, 'admin/main/import_rows.html', {
+            **self.admin_site.each_context(request),
+            'opts': opts,
+            'title': f'Import {opts.verbose_name_plural}',
+            'form': form,
+            'columns': transfer.IMPORT_COLUMNS[self.model.__name__],
+        })
+
 
 @admin.register(AboutHeaderImage)
 class AboutHeaderImageAdmin(admin.ModelAdmin):
-    list_display = ['title', 'is_active', 'created_at']
-    list_editable = ['is_active']
+    list_display = ['title', 'is_active', 'weight', 'created_at']
+    list_editable = ['is_active', 'weight']
     list_filter = ['is_active']
     search_fields = ['title', 'subtitle']
     
@@ -29,14 +103,42 @@ class RoomGalleryAdmin(admin.ModelAdmin):
     list_editable = ['is_active']
 
 @admin.register(RoomType)
-class RoomTypeAdmin(admin.ModelAdmin):
-    list_display = ['name', 'category', 'price_per_night', 'is_available']
+class RoomTypeAdmin(SearchIndexAdmin):
+    list_display = ['name', 'category', 'price_per_night', 'unit_count', 'is_available']
     list_filter = ['category', 'is_available']
     search_fields = ['name', 'description']
+    search_kind = 'room'
+
+@admin.register(Reservation)
+class ReservationAdmin(admin.ModelAdmin):
+    list_display = ['name', 'room_type', 'check_in', 'check_out', 'units', 'status', 'created_at']
+    list_filter = ['status', 'room_type']
+    search_fields = ['name', 'email', 'phone']
+    date_hierarchy = 'check_in'
+    # Dates and rooms are allocated in RoomOccupancy; change them only through
+    # main.inventory (cancel and re-book) so the two stay in sync
+    readonly_fields = ['room_type', 'check_in', 'check_out', 'units', 'status', 'created_at']
+    actions = ['cancel_reservations']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        # A deleted booking would keep its nights taken in RoomOccupancy;
+        # the "Cancel selected reservations" action releases them
+        return False
+
+    @admin.action(description='Cancel selected reservations')
+    def cancel_reservations(self, request, queryset):
+        cancelled = 0
+        for reservation in queryset.filter(status='confirmed').select_related('room_type'):
+            inventory.cancel(reservation)
+            cancelled += 1
+        self.message_user(request, f'{cancelled} reservations cancelled.')
 
 @admin.register(SpecialOffer)
 class SpecialOfferAdmin(admin.ModelAdmin):
-    list_display = ['title', 'room_type', 'discounted_price', 'is_active', 'valid_until']
+    list_display = ['title', 'room_type', 'discounted_price', 'is_active', 'valid_from', 'valid_until']
     list_filter = ['is_active', 'valid_until']
     search_fields = ['title', 'description']
 
@@ -49,18 +151,20 @@ class TestimonialAdmin(admin.ModelAdmin):
 # NEW ADMIN CLASSES
 @admin.register(HeaderImage)
 class HeaderImageAdmin(admin.ModelAdmin):
-    list_display = ['title', 'is_active', 'created_at']
+    list_display = ['title', 'is_active', 'weight', 'created_at']
     list_filter = ['is_active']
-    list_editable = ['is_active']
+    list_editable = ['is_active', 'weight']
     search_fields = ['title', 'subtitle']
 
 @admin.register(Event)
-class EventAdmin(admin.ModelAdmin):
+class EventAdmin(ImportAdmin, SearchIndexAdmin):
     list_display = ['title', 'event_date', 'is_active', 'created_at']
     list_editable = ['is_active']
     list_filter = ['is_active', 'event_date']
     search_fields = ['title', 'description']
+    search_kind = 'event'
     date_hierarchy = 'event_date'
+    actions = [export_csv, export_jsonl]
     
     fieldsets = (
         ('Event Information', {
@@ -72,10 +176,12 @@ class EventAdmin(admin.ModelAdmin):
     )
 
 @admin.register(RestaurantMenuItem)
-class RestaurantMenuItemAdmin(admin.ModelAdmin):
+class RestaurantMenuItemAdmin(ImportAdmin, SearchIndexAdmin):
     list_display = ['name', 'category', 'price', 'is_available']
     list_filter = ['category', 'is_available']
     search_fields = ['name', 'description']
+    search_kind = 'menu'
+    actions = [export_csv, export_jsonl]
 
 
 
@@ -114,11 +220,12 @@ class LeadershipAdmin(admin.ModelAdmin):
     )
 
 @admin.register(Photo)
-class PhotoAdmin(admin.ModelAdmin):
+class PhotoAdmin(SearchIndexAdmin):
     list_display = ['title', 'order', 'is_active', 'created_at']
     list_editable = ['order', 'is_active']
     list_filter = ['is_active']
     search_fields = ['title', 'caption']
+    search_kind = 'photo'
     fieldsets = (
         ('Photo Info', {
             'fields': ('title', 'image', 'caption')
@@ -129,11 +236,12 @@ class PhotoAdmin(admin.ModelAdmin):
     )
 
 @admin.register(History)
-class HistoryAdmin(admin.ModelAdmin):
+class HistoryAdmin(SearchIndexAdmin):
     list_display = ['year', 'title', 'order', 'is_active']
     list_editable = ['order', 'is_active']
     list_filter = ['is_active']
     search_fields = ['year', 'title']
+    search_kind = 'history'
     fieldsets = (
         ('History Event', {
             'fields': ('year', 'title', 'description')
@@ -146,8 +254,8 @@ class HistoryAdmin(admin.ModelAdmin):
 
 @admin.register(EventsHeaderImage)
 class EventsHeaderImageAdmin(admin.ModelAdmin):
-    list_display = ['title', 'is_active', 'created_at']
-    list_editable = ['is_active']
+    list_display = ['title', 'is_active', 'weight', 'created_at']
+    list_editable = ['is_active', 'weight']
     list_filter = ['is_active']
     search_fields = ['title', 'subtitle']
     
@@ -176,13 +284,154 @@ class ContactInfoAdmin(admin.ModelAdmin):
             return False
         return True
 
+# Django renders a filter on a boolean as a bare "is_read" / "NOT is_read",
+# which SQLite can't seek an index on; a one-value IN is an equality to it.
+# Both inbox filters lead the inbox indexes (main/inbox.py) that way.
+
+class InboxFilter(admin.SimpleListFilter):
+    """The inbox (default) or the archive."""
+    title = 'box'
+    parameter_name = 'box'
+
+    def lookups(self, request, model_admin):
+        return [('archived', 'Archived')]
+
+    def choices(self, changelist):
+        yield {
+            'selected': self.value() is None,
+            'query_string': changelist.get_query_string(remove=[self.parameter_name]),
+            'display': 'Inbox',
+        }
+        yield from list(super().choices(changelist))[1:]
+
+    def queryset(self, request, queryset):
+        return queryset.filter(is_archived__in=[self.value() == 'archived'])
+
+
+class ReadFilter(admin.SimpleListFilter):
+    title = 'read'
+    parameter_name = 'read'
+
+    def lookups(self, request, model_admin):
+        return [('no', 'Unread'), ('yes', 'Read')]
+
+    def queryset(self, request, queryset):
+        if self.value() in ('no', 'yes'):
+            return queryset.filter(is_read__in=[self.value() == 'yes'])
+        return queryset
+
+
 @admin.register(ContactMessage)
-class ContactMessageAdmin(admin.ModelAdmin):
-    list_display = ['name', 'email', 'phone', 'is_read', 'created_at']
-    list_filter = ['is_read', 'created_at']
+class ContactMessageAdmin(SearchIndexAdmin):
+    """Keyset-paged inbox with estimated counts (main/inbox.py)."""
+    list_display = ['name', 'email', 'phone', 'is_read', 'notification_status', 'notification_attempts', 'created_at']
+    list_filter = [InboxFilter, ReadFilter, 'notification_status']
     search_fields = ['name', 'email', 'message']
-    list_editable = ['is_read']
-    readonly_fields = ['name', 'email', 'phone', 'message', 'created_at']
+    search_kind = 'message'
+    # No list_editable: its per-row forms were most of the render time; the
+    # read/unread actions below replace it
+    list_per_page = inbox.PAGE_SIZE
+    ordering = inbox.ORDERING
+    # Any other order would need its own index to page through
+    sortable_by = ()
+    show_full_result_count = False
+    show_facets = admin.ShowFacets.NEVER
+    readonly_fields = [
+        'name', 'email', 'phone', 'message', 'created_at',
+        'notification_status', 'notification_attempts', 'notification_next_attempt',
+        'notification_sent_at', 'notification_error',
+    ]
+    actions = ['mark_read', 'mark_unread', 'archive', 'unarchive', 'retry_notifications', export_csv, export_jsonl]
+
+    def get_changelist(self, request, **kwargs):
+        return inbox.InboxChangeList
+
+    def get_urls(self):
+        return [
+            path('months/', self.admin_site.admin_view(self.archive_months), name='main_contactmessage_months'),
+            path(
+                'months/<str:month>/', self.admin_site.admin_view(self.archive_month),
+                name='main_contactmessage_month',
+            ),
+        ] + super().get_urls()
+
+    # Months moved out of the database by main/retention.py, read from disk
+
+    def archive_months(self, request):
+        if not self.has_view_permission(request):
+            return HttpResponse(status=403)
+        months = {}
+        for archive in retention.archive_files():
+            months.setdefault(archive.month, []).append(archive)
+        return TemplateResponse(request, 'admin/main/contactmessage/archive_months.html', {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': 'Archived months',
+            'months': [(month, sum(archive.size for archive in files)) for month, files in sorted(months.items(), reverse=True)],
+            'retention_days': settings.CONTACT_RETENTION_DAYS,
+        })
+
+    def archive_month(self, request, month):
+        if not self.has_view_permission(request):
+            return HttpResponse(status=403)
+        if not retention.archive_files(month):
+            raise Http404('No archive for that month.')
+        try:
+            page = max(int(request.GET.get('page', 1)), 1)
+        except ValueError:
+            page = 1
+        search = request.GET.get('q', '').strip()
+        rows, has_next = retention.month_page(month, page, search=search)
+        for row in rows:
+            row['created_at'] = parse_datetime(row['created_at'])
+        return TemplateResponse(request, 'admin/main/contactmessage/archive_month.html', {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': f'Messages from {month}',
+            'month': month,
+            'rows': rows,
+            'page': page,
+            'has_next': has_next,
+            'search': search,
+        })
+
+    def action_checkbox(self, obj):
+        # The stock one renders a widget template per row
+        return format_html(
+            '<input type="checkbox" name="{}" value="{}" class="action-select" '
+            'aria-label="Select this object for an action - {}">',
+            helpers.ACTION_CHECKBOX_NAME, obj.pk, obj,
+        )
+
+    # Each action is one UPDATE, also across every page with "select all"
+
+    @admin.action(description='Mark as read')
+    def mark_read(self, request, queryset):
+        updated = queryset.filter(is_read=False).update(is_read=True)
+        self.message_user(request, f'{updated} messages marked as read.')
+
+    @admin.action(description='Mark as unread')
+    def mark_unread(self, request, queryset):
+        updated = queryset.filter(is_read=True).update(is_read=False)
+        self.message_user(request, f'{updated} messages marked as unread.')
+
+    @admin.action(description='Archive')
+    def archive(self, request, queryset):
+        updated = queryset.filter(is_archived=False).update(is_archived=True)
+        self.message_user(request, f'{updated} messages archived.')
+
+    @admin.action(description='Move back to the inbox')
+    def unarchive(self, request, queryset):
+        updated = queryset.filter(is_archived=True).update(is_archived=False)
+        self.message_user(request, f'{updated} messages moved back to the inbox.')
+
+    @admin.action(description='Retry admin email notification')
+    def retry_notifications(self, request, queryset):
+        updated = queryset.exclude(notification_status='sent').update(
+            notification_status='pending', notification_attempts=0,
+            notification_next_attempt=timezone.now(), notification_error='',
+        )
+        self.message_user(request, f'{updated} notifications queued for another attempt.')
 
 
 
@@ -192,9 +441,9 @@ class ContactMessageAdmin(admin.ModelAdmin):
 
 @admin.register(RoomHeaderImage)
 class RoomHeaderImageAdmin(admin.ModelAdmin):
-    list_display = ['title', 'is_active', 'created_at']
+    list_display = ['title', 'is_active', 'weight', 'created_at']
     list_filter = ['is_active']
-    list_editable = ['is_active']
+    list_editable = ['is_active', 'weight']
     search_fields = ['title', 'subtitle']
     
     def has_add_permission(self, request):
@@ -252,9 +501,45 @@ class HomePageDescriptionAdmin(admin.ModelAdmin):
 # Add this to your existing admin.py
 @admin.register(ContactHeaderImage)
 class ContactHeaderImageAdmin(admin.ModelAdmin):
-    list_display = ['title', 'is_active', 'created_at']
+    list_display = ['title', 'is_active', 'weight', 'created_at']
     list_filter = ['is_active']
-    list_editable = ['is_active']
+    list_editable = ['is_active', 'weight']
     search_fields = ['title', 'subtitle']
 
 
+@admin.register(RequestProfile)
+class RequestProfileAdmin(admin.ModelAdmin):
+    """Profiles captured with ?_profile=1 or an X-Profile header (main/middleware.py)."""
+    list_display = ['path', 'method', 'status_code', 'duration_ms', 'query_count', 'engine', 'user', 'created_at', 'download_link']
+    list_filter = ['engine', 'method']
+    search_fields = ['path']
+    exclude = ['data']
+    readonly_fields = [
+        'method', 'path', 'status_code', 'duration_ms', 'query_count', 'engine', 'user', 'created_at',
+        'download_link', 'summary',
+    ]
+
+    def has_add_permission(self, request):
+        return False
+
+    def get_queryset(self, request):
+        # The changelist doesn't need the profile blobs
+        return super().get_queryset(request).defer('data', 'summary').select_related('user')
+
+    def get_urls(self):
+        return [
+            path('<int:pk>/download/', self.admin_site.admin_view(self.download), name='main_requestprofile_download'),
+        ] + super().get_urls()
+
+    @admin.display(description='Profile')
+    def download_link(self, obj):
+        return format_html('<a href="{}">Download</a>', reverse('admin:main_requestprofile_download', args=[obj.pk]))
+
+    def download(self, request, pk):
+        profile = get_object_or_404(RequestProfile, pk=pk)
+        if not self.has_view_permission(request, profile):
+            return HttpResponse(status=403)
+        content_type = 'text/html' if profile.engine == 'pyinstrument' else 'application/octet-stream'
+        response = HttpResponse(bytes(profile.data), content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="{profile.filename}"'
+        return response
@@ -0,0 +1,348 @@
+# main/async_views.py
+"""
+Async versions of the views in main/views.py, used when settings.ASYNC_VIEWS
+is on (the default under hotel_site/asgi.py).
+
+Each view starts its independent ORM reads together with asyncio.gather()
+and only renders once they are all evaluated. Templates are rendered in a
+worker thread, since the context processors (messages, user) may still hit
+the session table. The booking and search helpers are sync code and run
+through sync_to_async as well.
+
+With SQLite every query of one request still runs on that request's single
+database thread, so the reads of one page queue up there; what the async
+stack buys is that a slow request (a big archive page, a contact POST
+waiting on the mail server) no longer holds a whole worker while it waits.
+"""
+import asyncio
+import logging
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.contrib import messages
+from django.core.exceptions import ValidationError
+from django.db import OperationalError
+from django.db.models import Q
+from django.http import HttpResponse, JsonResponse
+from django.shortcuts import redirect, render
+from django.utils import timezone
+from django.views.decorators.http import require_safe
+
+from . import banners, event_archive, inventory, menu as site_menu, outbox, resize, search as site_search
+from .forms import AvailabilityForm, ContactForm, ReservationForm
+from .fragments import arender_fragments
+from .ratelimit import rate_limited_posts
+from .versions import conditional_page
+from .models import (
+    AboutDescription, ContactInfo, Event, History, HomePageDescription, Leadership, Photo,
+    RoomGallery, RoomType, SpecialOffer, Testimonial,
+)
+
+logger = logging.getLogger(__name__)
+
+arender = sync_to_async(render)
+
+# The background outbox drain of this process, and whether messages were
+# saved after it claimed its batch
+_drain = None
+_drain_again = False
+
+
+async def alist(queryset):
+    return [obj async for obj in queryset]
+
+
+def shared(coroutine_function):
+    """Run ``coroutine_function`` once, on the first await, for every caller."""
+    task = None
+
+    async def get():
+        nonlocal task
+        if task is None:
+            task = asyncio.ensure_future(coroutine_function())
+        return await task
+    return get
+
+
+async def aget_home_content():
+    return await HomePageDescription.objects.afirst() or await HomePageDescription.objects.acreate()
+
+
+@conditional_page('home')
+async def home(request):
+    # Only queried if one of the sections below misses
+    home_content = shared(aget_home_content)
+
+    async def meta():
+        return {'home_content': await home_content()}
+
+    async def photos():
+        return {
+            'home_content': await home_content(),
+            'room_gallery': await alist(RoomGallery.objects.filter(is_active=True)[:7]),
+        }
+
+    async def menu():
+        content, current = await asyncio.gather(home_content(), site_menu.aget_menu())
+        return {'home_content': content, 'menu': current.categories}
+
+    async def testimonials():
+        return {
+            'home_content': await home_content(),
+            'testimonials': await alist(Testimonial.objects.filter(is_featured=True)[:3]),
+        }
+
+    async def events():
+        return {
+            'home_content': await home_content(),
+            'events': await alist(Event.objects.filter(is_active=True)[:3]),
+        }
+
+    # Same sections and cache keys as views.home()
+    sections, hits, misses = await arender_fragments('home', {
+        'meta': ('main/sections/home/meta.html', meta),
+        'welcome': ('main/sections/home/welcome.html', meta),
+        'photos': ('main/sections/home/photos.html', photos),
+        'menu': ('main/sections/home/menu.html', menu),
+        'testimonials': ('main/sections/home/testimonials.html', testimonials),
+        'events': ('main/sections/home/events.html', events),
+    })
+
+    today = timezone.localdate()
+    context = {
+        'sections': sections,
+        'header_image': await banners.ahero('home'),
+        'today': today.isoformat(),
+        'tomorrow': (today + timedelta(days=1)).isoformat(),
+    }
+    response = await arender(request, 'main/index.html', context)
+    response['X-Fragment-Cache'] = f'hits={hits}, misses={misses}'
+    return response
+
+
+@conditional_page('rooms')
+async def rooms(request):
+    today = timezone.localdate()
+    try:
+        room_header, all_rooms, special_offers, room_gallery = await asyncio.gather(
+            banners.ahero('rooms'),
+            alist(RoomType.objects.filter(is_available=True)),
+            alist(SpecialOffer.objects.filter(is_active=True, valid_until__gte=today).filter(
+                Q(valid_from__isnull=True) | Q(valid_from__lte=today)
+            )),
+            alist(RoomGallery.objects.filter(is_active=True)),
+        )
+    except OperationalError:
+        room_header, all_rooms, special_offers, room_gallery = None, [], [], []
+
+    context = {
+        'room_header': room_header,
+        'rooms': all_rooms,
+        'special_offers': special_offers,
+        'room_gallery': room_gallery,
+    }
+    return await arender(request, 'main/rooms.html', context)
+
+
+async def blog_detail(request, slug):
+    return await arender(request, 'main/blog_detail.html', {'slug': slug})
+
+
+async def aget_about_description():
+    return await AboutDescription.objects.afirst() or await AboutDescription.objects.acreate(
+        title='Welcome to Cinnamon Chalet',
+        description='Experience luxury and comfort at Cinnamon Chalet, where we blend modern amenities with traditional hospitality to create unforgettable stays for our guests.'
+    )
+
+
+@conditional_page('about')
+async def about(request):
+    try:
+        about_header, about_description, leadership, photos, history = await asyncio.gather(
+            banners.ahero('about'),
+            aget_about_description(),
+            alist(Leadership.objects.filter(is_active=True).order_by('order')),
+            alist(Photo.objects.filter(is_active=True).order_by('order')),
+            alist(History.objects.filter(is_active=True).order_by('order')),
+        )
+    except Exception as e:
+        # Fallback if there's any error
+        logger.warning('Error in about view: %s', e)
+        about_header = None
+        about_description = {
+            'title': 'Welcome to Cinnamon Chalet',
+            'description': 'Experience luxury and comfort at Cinnamon Chalet, where we blend modern amenities with traditional hospitality to create unforgettable stays for our guests.'
+        }
+        leadership, photos, history = [], [], []
+
+    context = {
+        'about_header': about_header,
+        'about_description': about_description,
+        'leadership': leadership,
+        'photos': photos,
+        'history': history,
+    }
+    return await arender(request, 'main/about.html', context)
+
+
+@conditional_page('events')
+async def events(request):
+    stream = request.GET.get('stream')
+    if stream not in event_archive.STREAMS:
+        stream = 'upcoming'
+    month = event_archive.parse_month(request.GET.get('month'))
+    after, before = request.GET.get('after'), request.GET.get('before')
+
+    if month:
+        page = sync_to_async(event_archive.month_page)(month, after, before)
+    else:
+        page = sync_to_async(event_archive.stream_page)(stream, after, before)
+    try:
+        events_header, events_page, archive_months = await asyncio.gather(
+            banners.ahero('events'),
+            page,
+            alist(event_archive.archive_months()),
+        )
+    except OperationalError:
+        events_header, events_page, archive_months = None, event_archive.KeysetPage([]), []
+
+    context = {
+        'events_header': events_header,
+        'events': events_page,
+        'stream': stream,
+        'month': month,
+        'archive_months': archive_months,
+    }
+    return await arender(request, 'main/events.html', context)
+
+
+async def events_ics(request):
+    feed = await alist(event_archive.ics_events())
+    calendar = event_archive.ics_calendar(feed, request.get_host())
+    response = HttpResponse(calendar, content_type='text/calendar; charset=utf-8')
+    response['Content-Disposition'] = 'inline; filename="cinnamon-chalet-events.ics"'
+    return response
+
+
+@require_safe
+async def menu_json(request):
+    return site_menu.json_response(request, await site_menu.aget_menu())
+
+
+@require_safe
+async def resized_image(request, spec, path):
+    # Resizing is CPU and file work
+    return await sync_to_async(resize.response)(request, spec, path)
+
+
+async def search(request):
+    query = request.GET.get('q', '').strip()
+    try:
+        results = await sync_to_async(site_search.search)(query) if query else []
+    except OperationalError:
+        results = []
+    return await arender(request, 'main/search.html', {'query': query, 'results': results})
+
+
+async def search_suggest(request):
+    try:
+        suggestions = await sync_to_async(site_search.suggest)(request.GET.get('q', ''))
+    except OperationalError:
+        suggestions = []
+    return JsonResponse({'suggestions': suggestions})
+
+
+def notify_soon():
+    """
+    Drain the contact outbox in the background, without holding up the
+    response. One drain runs at a time; messages saved meanwhile go out in
+    its next pass rather than each opening an SMTP session.
+    """
+    global _drain, _drain_again
+    if _drain is not None and not _drain.done():
+        _drain_again = True
+        return
+    _drain = asyncio.get_running_loop().create_task(drain_outbox())
+
+
+async def drain_outbox():
+    global _drain_again
+    while True:
+        _drain_again = False
+        try:
+            await outbox.asend_pending()
+        except Exception:
+            # The outbox worker picks the messages up on its next pass
+            logger.exception('Background contact notification drain failed')
+            return
+        if not _drain_again:
+            return
+
+
+async def acontact_context():
+    contact_header, contact_info, testimonials = await asyncio.gather(
+        banners.ahero('contact'),
+        ContactInfo.objects.filter(is_active=True).afirst(),
+        alist(Testimonial.objects.filter(is_featured=True)[:3]),
+    )
+    return {'contact_header': contact_header, 'contact_info': contact_info, 'testimonials': testimonials}
+
+
+@rate_limited_posts
+async def contact(request):
+    if request.method == 'POST':
+        form = ContactForm(request.POST)
+        if form.is_valid():
+            # The outbox row is the durable record; the background send only
+            # gets the email out sooner than the next worker pass
+            await sync_to_async(form.save)()
+            notify_soon()
+            messages.success(request, 'Thank you for your message! We will get back to you soon.')
+            return redirect('contact')
+    else:
+        form = ContactForm()
+
+    context = await acontact_context()
+    context['form'] = form
+    return await arender(request, 'main/contact.html', context)
+
+
+async def reservation(request):
+    if request.method == 'POST':
+        booking_form = ReservationForm(request.POST)
+        # Looks up the room type
+        if await sync_to_async(booking_form.is_valid)():
+            data = booking_form.cleaned_data
+            try:
+                booked = await sync_to_async(inventory.book)(
+                    data['room_type'], data['check_in'], data['check_out'],
+                    adults=data['adults'], children=data['children'],
+                    name=data['name'], email=data['email'], phone=data['phone'],
+                )
+            except ValidationError as e:
+                messages.error(request, e.messages[0])
+            else:
+                messages.success(request, f'Thank you! Your {booked.room_type.name} is reserved from {booked.check_in} to {booked.check_out}.')
+                return redirect('reservation')
+        # Show the same search again with the booking errors
+        search_form = AvailabilityForm(request.POST)
+    else:
+        booking_form = ReservationForm()
+        search_form = AvailabilityForm(request.GET or None)
+
+    results = None
+    if search_form.is_valid():
+        data = search_form.cleaned_data
+        results = await sync_to_async(inventory.search)(data['check_in'], data['check_out'])
+
+    today = timezone.localdate()
+    context = {
+        'search_form': search_form,
+        'booking_form': booking_form,
+        'results': results,
+        'adults': str(search_form['adults'].value() or 2),
+        'children': str(search_form['children'].value() or 0),
+        'today': today.isoformat(),
+        'tomorrow': (today + timedelta(days=1)).isoformat(),
+    }
+    return await arender(request, 'main/reservation.html', context)
@@ -0,0 +1,152 @@
+# main/banners.py
+"""
+The hero banners of the pages, from the five header image models.
+
+All active banners of every page are read with one query and kept in the
+process. A hero lookup after that is a dictionary lookup plus one stat() of
+a stamp file, no queries. A save or delete of a banner (main/signals.py)
+replaces the stamp once its transaction commits, and every worker on the
+host reloads on its next lookup.
+
+When a page has several active banners, each is shown on a share of days
+proportional to its ``weight``. The pick depends only on the page and the
+date, so every worker shows the same banner all day, matching the page
+versions and published copies, which also change with the date.
+"""
+import hashlib
+import logging
+import os
+import tempfile
+from bisect import bisect_right
+from functools import cache
+from itertools import accumulate
+from pathlib import Path
+
+from asgiref.sync import sync_to_async
+from django.core.cache import caches
+from django.db import OperationalError, models, transaction
+from django.utils import timezone
+
+from .models import AboutHeaderImage, ContactHeaderImage, EventsHeaderImage, HeaderImage, RoomHeaderImage
+
+logger = logging.getLogger(__name__)
+
+# Page (URL name) -> its banner model
+MODELS = {
+    'home': HeaderImage,
+    'rooms': RoomHeaderImage,
+    'about': AboutHeaderImage,
+    'events': EventsHeaderImage,
+    'contact': ContactHeaderImage,
+}
+
+# In the models' field order, as Model.from_db() expects
+COLUMNS = ('id', 'title', 'image', 'subtitle', 'weight', 'created_at')
+
+STAMP_NAME = 'banners.stamp'
+
+# Page -> active banners, newest first; None until first loaded
+_registry = None
+# Identity of the stamp file the registry was loaded under
+_loaded_stamp = None
+
+
+@cache
+def stamp_path():
+    """Beside the page fragments, so shared by the workers on the host; None without a file cache."""
+    # Resolved once: going through the cache handler costs more than the stat()
+    directory = getattr(caches['default'], '_dir', None)
+    return None if directory is None else Path(directory) / STAMP_NAME
+
+
+def current_stamp():
+    path = stamp_path()
+    if path is None:
+        return None
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    # A new file per change, so the inode tells changes apart within an mtime tick
+    return stat.st_ino, stat.st_mtime_ns
+
+
+def load():
+    """Page -> active banners, newest first, from one query; the columns not read stay deferred."""
+    queries = [
+        model.objects.filter(is_active=True)
+        .annotate(page=models.Value(page, output_field=models.CharField()))
+        .values_list('page', *COLUMNS)
+        .order_by()
+        for page, model in MODELS.items()
+    ]
+    registry = {page: [] for page in MODELS}
+    for page, *values in queries[0].union(*queries[1:], all=True):
+        registry[page].append(MODELS[page].from_db('default', COLUMNS, values))
+    # Sorted here: an ORDER BY on the union would sort in a temp b-tree
+    for banners in registry.values():
+        banners.sort(key=lambda banner: (banner.created_at, banner.id), reverse=True)
+    return registry
+
+
+def registry():
+    """The cached registry, reloaded first if a banner changed since it was read."""
+    global _registry, _loaded_stamp
+    stamp = current_stamp()
+    if _registry is None or stamp != _loaded_stamp:
+        # Read the stamp before the rows: a change in between just reloads again
+        _registry, _loaded_stamp = load(), stamp
+        logger.debug('Loaded %d hero banners', sum(map(len, _registry.values())))
+    return _registry
+
+
+def pick(page, banners, day):
+    """The banner of ``banners`` shown on ``page`` on ``day``, by weight; None if there are none."""
+    weighted = [banner for banner in banners if banner.weight > 0]
+    if not weighted:
+        # Weight 0 banners only stand in when nothing else is active
+        return banners[0] if banners else None
+    if len(weighted) == 1:
+        return weighted[0]
+    bounds = list(accumulate(banner.weight for banner in weighted))
+    seed = hashlib.sha1(f'{page}:{day.isoformat()}'.encode()).digest()
+    return weighted[bisect_right(bounds, int.from_bytes(seed[:8], 'big') % bounds[-1])]
+
+
+def hero(page, day=None):
+    """Today's (or ``day``'s) banner for ``page``, or None."""
+    try:
+        banners = registry()[page]
+    except OperationalError:
+        # Tables not migrated yet: the templates' fallback image
+        return None
+    return pick(page, banners, day or timezone.localdate())
+
+
+async def ahero(page, day=None):
+    """``hero()`` for async views; only a reload leaves the event loop."""
+    if _registry is None or current_stamp() != _loaded_stamp:
+        return await sync_to_async(hero)(page, day)
+    return pick(page, _registry[page], day or timezone.localdate())
+
+
+def write_stamp():
+    path = stamp_path()
+    if path is None:
+        # One process, whose own registry is already dropped
+        return
+    path.parent.mkdir(parents=True, exist_ok=True)
+    descriptor, temporary = tempfile.mkstemp(dir=path.parent, prefix='.banners-', suffix='.tmp')
+    os.close(descriptor)
+    os.replace(temporary, path)
+
+
+def invalidate():
+    """Have every worker reload the banners, once the current transaction commits."""
+    transaction.on_commit(reload_everywhere)
+
+
+def reload_everywhere():
+    global _registry
+    _registry = None
+    write_stamp()
@@ -0,0 +1,136 @@
+# main/bundles.py
+"""
+Per-page CSS and JS bundles.
+
+PAGES declares which optional features each page uses; CSS and JS list
+every stylesheet and script in load order, tagged with the feature that
+needs it (None: every page). At collectstatic time main/storage.py
+concatenates each page's files into ``bundles/<page>.css`` and
+``bundles/<page>.js``, which the manifest storage then fingerprints and
+compresses like any other static file. Templates emit them with the
+``bundle_css``/``bundle_js`` tags (main/templatetags/bundles.py).
+The big general-purpose stylesheets in PURGED_CSS are first stripped of
+rules the site never uses (main/csspurge.py).
+"""
+import posixpath
+import re
+
+from . import csspurge
+
+try:
+    import rjsmin
+except ImportError:  # optional; scripts are concatenated as they are
+    rjsmin = None
+
+CSS = [
+    ('css/bootstrap.min.css', None),
+    ('css/animate.css', 'carousel'),
+    ('css/owl.carousel.min.css', 'carousel'),
+    ('css/aos.css', None),
+    ('css/bootstrap-datepicker.css', 'datepicker'),
+    ('css/fancybox.min.css', 'lightbox'),
+    # Cut down to the icons in use by manage.py subset_icons (main/iconfonts.py)
+    ('fonts/subset/ionicons.css', None),
+    ('fonts/subset/fontawesome.css', None),
+    ('css/style.css', None),
+]
+
+JS = [
+    ('js/jquery-3.3.1.min.js', None),
+    ('js/jquery-migrate-3.0.1.min.js', None),
+    ('js/popper.min.js', 'tabs'),
+    ('js/bootstrap.min.js', 'tabs'),
+    ('js/owl.carousel.min.js', 'carousel'),
+    ('js/jquery.stellar.min.js', None),
+    ('js/jquery.fancybox.min.js', 'lightbox'),
+    ('js/aos.js', None),
+    ('js/bootstrap-datepicker.js', 'datepicker'),
+    ('js/main.js', None),
+]
+
+PURGED_CSS = {'css/bootstrap.min.css', 'css/animate.css', 'css/aos.css', 'css/style.css'}
+
+# carousel: .home-slider/.js-carousel-*, lightbox: data-fancybox,
+# tabs: data-toggle="tab", datepicker: #checkin_date/#checkout_date
+PAGES = {
+    'home': {'carousel', 'lightbox', 'tabs', 'datepicker'},
+    'rooms': {'carousel', 'lightbox', 'datepicker'},
+    'about': {'carousel', 'lightbox'},
+    'events': set(),
+    'contact': {'carousel'},
+    'reservation': set(),
+    'search': set(),
+}
+# Templates that don't name a bundle get every feature
+BASE_PAGE = 'base'
+PAGES[BASE_PAGE] = set().union(*PAGES.values())
+
+BUNDLE_DIR = 'bundles'
+
+URL_RE = re.compile(r'url\(\s*([\'"]?)([^\'")]+)\1\s*\)')
+COMMENT_RE = re.compile(r'/\*(?!!).*?\*/', re.S)
+SOURCE_MAP_RE = re.compile(r'^\s*(//|/\*)# sourceMappingURL=.*$', re.M)
+
+
+def page_features(page):
+    try:
+        return PAGES[page]
+    except KeyError:
+        raise ValueError(f'No bundle for page {page!r}; add it to main.bundles.PAGES') from None
+
+
+def bundle_files(page, kind):
+    """Static paths that make up ``page``'s bundle of ``kind`` ('css' or 'js')."""
+    features = page_features(page)
+    return [path for path, feature in (CSS if kind == 'css' else JS) if feature is None or feature in features]
+
+
+def bundle_name(page, kind):
+    page_features(page)
+    return f'{BUNDLE_DIR}/{page}.{kind}'
+
+
+def rebase_urls(css, source):
+    """Rewrite relative url()s in ``source`` so they resolve from the bundle directory."""
+    source_dir = posixpath.dirname(source)
+
+    def rebase(match):
+        quote, url = match.groups()
+        if url.startswith(('data:', 'http:', 'https:', '//', '/', '#')):
+            return match.group(0)
+        # Keep ?#iefix style suffixes as they are
+        path, sep, suffix = (re.split(r'([?#])', url, maxsplit=1) + ['', ''])[:3]
+        target = posixpath.normpath(posixpath.join(source_dir, path))
+        return f'url({quote}{posixpath.relpath(target, BUNDLE_DIR)}{sep}{suffix}{quote})'
+
+    return URL_RE.sub(rebase, css)
+
+
+def minify_css(css):
+    """Drop comments (keeping /*! licences) and needless whitespace."""
+    css = COMMENT_RE.sub('', css)
+    css = re.sub(r'\s+', ' ', css)
+    css = re.sub(r'\s*([{};,])\s*', r'\1', css)
+    return css.replace(';}', '}').strip()
+
+
+def minify_js(js):
+    js = SOURCE_MAP_RE.sub('', js)
+    return rjsmin.jsmin(js, keep_bang_comments=True) if rjsmin else js
+
+
+def build(page, kind, read):
+    """
+    Contents of one bundle. ``read(path)`` returns the text of a static file.
+    """
+    parts = []
+    for path in bundle_files(page, kind):
+        text = read(path)
+        if kind == 'css':
+            if path in PURGED_CSS:
+                text = csspurge.purge(text)
+            parts.append(minify_css(rebase_urls(text, path)))
+        else:
+            # A file without a trailing semicolon mustn't run into the next one
+            parts.append(minify_js(text).rstrip() + '\n;')
+    return '\n'.join(parts) + '\n'
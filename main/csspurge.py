@@ -0,0 +1,275 @@
+# main/csspurge.py
+"""
+Drop CSS rules whose selectors can't match anything the site renders.
+
+``used_names()`` collects every word in the templates, main.js and the
+form widgets; a selector survives if each class, id and attribute value in
+it is one of those words or safelisted (classes only ever added by the
+vendored plugins). ``purge()`` then keeps the matching rules, the
+@keyframes they still animate with and every @font-face, and drops the
+@media/@supports blocks left empty. Used by main/bundles.py for the large
+stylesheets in PURGED_CSS; ``manage.py purge_css`` reports the savings.
+
+``removed_in_use()`` is the safety net: it lists the selectors a purge
+dropped although every class, id and attribute in them is written out in a
+template tag, which would be a purger bug rather than an unused rule
+(``manage.py purge_css --check``).
+"""
+import re
+from collections import namedtuple
+from functools import cache
+from pathlib import Path
+
+APP_DIR = Path(__file__).resolve().parent
+
+# Where class names, ids and attribute values come from
+CONTENT = [
+    *sorted((APP_DIR / 'templates').rglob('*.html')),
+    APP_DIR / 'static' / 'js' / 'main.js',
+    APP_DIR / 'forms.py',
+]
+
+# Classes only ever added at runtime, by plugins or from template variables
+SAFELIST = {
+    # bootstrap tabs, collapse and dropdowns
+    'active', 'show', 'fade', 'collapse', 'collapsing',
+    # owl carousel
+    'animated', 'center', 'cloned', 'disabled',
+    # bootstrap-datepicker
+    'day', 'dow', 'old', 'new', 'today', 'selected', 'highlighted', 'range', 'focused',
+    'month', 'year', 'decade', 'century', 'prev', 'next', 'table-condensed',
+}
+SAFELIST_PATTERNS = re.compile(r'^(owl-|fancybox-|aos-|datepicker|alert-)')
+
+WORD_RE = re.compile(r'[A-Za-z0-9_-]+')
+COMMENT_RE = re.compile(r'/\*.*?\*/', re.S)
+LICENCE_RE = re.compile(r'/\*!.*?\*/', re.S)
+GROUP_RE = re.compile(r'@(-\w+-)?(media|supports|document)\b')
+KEYFRAMES_RE = re.compile(r'@(-\w+-)?keyframes\s+([\w-]+)')
+ANIMATION_RE = re.compile(r'animation(?:-name)?\s*:\s*([^;}]+)')
+PSEUDO_ARGS_RE = re.compile(r':[\w-]+\([^)]*\)')
+ATTRIBUTE_RE = re.compile(r'\[\s*([\w-]+)\s*(?:([~|^$*]?=)\s*(["\']?)(.*?)\3)?\s*[iIsS]?\s*\]')
+CLASS_RE = re.compile(r'\.(-?[_a-zA-Z][\w-]*)')
+ID_RE = re.compile(r'#(-?[_a-zA-Z][\w-]*)')
+SELECTOR_SPLIT_RE = re.compile(r',(?![^(\[]*[)\]])')
+TAG_RE = re.compile(r'<[a-zA-Z][^>]*>')
+TAG_ATTRIBUTE_RE = re.compile(r'\s([a-zA-Z][\w:-]*)\s*=\s*(?:"([^"]*)"|\'([^\']*)\')')
+
+Rule = namedtuple('Rule', ['prelude', 'body'])
+Group = namedtuple('Group', ['prelude', 'children'])
+Statement = namedtuple('Statement', ['text'])
+
+
+@cache
+def used_names():
+    """Every word that appears in the site's markup and scripts."""
+    names = set()
+    for path in CONTENT:
+        names.update(WORD_RE.findall(path.read_text(errors='replace')))
+    return frozenset(names)
+
+
+@cache
+def markup_names():
+    """
+    Attribute names in the templates' tags, ``name=value`` for each of
+    their attributes and every word of their class and id values: what a
+    rendered page is sure to contain.
+    """
+    names = set()
+    for path in (APP_DIR / 'templates').rglob('*.html'):
+        for tag in TAG_RE.findall(path.read_text(errors='replace')):
+            for name, double, single in TAG_ATTRIBUTE_RE.findall(tag):
+                value = double or single
+                names.update((name, f'{name}={value}'))
+                if name in ('class', 'id'):
+                    names.update(WORD_RE.findall(value))
+    return frozenset(names)
+
+
+def _skip_string(css, i):
+    quote, i = css[i], i + 1
+    while i < len(css) and css[i] != quote:
+        i += 2 if css[i] == '\\' else 1
+    return i + 1
+
+
+def _scan(css, i, stops):
+    """Index of the first character in ``stops`` outside strings and brackets."""
+    depth = 0
+    while i < len(css):
+        char = css[i]
+        if char in '"\'':
+            i = _skip_string(css, i)
+            continue
+        if char in '([':
+            depth += 1
+        elif char in ')]':
+            depth -= 1
+        elif depth <= 0 and char in stops:
+            return i
+        i += 1
+    return i
+
+
+def _closing_brace(css, i):
+    depth = 0
+    while i < len(css):
+        char = css[i]
+        if char in '"\'':
+            i = _skip_string(css, i)
+            continue
+        if char == '{':
+            depth += 1
+        elif char == '}':
+            depth -= 1
+            if not depth:
+                return i
+        i += 1
+    return i
+
+
+def _parse_block(css, i):
+    nodes = []
+    while True:
+        while i < len(css) and css[i].isspace():
+            i += 1
+        if i >= len(css):
+            return nodes, i
+        if css[i] == '}':
+            return nodes, i + 1
+        end = _scan(css, i, '{;}')
+        prelude = css[i:end].strip()
+        if end >= len(css) or css[end] != '{':
+            if prelude:
+                nodes.append(Statement(prelude))
+            i = end + 1 if end < len(css) and css[end] == ';' else end
+        elif GROUP_RE.match(prelude):
+            children, i = _parse_block(css, end + 1)
+            nodes.append(Group(prelude, children))
+        else:
+            close = _closing_brace(css, end)
+            nodes.append(Rule(prelude, css[end + 1:close].strip()))
+            i = close + 1
+
+
+def parse(css):
+    """Comment-free CSS as a list of Rule, Group and Statement nodes."""
+    return _parse_block(css, 0)[0]
+
+
+def serialize(nodes):
+    parts = []
+    for node in nodes:
+        if isinstance(node, Statement):
+            parts.append(f'{node.text};')
+        elif isinstance(node, Group):
+            parts.append(f'{node.prelude}{{{serialize(node.children)}}}')
+        else:
+            parts.append(f'{node.prelude}{{{node.body}}}')
+    return ''.join(parts)
+
+
+def _is_used(name, used):
+    return name in used or name in SAFELIST or SAFELIST_PATTERNS.match(name)
+
+
+def selector_matches(selector, used):
+    """Whether every class, id and attribute in ``selector`` could be in the markup."""
+    # :not(.x), :nth-child(2n+1) and friends never make a selector unmatchable
+    selector = PSEUDO_ARGS_RE.sub('', selector)
+    for name, operator, _, value in ATTRIBUTE_RE.findall(selector):
+        if name not in used:
+            return False
+        if operator == '=' and WORD_RE.fullmatch(value) and value not in used:
+            return False
+    selector = ATTRIBUTE_RE.sub('', selector)
+    return (
+        all(_is_used(name, used) for name in CLASS_RE.findall(selector))
+        and all(name in used for name in ID_RE.findall(selector))
+    )
+
+
+def _purge_nodes(nodes, used):
+    kept = []
+    for node in nodes:
+        if isinstance(node, Group):
+            children = _purge_nodes(node.children, used)
+            if children:
+                kept.append(node._replace(children=children))
+        elif isinstance(node, Rule) and not node.prelude.startswith('@'):
+            selectors = [
+                selector.strip() for selector in SELECTOR_SPLIT_RE.split(node.prelude)
+                if selector_matches(selector, used)
+            ]
+            if selectors:
+                kept.append(node._replace(prelude=','.join(selectors)))
+        else:
+            kept.append(node)
+    return kept
+
+
+def _animation_names(nodes):
+    names = set()
+    for node in nodes:
+        if isinstance(node, Group):
+            names |= _animation_names(node.children)
+        elif isinstance(node, Rule) and not node.prelude.startswith('@'):
+            for value in ANIMATION_RE.findall(node.body):
+                names.update(WORD_RE.findall(value))
+    return names
+
+
+def _drop_keyframes(nodes, names):
+    kept = []
+    for node in nodes:
+        if isinstance(node, Group):
+            children = _drop_keyframes(node.children, names)
+            if children:
+                kept.append(node._replace(children=children))
+            continue
+        keyframes = KEYFRAMES_RE.match(node.prelude) if isinstance(node, Rule) else None
+        if keyframes is None or keyframes.group(2) in names:
+            kept.append(node)
+    return kept
+
+
+def purge(css, used=None):
+    """``css`` without the rules nothing in ``used`` (default: used_names()) can match."""
+    used = used_names() if used is None else used
+    licences = LICENCE_RE.findall(css)
+    nodes = _purge_nodes(parse(COMMENT_RE.sub('', css)), used)
+    nodes = _drop_keyframes(nodes, _animation_names(nodes) | used)
+    return '\n'.join([*licences, serialize(nodes)])
+
+
+def _selectors(nodes, context=()):
+    """``(enclosing @media/@supports preludes, selector)`` for every style rule."""
+    found = []
+    for node in nodes:
+        if isinstance(node, Group):
+            found += _selectors(node.children, (*context, node.prelude))
+        elif isinstance(node, Rule) and not node.prelude.startswith('@'):
+            found += [(context, selector.strip()) for selector in SELECTOR_SPLIT_RE.split(node.prelude)]
+    return found
+
+
+def removed_in_use(css, used=None):
+    """
+    Selectors of ``css`` that purge() drops although the templates' tags
+    spell out all of their classes, ids and attributes, in source order.
+    """
+    markup = markup_names()
+    kept = set(_selectors(parse(COMMENT_RE.sub('', purge(css, used)))))
+    removed = []
+    for context, selector in _selectors(parse(COMMENT_RE.sub('', css))):
+        bare = PSEUDO_ARGS_RE.sub('', selector)
+        names = [
+            *(f'{name}={value}' if operator == '=' else name
+              for name, operator, _, value in ATTRIBUTE_RE.findall(bare)),
+            *CLASS_RE.findall(ATTRIBUTE_RE.sub('', bare)),
+            *ID_RE.findall(ATTRIBUTE_RE.sub('', bare)),
+        ]
+        if all(name in markup for name in names) and (context, selector) not in kept:
+            removed.append(selector)
+    return removed
@@ -0,0 +1,203 @@
+# main/event_archive.py
+"""
+Events page streams, month archive and ICS feed.
+
+Events are paged with keyset cursors on ``(event_date, id)`` rather than
+OFFSET, so any page costs one range scan of the event_active_date_id_idx
+index however many past events there are. Per-month counts live in
+EventMonthCount and are adjusted on every Event save/delete (see
+main/signals.py) instead of being recounted on each request.
+"""
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Event, EventMonthCount
+from .month_arrays import month_start, next_month
+
+PAGE_SIZE = 9
+# The ICS feed covers upcoming events plus this much recent history
+ICS_HISTORY = timedelta(days=30)
+ICS_LIMIT = 500
+
+STREAMS = ('upcoming', 'past')
+
+
+def encode_cursor(event):
+    return f'{event.event_date.isoformat()}.{event.pk}'
+
+
+def decode_cursor(cursor):
+    """``(event_date, id)`` from a cursor string, or None if it is malformed."""
+    try:
+        day, pk = cursor.split('.')
+        return date.fromisoformat(day), int(pk)
+    except (AttributeError, ValueError):
+        return None
+
+
+def parse_month(value):
+    try:
+        return datetime.strptime(value, '%Y-%m').date()
+    except (TypeError, ValueError):
+        return None
+
+
+class KeysetPage:
+    """One page of events plus the cursors of its neighbours."""
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+def _beyond(queryset, key, descending):
+    """Rows strictly after ``key`` in the walk order."""
+    day, pk = key
+    if descending:
+        return queryset.filter(event_date__lte=day).filter(Q(event_date__lt=day) | Q(id__lt=pk))
+    return queryset.filter(event_date__gte=day).filter(Q(event_date__gt=day) | Q(id__gt=pk))
+
+
+def paginate(queryset, descending=False, after=None, before=None, per_page=PAGE_SIZE):
+    """
+    Page through ``queryset`` ordered by (event_date, id).
+
+    ``after`` continues forward from a cursor, ``before`` steps back from one.
+    """
+    forward = ('-event_date', '-id') if descending else ('event_date', 'id')
+    backward = ('event_date', 'id') if descending else ('-event_date', '-id')
+
+    after, before = decode_cursor(after), decode_cursor(before)
+    if before:
+        rows = list(_beyond(queryset, before, not descending).order_by(*backward)[:per_page + 1])
+        has_more = len(rows) > per_page
+        rows = rows[:per_page][::-1]
+        if not rows:
+            return KeysetPage([])
+        return KeysetPage(
+            rows,
+            next_cursor=encode_cursor(rows[-1]),
+            previous_cursor=encode_cursor(rows[0]) if has_more else None,
+        )
+
+    if after:
+        queryset = _beyond(queryset, after, descending)
+    rows = list(queryset.order_by(*forward)[:per_page + 1])
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    return KeysetPage(
+        rows,
+        next_cursor=encode_cursor(rows[-1]) if has_more else None,
+        previous_cursor=encode_cursor(rows[0]) if after and rows else None,
+    )
+
+
+def stream_page(stream, after=None, before=None, today=None):
+    """Upcoming events soonest first, or past events most recent first."""
+    today = today or timezone.localdate()
+    active = Event.objects.filter(is_active=True)
+    if stream == 'past':
+        return paginate(active.filter(event_date__lt=today), descending=True, after=after, before=before)
+    return paginate(active.filter(event_date__gte=today), after=after, before=before)
+
+
+def month_page(month, after=None, before=None):
+    events = Event.objects.filter(is_active=True, event_date__gte=month, event_date__lt=next_month(month))
+    return paginate(events, after=after, before=before)
+
+
+def archive_months():
+    return EventMonthCount.objects.filter(count__gt=0)
+
+
+def adjust_month_count(event_date, delta):
+    month = month_start(event_date)
+    updated = EventMonthCount.objects.filter(month=month).update(count=F('count') + delta)
+    if not updated and delta > 0:
+        EventMonthCount.objects.get_or_create(month=month, defaults={'count': 0})
+        EventMonthCount.objects.filter(month=month).update(count=F('count') + delta)
+
+
+def rebuild_month_counts():
+    counts = {}
+    for event_date in Event.objects.filter(is_active=True).values_list('event_date', flat=True):
+        month = month_start(event_date)
+        counts[month] = counts.get(month, 0) + 1
+    with transaction.atomic():
+        EventMonthCount.objects.all().delete()
+        EventMonthCount.objects.bulk_create(
+            EventMonthCount(month=month, count=count) for month, count in counts.items()
+        )
+    return len(counts)
+
+
+def ics_events(today=None):
+    today = today or timezone.localdate()
+    return (
+        Event.objects.filter(is_active=True, event_date__gte=today - ICS_HISTORY)
+        .order_by('event_date', 'id')
+        .only('title', 'description', 'event_date', 'created_at')[:ICS_LIMIT]
+    )
+
+
+def ics_escape(text):
+    return (
+        text.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+        .replace('\r\n', '\\n').replace('\n', '\\n')
+    )
+
+
+def ics_fold(line):
+    """Split a content line into 75-octet pieces (RFC 5545 section 3.1)."""
+    pieces, current, size = [], '', 0
+    for char in line:
+        width = len(char.encode('utf-8'))
+        if size + width > 75:
+            pieces.append(current)
+            current, size = ' ', 1
+        current += char
+        size += width
+    pieces.append(current)
+    return '\r\n'.join(pieces)
+
+
+def ics_calendar(events, host):
+    lines = [
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        'PRODID:-//Cinnamon Chalet//Events//EN',
+        'CALSCALE:GREGORIAN',
+        'X-WR-CALNAME:Cinnamon Chalet Events',
+    ]
+    for event in events:
+        lines += [
+            'BEGIN:VEVENT',
+            f'UID:event-{event.pk}@{host}',
+            f'DTSTAMP:{event.created_at.astimezone(dt_timezone.utc):%Y%m%dT%H%M%SZ}',
+            f'DTSTART;VALUE=DATE:{event.event_date:%Y%m%d}',
+            f'DTEND;VALUE=DATE:{event.event_date + timedelta(days=1):%Y%m%d}',
+            f'SUMMARY:{ics_escape(event.title)}',
+            f'DESCRIPTION:{ics_escape(event.description)}',
+            'END:VEVENT',
+        ]
+    lines.append('END:VCALENDAR')
+    return ''.join(ics_fold(line) + '\r\n' for line in lines)
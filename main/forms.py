@@ -1,6 +1,9 @@
 # main/forms.py
 from django import forms
-from .models import ContactMessage
+from django.utils import timezone
+from .inventory import validate_stay
+from .models import ContactMessage, Reservation
+from .transfer import format_for
 
 class ContactForm(forms.ModelForm):
     class Meta:
@@ -28,7 +31,62 @@ class ContactForm(forms.ModelForm):
 
 
 
-### for newsletter
+def clean_stay(cleaned_data):
+    check_in, check_out = cleaned_data.get('check_in'), cleaned_data.get('check_out')
+    if check_in and check_out:
+        if check_in < timezone.localdate():
+            raise forms.ValidationError('Check-in cannot be in the past.')
+        validate_stay(check_in, check_out)
+    return cleaned_data
 
 
+class AvailabilityForm(forms.Form):
+    check_in = forms.DateField(widget=forms.DateInput(attrs={'type': 'date', 'class': 'form-control'}))
+    check_out = forms.DateField(widget=forms.DateInput(attrs={'type': 'date', 'class': 'form-control'}))
+    adults = forms.IntegerField(min_value=1, max_value=4, initial=2, required=False)
+    children = forms.IntegerField(min_value=0, max_value=3, initial=0, required=False)
 
+    def clean(self):
+        return clean_stay(super().clean())
+
+
+class ReservationForm(forms.ModelForm):
+    class Meta:
+        model = Reservation
+        fields = ['room_type', 'check_in', 'check_out', 'adults', 'children', 'name', 'email', 'phone']
+        widgets = {
+            'room_type': forms.HiddenInput(),
+            'check_in': forms.HiddenInput(),
+            'check_out': forms.HiddenInput(),
+            'adults': forms.HiddenInput(),
+            'children': forms.HiddenInput(),
+            'name': forms.TextInput(attrs={
+                'class': 'form-control',
+                'placeholder': 'Your Name'
+            }),
+            'email': forms.EmailInput(attrs={
+                'class': 'form-control',
+                'placeholder': 'Your Email'
+            }),
+            'phone': forms.TextInput(attrs={
+                'class': 'form-control',
+                'placeholder': 'Your Phone'
+            }),
+        }
+
+    def clean(self):
+        return clean_stay(super().clean())
+
+
+class ImportForm(forms.Form):
+    """A CSV or JSON Lines upload for the admin's Import pages (main/transfer.py)."""
+    file = forms.FileField(help_text='.csv or .jsonl, one row per record, with a header row for CSV.')
+
+    def clean(self):
+        cleaned_data = super().clean()
+        upload = cleaned_data.get('file')
+        if upload:
+            cleaned_data['format'] = format_for(upload.name)
+            if cleaned_data['format'] is None:
+                raise forms.ValidationError('Upload a .csv or .jsonl file.')
+        return cleaned_data
@@ -0,0 +1,127 @@
+# main/fragments.py
+"""
+Cached page sections.
+
+Each section of a page is rendered once and kept in the cache until one of
+the models it is built from is saved or deleted and the change has
+committed (see main/signals.py).
+"""
+import asyncio
+from collections import Counter
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.db import OperationalError, transaction
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+# (page, section) -> names of the models whose rows appear in that section
+FRAGMENTS = {
+    ('home', 'meta'): ['HomePageDescription'],
+    ('home', 'welcome'): ['HomePageDescription'],
+    ('home', 'photos'): ['HomePageDescription', 'RoomGallery'],
+    ('home', 'menu'): ['HomePageDescription', 'RestaurantMenuItem'],
+    ('home', 'testimonials'): ['HomePageDescription', 'Testimonial'],
+    ('home', 'events'): ['HomePageDescription', 'Event'],
+}
+
+# Sections stay cached until a signal invalidates them
+FRAGMENT_TIMEOUT = None
+
+# Hit/miss totals for this worker process
+stats = Counter()
+
+
+def fragment_key(page, section):
+    return f'fragment:{page}:{section}'
+
+
+def fragment_models():
+    """Names of every model that at least one section depends on."""
+    return {name for names in FRAGMENTS.values() for name in names}
+
+
+def render_fragments(page, sections):
+    """
+    Render the sections of a page, using cached HTML where possible.
+
+    ``sections`` maps a section name to ``(template_name, get_context)``.
+    ``get_context`` is only called on a miss, so a warm page runs no queries.
+    Returns ``(html_by_section, hits, misses)``.
+    """
+    keys = {name: fragment_key(page, name) for name in sections}
+    cached = cache.get_many(keys.values())
+
+    rendered = {}
+    misses = 0
+    for name, (template_name, get_context) in sections.items():
+        html = cached.get(keys[name])
+        if html is None:
+            misses += 1
+            try:
+                html = render_to_string(template_name, get_context())
+            except OperationalError:
+                # Tables not migrated yet: show the template fallbacks, don't cache
+                html = render_to_string(template_name, {})
+            else:
+                cache.set(keys[name], html, FRAGMENT_TIMEOUT)
+        rendered[name] = mark_safe(html)
+
+    hits = len(sections) - misses
+    stats['hits'] += hits
+    stats['misses'] += misses
+    return rendered, hits, misses
+
+
+async def arender_fragments(page, sections):
+    """
+    ``render_fragments()`` for async views: ``get_context`` is a coroutine
+    function, and the contexts of all missed sections are fetched concurrently.
+    They must be fully evaluated (no lazy querysets), as the templates are
+    rendered afterwards in one worker thread.
+    """
+    keys = {name: fragment_key(page, name) for name in sections}
+    cached = await cache.aget_many(keys.values())
+    missed = [name for name in sections if cached.get(keys[name]) is None]
+
+    try:
+        contexts = await asyncio.gather(*(sections[name][1]() for name in missed))
+    except OperationalError:
+        # Tables not migrated yet: show the template fallbacks, don't cache
+        contexts, store = [{} for _ in missed], False
+    else:
+        store = True
+
+    @sync_to_async
+    def render_missed():
+        return {
+            name: render_to_string(sections[name][0], context)
+            for name, context in zip(missed, contexts)
+        }
+
+    fresh = await render_missed() if missed else {}
+    if fresh and store:
+        await cache.aset_many({keys[name]: html for name, html in fresh.items()}, FRAGMENT_TIMEOUT)
+
+    rendered = {name: mark_safe(fresh[name] if name in fresh else cached[keys[name]]) for name in sections}
+    misses = len(missed)
+    hits = len(sections) - misses
+    stats['hits'] += hits
+    stats['misses'] += misses
+    return rendered, hits, misses
+
+
+def invalidate_model(model_name):
+    """
+    Drop every cached section built from ``model_name`` once the current
+    transaction commits (at once outside one). Dropped earlier, another
+    worker could re-render from the old rows and keep them cached for good.
+    """
+    keys = [
+        fragment_key(page, section)
+        for (page, section), names in FRAGMENTS.items()
+        if model_name in names
+    ]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
+    return keys
@@ -0,0 +1,98 @@
+# main/iconfonts.py
+"""
+Subset the Font Awesome and Ionicons webfonts down to the icons the site uses.
+
+``build()`` purges each icon stylesheet with main/csspurge.py, reads the
+codepoints of the icon rules left over and writes a WOFF2 with only those
+glyphs, plus the trimmed CSS pointing at it, to ``static/fonts/subset/``.
+The output is committed, so collectstatic doesn't need fontTools; rerun
+``manage.py subset_icons`` after adding icons to a template.
+"""
+import re
+from collections import namedtuple
+from io import BytesIO
+
+from . import csspurge
+
+try:
+    from fontTools import subset as ft_subset
+except ImportError:  # optional; only needed to rebuild the subsets
+    ft_subset = None
+
+IconFont = namedtuple('IconFont', ['name', 'css', 'font', 'family'])
+
+ICON_FONTS = [
+    IconFont(
+        'fontawesome', 'fonts/fontawesome/css/font-awesome.min.css',
+        'fonts/fontawesome/fonts/fontawesome-webfont.ttf', 'FontAwesome',
+    ),
+    IconFont('ionicons', 'fonts/ionicons/css/ionicons.min.css', 'fonts/ionicons/fonts/ionicons.ttf', 'Ionicons'),
+]
+
+SUBSET_DIR = 'fonts/subset'
+STATIC_DIR = csspurge.APP_DIR / 'static'
+
+CONTENT_RE = re.compile(r'content\s*:\s*(["\'])\\([0-9a-fA-F]+)\1')
+SRC_RE = re.compile(r'src\s*:[^;]*;?')
+
+
+def subset_css_path(font):
+    return f'{SUBSET_DIR}/{font.name}.css'
+
+
+def subset_font_path(font):
+    return f'{SUBSET_DIR}/{font.name}.woff2'
+
+
+def codepoints(css):
+    """Glyphs referenced by the icon rules in ``css``."""
+    return {int(code, 16) for _, code in CONTENT_RE.findall(css)}
+
+
+def trimmed_css(font, used=None):
+    """The icon stylesheet cut down to the icons in use, loading only the subset WOFF2."""
+    css = csspurge.purge((STATIC_DIR / font.css).read_text(encoding='utf-8'), used)
+    src = f'src:url("{font.name}.woff2") format("woff2");'
+
+    def face(match):
+        # One src for the subset replaces the eot/woff/ttf/svg pair of declarations
+        body = SRC_RE.sub('', match.group(1)).strip(';')
+        return f'@font-face{{{src}{body}}}'
+
+    return re.sub(r'@font-face\{([^}]*)\}', face, css)
+
+
+def subset_font(font, glyphs):
+    """WOFF2 bytes of ``font`` with only the ``glyphs`` codepoints."""
+    if ft_subset is None:
+        raise RuntimeError('Subsetting icon fonts needs fontTools and brotli (pip install fonttools brotli).')
+    options = ft_subset.Options()
+    options.flavor = 'woff2'
+    options.layout_features = []
+    options.notdef_outline = True
+    # FontForge's timestamp table; fontTools can't subset it
+    options.drop_tables += ['FFTM']
+    source = ft_subset.load_font(str(STATIC_DIR / font.font), options)
+    subsetter = ft_subset.Subsetter(options)
+    subsetter.populate(unicodes=glyphs)
+    subsetter.subset(source)
+    output = BytesIO()
+    ft_subset.save_font(source, output, options)
+    return output.getvalue()
+
+
+def is_current(font, used=None):
+    """Whether the committed subset CSS matches what the templates need now."""
+    path = STATIC_DIR / subset_css_path(font)
+    return path.exists() and path.read_text(encoding='utf-8') == trimmed_css(font, used)
+
+
+def build(font, used=None):
+    """Write the subset CSS and WOFF2 for ``font``; returns the sorted glyphs kept."""
+    css = trimmed_css(font, used)
+    glyphs = codepoints(css)
+    woff2 = subset_font(font, glyphs)
+    (STATIC_DIR / SUBSET_DIR).mkdir(parents=True, exist_ok=True)
+    (STATIC_DIR / subset_font_path(font)).write_bytes(woff2)
+    (STATIC_DIR / subset_css_path(font)).write_text(css, encoding='utf-8')
+    return sorted(glyphs)
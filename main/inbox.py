@@ -0,0 +1,129 @@
+# main/inbox.py
+"""
+The ContactMessage admin inbox.
+
+The default changelist counts the whole filtered table on every load and
+pages with OFFSET, both of which scan further the more messages there are.
+The inbox instead pages with keyset cursors on ``(created_at, id)``, newest
+first, so every page is one range scan of an index: contactmsg_inbox_idx,
+contactmsg_inbox_read_idx with the read filter, contactmsg_inbox_status_idx
+with the notification status one (see the filters in main/admin.py). Counts are
+exact up to COUNT_EXACT_UP_TO and estimated beyond, from how densely the
+newest matches fill the id range.
+"""
+from datetime import datetime
+
+from django.contrib.admin.views.main import ChangeList
+from django.db.models import Q
+
+from .event_archive import KeysetPage
+
+PAGE_SIZE = 50
+COUNT_EXACT_UP_TO = 1000
+
+# Query string parameters of the page cursors
+AFTER_VAR = 'after'
+BEFORE_VAR = 'before'
+
+ORDERING = ('-created_at', '-id')
+
+
+def encode_cursor(created_at, pk):
+    return f'{created_at.isoformat()}_{pk}'
+
+
+def decode_cursor(cursor):
+    """``(created_at, id)`` from a cursor string, or None if it is malformed."""
+    try:
+        created_at, pk = cursor.rsplit('_', 1)
+        return datetime.fromisoformat(created_at), int(pk)
+    except (AttributeError, ValueError):
+        return None
+
+
+def _older(queryset, key):
+    created_at, pk = key
+    return queryset.filter(created_at__lte=created_at).filter(Q(created_at__lt=created_at) | Q(id__lt=pk))
+
+
+def _newer(queryset, key):
+    created_at, pk = key
+    return queryset.filter(created_at__gte=created_at).filter(Q(created_at__gt=created_at) | Q(id__gt=pk))
+
+
+def paginate(queryset, after=None, before=None, per_page=PAGE_SIZE):
+    """
+    One page of ``queryset``, newest first: older than the ``after`` cursor,
+    newer than ``before``, or else the newest. The keys are read from the
+    index alone; the page's ``object_list`` is a queryset of just those rows,
+    fetched by primary key.
+    """
+    after, before = decode_cursor(after), decode_cursor(before)
+    keys = queryset.values_list('created_at', 'id')
+    if before:
+        rows = list(_newer(keys, before).order_by('created_at', 'id')[:per_page + 1])
+        has_newer, has_older = len(rows) > per_page, True
+        rows = rows[:per_page][::-1]
+    else:
+        if after:
+            keys = _older(keys, after)
+        rows = list(keys.order_by(*ORDERING)[:per_page + 1])
+        has_newer, has_older = bool(after), len(rows) > per_page
+        rows = rows[:per_page]
+    if not rows:
+        return KeysetPage(queryset.none())
+    return KeysetPage(
+        queryset.filter(pk__in=[pk for _, pk in rows]).order_by(*ORDERING),
+        next_cursor=encode_cursor(*rows[-1]) if has_older else None,
+        previous_cursor=encode_cursor(*rows[0]) if has_newer else None,
+    )
+
+
+def estimated_count(queryset):
+    """``(count, exact)``: exact up to COUNT_EXACT_UP_TO, else extrapolated."""
+    ids = queryset.order_by(*ORDERING).values_list('id', flat=True)
+    sample = list(ids[:COUNT_EXACT_UP_TO + 1])
+    if len(sample) <= COUNT_EXACT_UP_TO:
+        return len(sample), True
+    # The newest matches cover ids sample[-1]..sample[0]; assume the rest of
+    # the range down to the oldest match is as dense
+    oldest = queryset.order_by('created_at', 'id').values_list('id', flat=True).first()
+    newest, boundary = sample[0], sample[-1]
+    density = COUNT_EXACT_UP_TO / max(newest - boundary, 1)
+    return max(round(density * (newest - oldest + 1)), len(sample)), False
+
+
+class InboxChangeList(ChangeList):
+    """Changelist with keyset pages and estimated counts (see module docstring)."""
+
+    def __init__(self, request, *args, **kwargs):
+        self.after = request.GET.get(AFTER_VAR)
+        self.before = request.GET.get(BEFORE_VAR)
+        super().__init__(request, *args, **kwargs)
+        # Filter, search and sort links start from the newest messages again
+        for var in (AFTER_VAR, BEFORE_VAR):
+            self.params.pop(var, None)
+            self.filter_params.pop(var, None)
+
+    def get_filters_params(self, params=None):
+        lookup_params = super().get_filters_params(params)
+        for var in (AFTER_VAR, BEFORE_VAR):
+            lookup_params.pop(var, None)
+        return lookup_params
+
+    def get_results(self, request):
+        self.page = paginate(self.queryset, self.after, self.before, self.list_per_page)
+        self.result_count, self.result_count_exact = estimated_count(self.queryset)
+        self.result_list = self.page.object_list
+        self.full_result_count = None
+        self.show_full_result_count = False
+        self.show_admin_actions = True
+        self.can_show_all = False
+        self.multi_page = self.page.has_other_pages()
+        self.paginator = None
+
+    def older_url(self):
+        return self.get_query_string({AFTER_VAR: self.page.next_cursor, BEFORE_VAR: None})
+
+    def newer_url(self):
+        return self.get_query_string({BEFORE_VAR: self.page.previous_cursor, AFTER_VAR: None})
@@ -0,0 +1,173 @@
+# main/inventory.py
+"""
+Room inventory and availability search.
+
+Each RoomType has ``unit_count`` bookable rooms. Booked units are counted per
+night in RoomOccupancy rows, one row per room type and month holding a packed
+array of 31 counters. Searching any date range for every room type is a single
+indexed read: the available room types joined to their rate calendar
+(main/rates.py) and occupancy for the months the stay spans, followed by
+numpy arithmetic.
+"""
+from collections import namedtuple
+
+import numpy as np
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import F, FilteredRelation, OuterRef, Q, Subquery
+
+from . import rates
+from .models import Reservation, RoomOccupancy, RoomType
+from .month_arrays import month_slice, months_spanned, paste_month
+
+NIGHT_DTYPE = np.dtype('<u2')
+# Longest stay the search and booking accept
+MAX_NIGHTS = 30
+
+Availability = namedtuple('Availability', ['room_type', 'available', 'nights', 'total_price'])
+
+
+def booked_nights(check_in, check_out, room_type_ids=None):
+    """
+    Booked units for each night of the stay, keyed by room type id.
+
+    Room types without any bookings in the range are missing from the result.
+    """
+    months = list(months_spanned(check_in, check_out))
+    rows = RoomOccupancy.objects.filter(month__gte=months[0], month__lte=months[-1])
+    if room_type_ids is not None:
+        rows = rows.filter(room_type_id__in=room_type_ids)
+
+    n = (check_out - check_in).days
+    booked = {}
+    for room_type_id, month, blob in rows.values_list('room_type_id', 'month', 'nights'):
+        if room_type_id not in booked:
+            booked[room_type_id] = np.zeros(n, dtype=NIGHT_DTYPE)
+        paste_month(booked[room_type_id], check_in, month, np.frombuffer(blob, dtype=NIGHT_DTYPE))
+    return booked
+
+
+def stay_rows(check_in, check_out):
+    """
+    Every available room type once per month of the stay, annotated with
+    that month's ``rate_month``, ``rate_nights`` and ``booked_nights``
+    (None where the calendar has no row). One query.
+    """
+    months = list(months_spanned(check_in, check_out))
+    return (
+        RoomType.objects.filter(is_available=True)
+        .annotate(stay_rate=FilteredRelation(
+            'rates', condition=Q(rates__month__gte=months[0], rates__month__lte=months[-1]),
+        ))
+        .annotate(
+            rate_month=F('stay_rate__month'),
+            rate_nights=F('stay_rate__nights'),
+            booked_nights=Subquery(
+                RoomOccupancy.objects.filter(room_type=OuterRef('pk'), month=OuterRef('stay_rate__month'))
+                .values('nights')
+            ),
+        )
+        .order_by()
+    )
+
+
+def search(check_in, check_out, units=1):
+    """Available room types for the stay, with how many units are free and the stay price."""
+    # Queries only on the first search of a month in this process
+    rates.ensure_horizon()
+    months = set(months_spanned(check_in, check_out))
+    nights = (check_out - check_in).days
+
+    room_types, booked, prices, covered = {}, {}, {}, {}
+    for row in stay_rows(check_in, check_out):
+        if row.pk not in room_types:
+            room_types[row.pk] = row
+            booked[row.pk] = np.zeros(nights, dtype=NIGHT_DTYPE)
+            prices[row.pk] = np.zeros(nights, dtype=rates.RATE_DTYPE)
+            covered[row.pk] = set()
+        if row.rate_month is None:
+            continue
+        covered[row.pk].add(row.rate_month)
+        paste_month(prices[row.pk], check_in, row.rate_month, np.frombuffer(row.rate_nights, dtype=rates.RATE_DTYPE))
+        if row.booked_nights is not None:
+            paste_month(booked[row.pk], check_in, row.rate_month, np.frombuffer(row.booked_nights, dtype=NIGHT_DTYPE))
+
+    # Months without a rate row (past the calendar's horizon) have no
+    # occupancy joined either; those room types are read the long way
+    uncovered = {pk for pk in room_types if covered[pk] != months}
+    if uncovered:
+        fallback = booked_nights(check_in, check_out, list(uncovered))
+        quoted = rates.quote(check_in, check_out, [room_types[pk] for pk in uncovered])
+        for pk in uncovered:
+            booked[pk] = fallback.get(pk, np.zeros(nights, dtype=NIGHT_DTYPE))
+
+    results = []
+    for pk in sorted(room_types):
+        room_type = room_types[pk]
+        available = room_type.unit_count - int(booked[pk].max())
+        if available < units:
+            continue
+        total = quoted[pk] if pk in uncovered else rates.total_price(prices[pk])
+        results.append(Availability(room_type, available, nights, total))
+    return results
+
+
+def _adjust(room_type, check_in, check_out, delta):
+    """
+    Add ``delta`` units to every night of the stay. Must run in a transaction.
+
+    Raises ValidationError if that would overbook any night.
+    """
+    rows = {
+        row.month: row
+        for row in RoomOccupancy.objects.select_for_update().filter(
+            room_type=room_type, month__in=list(months_spanned(check_in, check_out)),
+        )
+    }
+
+    for month in months_spanned(check_in, check_out):
+        row = rows.get(month) or RoomOccupancy(room_type=room_type, month=month)
+        counts = np.frombuffer(row.nights, dtype=NIGHT_DTYPE).astype(np.int32)
+
+        span = month_slice(month, check_in, check_out)
+        counts[span] += delta
+        if counts[span].max() > room_type.unit_count or counts[span].min() < 0:
+            raise ValidationError(f'{room_type.name} is not available for the selected dates.')
+
+        row.nights = counts.astype(NIGHT_DTYPE).tobytes()
+        row.save()
+
+
+def validate_stay(check_in, check_out):
+    if check_out <= check_in:
+        raise ValidationError('Check-out must be after check-in.')
+    if (check_out - check_in).days > MAX_NIGHTS:
+        raise ValidationError(f'Stays are limited to {MAX_NIGHTS} nights.')
+
+
+def book(room_type, check_in, check_out, units=1, **guest):
+    """Allocate the nights and create a confirmed Reservation."""
+    validate_stay(check_in, check_out)
+    with transaction.atomic():
+        _adjust(room_type, check_in, check_out, units)
+        return Reservation.objects.create(
+            room_type=room_type, check_in=check_in, check_out=check_out, units=units, **guest,
+        )
+
+
+def cancel(reservation):
+    """Release a confirmed reservation's nights."""
+    if reservation.status != 'confirmed':
+        return
+    with transaction.atomic():
+        _adjust(reservation.room_type, reservation.check_in, reservation.check_out, -reservation.units)
+        reservation.status = 'cancelled'
+        reservation.save(update_fields=['status'])
+
+
+def rebuild():
+    """Recompute every RoomOccupancy row from confirmed reservations."""
+    with transaction.atomic():
+        RoomOccupancy.objects.all().delete()
+        for reservation in Reservation.objects.filter(status='confirmed').select_related('room_type'):
+            _adjust(reservation.room_type, reservation.check_in, reservation.check_out, reservation.units)
@@ -0,0 +1,272 @@
+# main/loadtest.py
+"""
+HTTP load-test harness behind ``manage.py loadtest``.
+
+``seed()`` fills an empty database with a realistic site. ``run_route()``
+drives one route from a pool of client threads over plain http.client
+connections and measures latency, throughput, SQL queries (from the
+Server-Timing header, see main/timing.py) and response size.
+``compare()`` checks a report against a stored baseline.
+"""
+import http.client
+import re
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from itertools import count
+from urllib.parse import urlencode
+
+import numpy as np
+from django.core.exceptions import ValidationError
+from django.utils import timezone
+
+from . import event_archive, inventory, rates, versions
+from .models import (
+    AboutDescription, AboutHeaderImage, ContactHeaderImage, ContactInfo, ContactMessage, Event,
+    EventsHeaderImage, HeaderImage, History, HomePageDescription, Leadership, Photo,
+    RestaurantMenuItem, RoomGallery, RoomHeaderImage, RoomType, SpecialOffer, Testimonial,
+)
+
+WORDS = (
+    'ocean view balcony breakfast garden pool spa sunset cinnamon tea colonial veranda '
+    'family suite deluxe quiet beach surf lagoon wedding banquet curry seafood rice '
+    'coconut lime mango jazz music festival lantern poya temple boat safari heritage'
+).split()
+
+Route = namedtuple('Route', ['name', 'method', 'path', 'expect'])
+
+QUERY_COUNT_RE = re.compile(r'db;dur=[\d.]+;desc="(\d+) queries"')
+
+
+def sentence(rng, words):
+    return ' '.join(rng.choice(WORDS) for _ in range(words)).capitalize() + '.'
+
+
+def seed(rng, events=600, messages=5000, reservations=200):
+    """Populate every public page, plus contact messages and bookings."""
+    today = timezone.localdate()
+
+    # bulk_create skips post_save, so no renditions are attempted for the
+    # placeholder images; the derived tables are rebuilt at the end
+    HomePageDescription.objects.bulk_create([HomePageDescription()])
+    AboutDescription.objects.bulk_create([AboutDescription(description=sentence(rng, 60), image='about/loadtest.jpg')])
+    ContactInfo.objects.bulk_create([
+        ContactInfo(address='261/69, Prime Elite, Ambalangoda', phone='+94 77 400 5317', email='hotel@example.com'),
+    ])
+    for model in (HeaderImage, RoomHeaderImage, AboutHeaderImage, EventsHeaderImage, ContactHeaderImage):
+        model.objects.bulk_create(
+            model(title=sentence(rng, 3), subtitle=sentence(rng, 6), image='headers/loadtest.jpg', is_active=n == 0)
+            for n in range(5)
+        )
+
+    categories = [choice for choice, _ in RoomType.ROOM_CATEGORIES]
+    room_types = RoomType.objects.bulk_create(
+        RoomType(
+            name=f'{rng.choice(WORDS).title()} {categories[n % len(categories)].title()} {n}',
+            category=categories[n % len(categories)], price_per_night=60 + 15 * n,
+            description=sentence(rng, 40), image='rooms/loadtest.jpg',
+            amenities=', '.join(rng.sample(WORDS, 6)), unit_count=rng.randint(2, 6),
+        )
+        for n in range(8)
+    )
+    SpecialOffer.objects.bulk_create(
+        SpecialOffer(
+            title=sentence(rng, 3), room_type=room_type, original_price=room_type.price_per_night,
+            discounted_price=room_type.price_per_night - 10, description=sentence(rng, 25),
+            image='offers/loadtest.jpg', valid_from=today, valid_until=today + timedelta(days=rng.randint(10, 90)),
+        )
+        for room_type in room_types[:3]
+    )
+    RoomGallery.objects.bulk_create(
+        RoomGallery(title=sentence(rng, 3), description=sentence(rng, 12), image='gallery/loadtest.jpg')
+        for _ in range(12)
+    )
+    Testimonial.objects.bulk_create(
+        Testimonial(customer_name=f'Guest {n}', content=sentence(rng, 30), rating=rng.randint(3, 5), is_featured=n < 6)
+        for n in range(20)
+    )
+    RestaurantMenuItem.objects.bulk_create(
+        RestaurantMenuItem(
+            category=rng.choice(['mains', 'desserts', 'drinks']), name=sentence(rng, 2).rstrip('.'),
+            price=rng.randint(3, 30), description=sentence(rng, 15),
+        )
+        for _ in range(40)
+    )
+    Leadership.objects.bulk_create(
+        Leadership(name=f'Manager {n}', position='Manager', quote=sentence(rng, 20), image='leaders/loadtest.jpg', order=n)
+        for n in range(4)
+    )
+    Photo.objects.bulk_create(
+        Photo(title=sentence(rng, 3), caption=sentence(rng, 10), image='gallery/loadtest.jpg', order=n)
+        for n in range(30)
+    )
+    History.objects.bulk_create(
+        History(year=str(1990 + n), title=sentence(rng, 4), description=sentence(rng, 30), order=n)
+        for n in range(10)
+    )
+    # Mostly past events, as the archive grows over the years
+    Event.objects.bulk_create(
+        (
+            Event(
+                title=sentence(rng, 4), description=sentence(rng, 50), image='events/loadtest.jpg',
+                event_date=today + timedelta(days=rng.randint(-1500, 120)), is_active=rng.random() > 0.05,
+            )
+            for _ in range(events)
+        ),
+        batch_size=500,
+    )
+    ContactMessage.objects.bulk_create(
+        (
+            ContactMessage(
+                name=f'Guest {n}', email=f'guest{n}@example.com', message=sentence(rng, 40),
+                is_read=rng.random() > 0.2, notification_status='sent',
+            )
+            for n in range(messages)
+        ),
+        batch_size=500,
+    )
+
+    event_archive.rebuild_month_counts()
+    rates.rebuild_all()
+    versions.bump_all()
+    for _ in range(reservations):
+        check_in = today + timedelta(days=rng.randrange(180))
+        try:
+            inventory.book(
+                rng.choice(room_types), check_in, check_in + timedelta(days=rng.randint(1, 7)),
+                name='Guest', email='guest@example.com',
+            )
+        except ValidationError:
+            pass
+
+
+def routes(today=None):
+    """Every public route in hotel_site/urls.py, with realistic query strings."""
+    today = today or timezone.localdate()
+    stay = urlencode({
+        'check_in': (today + timedelta(days=30)).isoformat(),
+        'check_out': (today + timedelta(days=33)).isoformat(),
+        'adults': 2, 'children': 0,
+    })
+    return [
+        Route('home', 'GET', '/', 200),
+        Route('rooms', 'GET', '/rooms/', 200),
+        Route('about', 'GET', '/about/', 200),
+        Route('events', 'GET', '/events/', 200),
+        Route('events_past', 'GET', '/events/?stream=past', 200),
+        Route('events_ics', 'GET', '/events.ics', 200),
+        Route('menu_json', 'GET', '/menu.json', 200),
+        Route('contact', 'GET', '/contact/', 200),
+        Route('contact_post', 'POST', '/contact/', 302),
+        Route('reservation', 'GET', f'/reservation/?{stay}', 200),
+        Route('search', 'GET', '/search/?q=ocean+view', 200),
+        Route('search_suggest', 'GET', '/search/suggest/?q=oce', 200),
+    ]
+
+
+class Client:
+    """One keep-alive connection, as seen from behind the HTTPS proxy."""
+
+    def __init__(self, host, port, csrf_token=None):
+        self.host, self.port, self.csrf_token = host, port, csrf_token
+        self.connection = http.client.HTTPConnection(host, port, timeout=30)
+
+    def headers(self):
+        # settings.SECURE_PROXY_SSL_HEADER: look like a request the proxy terminated
+        return {'Host': f'{self.host}:{self.port}', 'X-Forwarded-Proto': 'https'}
+
+    def request(self, method, path, body=None, headers=None):
+        """``(status, response headers, body, seconds)``; retries once on a dropped connection."""
+        headers = {**self.headers(), **(headers or {})}
+        for attempt in (1, 2):
+            try:
+                started = time.perf_counter()
+                self.connection.request(method, path, body=body, headers=headers)
+                response = self.connection.getresponse()
+                data = response.read()
+                return response.status, response, data, time.perf_counter() - started
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                self.connection.close()
+                if attempt == 2:
+                    raise
+
+    def fetch_csrf_token(self):
+        _, response, _, _ = self.request('GET', '/contact/')
+        for header, value in response.getheaders():
+            if header.lower() == 'set-cookie' and value.startswith('csrftoken='):
+                self.csrf_token = value.split(';', 1)[0].split('=', 1)[1]
+        return self.csrf_token
+
+    def call(self, route, number):
+        body, headers = None, {}
+        if route.method == 'POST':
+            # The cookie is Secure, so it's sent by hand; the unmasked secret
+            # is also a valid form token
+            body = urlencode({
+                'name': f'Load Test {number}', 'email': f'load{number}@example.com', 'phone': '',
+                'message': 'Is the ocean view suite free next month?', 'csrfmiddlewaretoken': self.csrf_token,
+            })
+            headers = {
+                'Content-Type': 'application/x-www-form-urlencoded',
+                'Cookie': f'csrftoken={self.csrf_token}',
+                'Referer': f'https://{self.host}:{self.port}/contact/',
+            }
+        return self.request(route.method, route.path, body, headers)
+
+
+def run_route(route, host, port, requests, concurrency, csrf_token=None):
+    """Send ``requests`` calls to ``route`` from ``concurrency`` threads and summarize them."""
+    local = threading.local()
+    numbers = count()
+
+    def call(_):
+        if not hasattr(local, 'client'):
+            local.client = Client(host, port, csrf_token)
+        try:
+            status, response, data, seconds = local.client.call(route, next(numbers))
+        except OSError:
+            return None
+        queries = QUERY_COUNT_RE.search(response.getheader('Server-Timing', ''))
+        return status, seconds, len(data), int(queries.group(1)) if queries else -1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        samples = list(pool.map(call, range(requests)))
+    wall = time.perf_counter() - started
+
+    ok = [sample for sample in samples if sample and sample[0] == route.expect]
+    latencies = np.array([sample[1] for sample in ok] or [0.0]) * 1000
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    return {
+        'requests': requests,
+        'errors': requests - len(ok),
+        'rps': round(len(ok) / wall, 1),
+        'p50_ms': round(float(p50), 2),
+        'p95_ms': round(float(p95), 2),
+        'p99_ms': round(float(p99), 2),
+        'queries': round(float(np.mean([sample[3] for sample in ok])), 1) if ok else None,
+        'bytes': int(np.mean([sample[2] for sample in ok])) if ok else None,
+    }
+
+
+def compare(report, baseline, tolerance):
+    """Regressions of ``report`` against ``baseline``, as readable lines."""
+    problems = []
+    for name, current in report['routes'].items():
+        previous = baseline['routes'].get(name)
+        if not previous:
+            continue
+        if current['errors'] > previous['errors']:
+            problems.append(f"{name}: {current['errors']} errors (baseline {previous['errors']})")
+        if current['p95_ms'] > previous['p95_ms'] * (1 + tolerance):
+            problems.append(f"{name}: p95 {current['p95_ms']} ms (baseline {previous['p95_ms']} ms)")
+        if current['rps'] < previous['rps'] * (1 - tolerance):
+            problems.append(f"{name}: {current['rps']} req/s (baseline {previous['rps']} req/s)")
+        # Query counts are deterministic, so any increase counts
+        if current['queries'] is not None and previous['queries'] is not None and current['queries'] > previous['queries']:
+            problems.append(f"{name}: {current['queries']} queries/request (baseline {previous['queries']})")
+        if current['bytes'] and previous['bytes'] and current['bytes'] > previous['bytes'] * (1 + tolerance):
+            problems.append(f"{name}: {current['bytes']} bytes (baseline {previous['bytes']})")
+    return problems
@@ -0,0 +1,45 @@
+# main/management/commands/archive_messages.py
+from django.core.management.base import BaseCommand, CommandError
+
+from main import retention
+
+
+class Command(BaseCommand):
+    help = (
+        'Move contact messages from months older than CONTACT_RETENTION_DAYS into gzipped monthly '
+        'JSON Lines archives (main/retention.py), then vacuum the freed space incrementally.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, help='Override CONTACT_RETENTION_DAYS for this run.')
+        parser.add_argument('--dry-run', action='store_true', help='Only list the months that would move.')
+        parser.add_argument('--batch-size', type=int, default=retention.BATCH_SIZE, help='Rows read and deleted per query.')
+        parser.add_argument('--no-vacuum', action='store_true', help="Leave the freed pages in the database file.")
+
+    def handle(self, *args, **options):
+        if options['days'] is not None and options['days'] < 1:
+            raise CommandError('--days must be at least 1.')
+        before = retention.cutoff(days=options['days'])
+        if before is None:
+            self.stdout.write('CONTACT_RETENTION_DAYS is 0: keeping every message.')
+            return
+
+        if options['dry_run']:
+            months = retention.pending_months(before)
+            for month in months:
+                self.stdout.write(f'{month:%Y-%m}')
+            self.stdout.write(f'{len(months)} months before {before:%Y-%m-%d} would move to {retention.archive_root()}.')
+            return
+
+        moved = retention.move_expired(batch_size=options['batch_size'], days=options['days'])
+        for month in moved:
+            self.stdout.write(f'{month.month}: {month.written:,} written, {month.deleted:,} deleted')
+        self.stdout.write(self.style.SUCCESS(
+            f'Moved {len(moved)} months before {before:%Y-%m-%d} to {retention.archive_root()}.'
+        ))
+
+        if moved and not options['no_vacuum']:
+            freed, switched = retention.reclaim_space()
+            if switched:
+                self.stdout.write('Switched the database to incremental auto-vacuum (one full VACUUM).')
+            self.stdout.write(self.style.SUCCESS(f'Returned {freed:,} free pages to the file system.'))
@@ -0,0 +1,99 @@
+# main/management/commands/bench_availability.py
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import numpy as np
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from main import inventory, rates
+from main.models import RoomType
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark availability searches against a throwaway test database "
+        "seeded with random reservations."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--room-types', type=int, default=6)
+        parser.add_argument('--units', type=int, default=12, help='Rooms per room type.')
+        parser.add_argument('--reservations', type=int, default=3000)
+        parser.add_argument('--searches', type=int, default=5000)
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument('--seed', type=int, default=0, help='Random seed.')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            self.seed(rng, options)
+            self.run(rng, options)
+        finally:
+            connections.close_all()
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def seed(self, rng, options):
+        # bulk_create: no post_save, so no renditions for the placeholder image
+        room_types = RoomType.objects.bulk_create(
+            RoomType(
+                name=f'Room {n}', category='deluxe', price_per_night=100 + 10 * n,
+                description='Benchmark room', image='rooms/benchmark.jpg', amenities='wifi',
+                unit_count=options['units'],
+            )
+            for n in range(options['room_types'])
+        )
+        rates.rebuild_all()
+
+        today = timezone.localdate()
+        started = time.perf_counter()
+        booked = 0
+        for _ in range(options['reservations']):
+            check_in = today + timedelta(days=rng.randrange(365))
+            check_out = check_in + timedelta(days=rng.randint(1, 7))
+            try:
+                inventory.book(rng.choice(room_types), check_in, check_out, name='Guest', email='guest@example.com')
+            except ValidationError:
+                continue
+            booked += 1
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f'Seeded {booked} reservations ({options["reservations"] - booked} full) '
+            f'in {elapsed:.2f}s ({booked / elapsed:.0f} bookings/s)'
+        )
+
+    def run(self, rng, options):
+        today = timezone.localdate()
+        stays = []
+        for _ in range(options['searches']):
+            check_in = today + timedelta(days=rng.randrange(365))
+            stays.append((check_in, check_in + timedelta(days=rng.randint(1, 14))))
+
+        connection.queries_log.clear()
+        with CaptureQueriesContext(connection) as captured:
+            inventory.search(*stays[0])
+        self.stdout.write(f'Queries per search (all room types): {len(captured)}')
+
+        def timed_search(stay):
+            started = time.perf_counter()
+            inventory.search(*stay)
+            return time.perf_counter() - started
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+            latencies = np.array(list(pool.map(timed_search, stays))) * 1000
+        elapsed = time.perf_counter() - started
+
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(stays)} searches, concurrency {options["concurrency"]}: '
+            f'{len(stays) / elapsed:.0f} searches/s, '
+            f'p50 {p50:.2f}ms, p95 {p95:.2f}ms, p99 {p99:.2f}ms'
+        ))
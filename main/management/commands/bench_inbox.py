@@ -0,0 +1,136 @@
+# main/management/commands/bench_inbox.py
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+from main import inbox
+from main.models import ContactMessage
+
+from .loadtest import use_database
+
+SEED_SQL = """
+WITH RECURSIVE n(i) AS (SELECT %s UNION ALL SELECT i + 1 FROM n WHERE i < %s)
+INSERT INTO main_contactmessage (
+    name, email, phone, message, is_read, is_archived, created_at,
+    notification_status, notification_attempts, notification_next_attempt, notification_error
+)
+SELECT
+    'Guest ' || i, 'guest' || i || '@example.com', '',
+    'Hello, we would like to ask about ' ||
+        CASE i % 5 WHEN 0 THEN 'the deluxe rooms' WHEN 1 THEN 'a wedding reception' WHEN 2 THEN 'airport pickup'
+        WHEN 3 THEN 'the restaurant menu' ELSE 'late checkout' END ||
+        ' for ' || (i % 9 + 1) || ' guests in ' || (i % 12 + 1) || ' months.',
+    i < %s * 0.98 OR i %% 3 = 0,
+    i %% 50 = 0,
+    datetime(%s, '+' || (i * %s) || ' seconds'),
+    CASE WHEN i %% 10000 = 0 THEN 'failed' ELSE 'sent' END, 1, %s, ''
+FROM n
+"""
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed a throwaway database with contact messages and time the ContactMessage admin inbox '
+        '(main/inbox.py): first, later and deep pages, filters, search and the bulk actions.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=5_000_000)
+        parser.add_argument('--repeat', type=int, default=20, help='Loads per changelist view.')
+        parser.add_argument('--years', type=float, default=5, help='Span of the seeded messages.')
+
+    def handle(self, *args, **options):
+        workdir = Path(tempfile.mkdtemp(prefix='bench-inbox-'))
+        try:
+            with use_database(str(workdir / 'db.sqlite3'), 'tuned'):
+                call_command('migrate', verbosity=0, interactive=False)
+                self.seed(options)
+                self.run(options)
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    def seed(self, options):
+        rows = options['rows']
+        spacing = max(int(options['years'] * 365 * 86400 / rows), 1)
+        started = time.perf_counter()
+        chunk = 500_000
+        with connection.cursor() as cursor:
+            for first in range(1, rows + 1, chunk):
+                last = min(first + chunk - 1, rows)
+                cursor.execute(SEED_SQL, [first, last, rows, '2021-01-01 00:00:00', spacing, '2021-01-01 00:00:00'])
+            cursor.execute('ANALYZE')
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f'Seeded {rows:,} messages in {elapsed:.1f}s ({rows / elapsed:,.0f} rows/s)')
+
+    def run(self, options):
+        user = get_user_model().objects.create_superuser('bench', 'bench@example.com', 'bench')
+        client = Client()
+        client.force_login(user)
+        url = reverse('admin:main_contactmessage_changelist')
+
+        middle = ContactMessage.objects.filter(is_archived=False).order_by('id').values_list('created_at', 'id')[
+            options['rows'] // 2:options['rows'] // 2 + 1
+        ].get()
+        views = {
+            'inbox': {},
+            'inbox, unread': {'read': 'no'},
+            'inbox, page 2': {inbox.AFTER_VAR: None},
+            'inbox, middle': {inbox.AFTER_VAR: inbox.encode_cursor(*middle)},
+            'inbox, back a page': {inbox.BEFORE_VAR: inbox.encode_cursor(*middle)},
+            'archive': {'box': 'archived'},
+            'notification failed': {'notification_status__exact': 'failed'},
+            'search, one guest': {'q': f"guest{options['rows'] // 3}"},
+            # Every seeded message is one of five sentences: a worst case
+            'search, common words': {'q': 'wedding reception'},
+        }
+        first_page = ContactMessage.objects.filter(is_archived=False).order_by(*inbox.ORDERING)
+        last_of_first = first_page.values_list('created_at', 'id')[inbox.PAGE_SIZE - 1]
+        views['inbox, page 2'][inbox.AFTER_VAR] = inbox.encode_cursor(*last_of_first)
+
+        self.stdout.write(f"\n{'view':<22}{'p50 ms':>9}{'p95 ms':>9}{'queries':>9}")
+        # In-process, and without collectstatic's manifest
+        storages = {**settings.STORAGES, 'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'}}
+        with override_settings(ALLOWED_HOSTS=['*'], SECURE_SSL_REDIRECT=False, STORAGES=storages):
+            for name, params in views.items():
+                timings = []
+                for _ in range(options['repeat']):
+                    with CaptureQueriesContext(connection) as captured:
+                        started = time.perf_counter()
+                        response = client.get(url, params)
+                        timings.append(time.perf_counter() - started)
+                    if response.status_code != 200:
+                        self.stderr.write(self.style.WARNING(f'{name}: HTTP {response.status_code}'))
+                        break
+                p50, p95 = np.percentile(np.array(timings) * 1000, [50, 95])
+                self.stdout.write(f'{name:<22}{p50:>9.1f}{p95:>9.1f}{len(captured):>9}')
+
+            self.stdout.write('')
+            page_ids = list(first_page.values_list('id', flat=True)[:inbox.PAGE_SIZE])
+            self.action('archive, one page', client, url, {'action': 'archive', '_selected_action': page_ids})
+            self.action('unarchive, one page', client, url + '?box=archived', {
+                'action': 'unarchive', '_selected_action': page_ids,
+            })
+            self.action('mark read, all unread', client, url + '?read=no', {
+                'action': 'mark_read', 'select_across': '1', '_selected_action': page_ids[:1],
+            })
+
+    def action(self, name, client, url, data):
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            response = client.post(url, {'index': '0', **data})
+            elapsed = time.perf_counter() - started
+        updates = [query for query in captured if query['sql'].startswith('UPDATE')]
+        self.stdout.write(
+            f'{name:<26}{elapsed * 1000:>9.1f} ms  HTTP {response.status_code}, {len(updates)} UPDATE'
+        )
@@ -0,0 +1,68 @@
+# main/management/commands/bench_rate_limit.py
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory, override_settings
+
+from main import ratelimit
+
+# What an accepted POST may spend in the rate limiter
+BUDGET_MS = 1
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure what the contact rate limit adds to an accepted POST, against a throwaway "
+        "'ratelimit' cache on the same filesystem."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=5000)
+        parser.add_argument('--clients', type=int, default=100, help='Distinct client addresses.')
+        parser.add_argument('--dir', help="Where to put the throwaway cache (default: next to the 'ratelimit' cache).")
+
+    def handle(self, *args, **options):
+        # Writes cost what the filesystem under the cache makes them cost
+        parent = options['dir'] or os.path.dirname(settings.CACHES[ratelimit.CACHE_ALIAS]['LOCATION'])
+        os.makedirs(parent, exist_ok=True)
+        location = tempfile.mkdtemp(prefix='bench-ratelimit-', dir=parent)
+        caches = {**settings.CACHES, ratelimit.CACHE_ALIAS: {
+            **settings.CACHES[ratelimit.CACHE_ALIAS], 'LOCATION': location,
+        }}
+        # Budgets no run can exhaust, so every POST takes the accepted path
+        limits = {name: {'burst': 10 ** 9, 'per_minute': 60} for name in settings.CONTACT_RATE_LIMITS}
+        try:
+            with override_settings(CACHES=caches, CONTACT_RATE_LIMITS=limits, RATELIMIT_PROXY_HOPS=0):
+                self.run(options, location)
+        finally:
+            shutil.rmtree(location, ignore_errors=True)
+
+    def run(self, options, location):
+        factory = RequestFactory()
+        requests = [
+            factory.post('/contact/', REMOTE_ADDR=f'10.0.{n // 256}.{n % 256}')
+            for n in range(options['clients'])
+        ]
+
+        timings = []
+        for n in range(options['requests']):
+            request = requests[n % len(requests)]
+            started = time.perf_counter()
+            limited = ratelimit.check(request)
+            timings.append(time.perf_counter() - started)
+            assert limited is None
+
+        latencies = np.array(timings) * 1000
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+        summary = (
+            f'{len(latencies)} accepted POSTs from {len(requests)} clients: '
+            f'mean {latencies.mean():.3f}ms, p50 {p50:.3f}ms, p95 {p95:.3f}ms, p99 {p99:.3f}ms'
+        )
+        self.stdout.write(f'Cache in {location}')
+        style = self.style.SUCCESS if p95 < BUDGET_MS else self.style.WARNING
+        self.stdout.write(style(f'{summary} (budget {BUDGET_MS}ms)'))
@@ -0,0 +1,150 @@
+# main/management/commands/bench_sqlite.py
+import random
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+from django.core.management.base import CommandError
+from django.db import OperationalError, connection, transaction
+
+from main import loadtest
+from main.models import RestaurantMenuItem
+
+from .loadtest import HOST, Command as LoadTestCommand, free_port, use_database
+
+
+class Command(LoadTestCommand):
+    help = (
+        'Run parallel readers against the home page while writers post the contact form and '
+        'editors save menu items as the admin does, once per SQLite profile (settings.SQLITE_PROFILES), '
+        'and report throughput and "database is locked" errors.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--profile', choices=[*settings.SQLITE_PROFILES, 'all'], default='all',
+            help='SQLite profile to run (default: each of them).',
+        )
+        parser.add_argument('--workers', type=int, default=3, help='gunicorn worker processes.')
+        parser.add_argument('--readers', type=int, default=8, help='Client threads loading the home page.')
+        parser.add_argument('--writers', type=int, default=4, help='Client threads posting the contact form.')
+        parser.add_argument('--editors', type=int, default=2, help='Threads saving menu items in this process.')
+        parser.add_argument(
+            '--edit-pause', type=float, default=0.05,
+            help='Seconds each editor waits between saves; unpaced editors starve the client threads of the GIL.',
+        )
+        parser.add_argument('--duration', type=float, default=15, help='Seconds per profile.')
+        parser.add_argument('--events', type=int, default=200)
+        parser.add_argument('--messages', type=int, default=2000)
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        try:
+            import gunicorn  # noqa: F401
+        except ImportError:
+            raise CommandError('gunicorn is not installed (pip install -r requirements.txt).')
+
+        profiles = list(settings.SQLITE_PROFILES) if options['profile'] == 'all' else [options['profile']]
+        results = {}
+        for profile in profiles:
+            workdir = Path(tempfile.mkdtemp(prefix='bench-sqlite-'))
+            env = {
+                **self.server_env(workdir),
+                'SQLITE_PROFILE': profile,
+            }
+            try:
+                self.prepare(env, options)
+                port = free_port()
+                server = self.start_server(env, port, options['workers'])
+                try:
+                    with use_database(env['SQLITE_PATH'], profile):
+                        results[profile] = self.run_mix(port, options)
+                finally:
+                    server.terminate()
+                    server.wait(timeout=30)
+            finally:
+                shutil.rmtree(workdir, ignore_errors=True)
+
+        self.stdout.write(
+            f"\n{options['workers']} gunicorn workers; {options['readers']} readers, {options['writers']} writers, "
+            f"{options['editors']} editors (pausing {options['edit_pause']:g}s) for {options['duration']:g}s per profile\n"
+        )
+        self.stdout.write(
+            f"{'profile':<10}{'reads/s':>9}{'read p95':>10}{'writes/s':>10}{'write p95':>11}{'edits/s':>9}"
+            f"{'read err':>10}{'write err':>11}{'edit err':>10}"
+        )
+        for profile, result in results.items():
+            self.stdout.write(
+                f"{profile:<10}{result['reads']['rps']:>9}{result['reads']['p95_ms']:>10}"
+                f"{result['writes']['rps']:>10}{result['writes']['p95_ms']:>11}{result['edits']['rps']:>9}"
+                f"{result['reads']['errors']:>10}{result['writes']['errors']:>11}{result['edits']['errors']:>10}"
+            )
+
+    def run_mix(self, port, options):
+        routes = {route.name: route for route in loadtest.routes()}
+        csrf_token = loadtest.Client(HOST, port).fetch_csrf_token()
+        if not csrf_token:
+            raise CommandError('The contact page did not set a CSRF cookie.')
+        menu_items = list(RestaurantMenuItem.objects.values_list('pk', flat=True))
+
+        stop = threading.Event()
+        samples = {'reads': [], 'writes': [], 'edits': []}
+        numbers = iter(range(10 ** 9))
+
+        def client_loop(kind, route):
+            client = loadtest.Client(HOST, port, csrf_token)
+            while not stop.is_set():
+                try:
+                    status, _, _, seconds = client.call(route, next(numbers))
+                except OSError:
+                    status, seconds = None, 0.0
+                samples[kind].append((status == route.expect, seconds))
+
+        def edit_loop(seed):
+            # An admin change form: one transaction around the save and its signals
+            rng = random.Random(seed)
+            try:
+                while not stop.is_set():
+                    started = time.perf_counter()
+                    try:
+                        with transaction.atomic():
+                            item = RestaurantMenuItem.objects.get(pk=rng.choice(menu_items))
+                            item.description = loadtest.sentence(rng, 12)
+                            item.save()
+                    except OperationalError as e:
+                        if 'locked' not in str(e):
+                            raise
+                        samples['edits'].append((False, time.perf_counter() - started))
+                    else:
+                        samples['edits'].append((True, time.perf_counter() - started))
+                    stop.wait(options['edit_pause'])
+            finally:
+                connection.close()
+
+        threads = (
+            [threading.Thread(target=client_loop, args=('reads', routes['home'])) for _ in range(options['readers'])]
+            + [threading.Thread(target=client_loop, args=('writes', routes['contact_post'])) for _ in range(options['writers'])]
+            + [threading.Thread(target=edit_loop, args=(n,)) for n in range(options['editors'] if menu_items else 0)]
+        )
+        for thread in threads:
+            thread.start()
+        started = time.perf_counter()
+        time.sleep(options['duration'])
+        stop.set()
+        for thread in threads:
+            thread.join()
+        wall = time.perf_counter() - started
+        return {kind: self.summarize(kind_samples, wall) for kind, kind_samples in samples.items()}
+
+    @staticmethod
+    def summarize(samples, wall):
+        ok = [seconds for success, seconds in samples if success]
+        return {
+            'rps': round(len(ok) / wall, 1),
+            'p95_ms': round(float(np.percentile(np.array(ok or [0.0]) * 1000, 95)), 1),
+            'errors': len(samples) - len(ok),
+        }
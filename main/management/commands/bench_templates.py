@@ -0,0 +1,72 @@
+# main/management/commands/bench_templates.py
+from time import perf_counter
+
+import numpy as np
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import RequestFactory, override_settings
+from django.urls import resolve
+
+from main import bundles, loadtest, warmup
+from main.timing import RequestTiming, current_timing
+
+# Renders with emptied template caches per page; the median is reported
+COLD_RUNS = 5
+
+
+class Command(BaseCommand):
+    help = (
+        'Render every page repeatedly and report the template time (Server-Timing "tpl") and view '
+        'time, and the view time right after emptying the template caches.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=50, help='Warm renders per page.')
+        parser.add_argument(
+            '--warm-up', action='store_true',
+            help='Compile all templates before each cold render, as workers do at startup.',
+        )
+
+    def handle(self, *args, **options):
+        factory = RequestFactory()
+        routes = [route for route in loadtest.routes() if route.method == 'GET' and route.name in bundles.PAGES]
+
+        self.stdout.write(
+            f"{'page':<14}{'tpl p50':>10}{'tpl p95':>10}{'view p50':>10}{'cold view':>11}  (ms, {options['repeat']} renders)"
+        )
+        # Bypass the fragment cache so every section renders
+        with override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}):
+            # First requests also pay for URL resolvers and the ORM; keep that out of "cold"
+            for route in routes:
+                self.render(factory, route.path)
+            for route in routes:
+                cold = []
+                for _ in range(COLD_RUNS):
+                    warmup.reset()
+                    if options['warm_up']:
+                        warmup.warm_up()
+                    # Compiling happens in get_template(), before "tpl" starts
+                    cold.append(self.render(factory, route.path)[1])
+                samples = np.array([self.render(factory, route.path) for _ in range(options['repeat'])]) * 1000
+                template, view = np.percentile(samples[:, 0], [50, 95]), np.percentile(samples[:, 1], 50)
+                self.stdout.write(
+                    f'{route.name:<14}{template[0]:>10.2f}{template[1]:>10.2f}{view:>10.2f}{np.median(cold) * 1000:>11.2f}'
+                )
+
+    def render(self, factory, path):
+        """``(template seconds, view seconds)`` for one request to ``path``."""
+        request = factory.get(path, secure=True)
+        request.user = AnonymousUser()
+        request.resolver_match = match = resolve(request.path_info)
+        timing = RequestTiming()
+        token = current_timing.set(timing)
+        started = perf_counter()
+        try:
+            # Views may create their default content rows; don't keep them
+            with transaction.atomic():
+                match.func(request, *match.args, **match.kwargs)
+                transaction.set_rollback(True)
+        finally:
+            current_timing.reset(token)
+        return timing.template, perf_counter() - started
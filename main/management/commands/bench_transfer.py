@@ -0,0 +1,84 @@
+# main/management/commands/bench_transfer.py
+import csv
+import shutil
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+
+from main import transfer
+from main.models import ContactMessage, RestaurantMenuItem
+
+from .bench_inbox import Command as InboxBenchmark
+from .loadtest import use_database
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed a throwaway database, then time streamed exports of contact messages and batched imports '
+        'of menu items (main/transfer.py), and how much memory an export holds at its peak.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--export-rows', type=int, default=1_000_000)
+        parser.add_argument('--import-rows', type=int, default=100_000)
+
+    def handle(self, *args, **options):
+        workdir = Path(tempfile.mkdtemp(prefix='bench-transfer-'))
+        try:
+            with use_database(str(workdir / 'db.sqlite3'), 'tuned'):
+                call_command('migrate', verbosity=0, interactive=False)
+                InboxBenchmark(stdout=self.stdout).seed({'rows': options['export_rows'], 'years': 5})
+                self.stdout.write(f'\n{"step":<28}{"rows":>10}{"seconds":>9}{"rows/s":>10}{"MB":>8}{"peak heap MB":>14}')
+                for fmt in transfer.FORMATS:
+                    self.export(fmt)
+                self.imports(workdir, options['import_rows'])
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    def report(self, step, rows, elapsed, size, peak=None):
+        peak = f'{peak / 1e6:>14.1f}' if peak is not None else ''
+        self.stdout.write(f'{step:<28}{rows:>10,}{elapsed:>9.1f}{rows / elapsed:>10,.0f}{size / 1e6:>8.1f}{peak}')
+
+    def export(self, fmt):
+        # Through the admin action's response, as a client would read it
+        started = time.perf_counter()
+        response = transfer.export_response(ContactMessage.objects.all(), fmt)
+        size = sum(len(chunk) for chunk in response.streaming_content)
+        elapsed = time.perf_counter() - started
+
+        # Again, untimed, tracing allocations: flat means it streams
+        tracemalloc.start()
+        for _ in transfer.export_response(ContactMessage.objects.all(), fmt).streaming_content:
+            pass
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        self.report(f'export messages, {fmt}', ContactMessage.objects.count(), elapsed, size, peak)
+
+    def imports(self, workdir, rows):
+        path = workdir / 'menu.csv'
+        categories = [value for value, _ in RestaurantMenuItem.CATEGORY_CHOICES]
+        with open(path, 'w', newline='') as output:
+            writer = csv.writer(output)
+            writer.writerow(['category', 'name', 'price', 'description', 'is_available'])
+            writer.writerows(
+                [categories[i % 3], f'Dish {i}', f'{5 + i % 40}.50', f'House special number {i}.', 'true']
+                for i in range(rows)
+            )
+        started = time.perf_counter()
+        with open(path, 'rb') as stream:
+            result = transfer.import_rows(RestaurantMenuItem, transfer.read_rows(stream, 'csv'))
+        self.report('import menu items, create', result.created, time.perf_counter() - started, path.stat().st_size)
+
+        # Re-import an export with new prices: every row an update
+        exported = workdir / 'menu-export.csv'
+        with open(exported, 'w', newline='') as output:
+            for chunk in transfer.export_chunks(RestaurantMenuItem.objects.all(), 'csv'):
+                output.write(chunk.replace('.50,', '.95,'))
+        started = time.perf_counter()
+        with open(exported, 'rb') as stream:
+            result = transfer.import_rows(RestaurantMenuItem, transfer.read_rows(stream, 'csv'))
+        self.report('import menu items, update', result.updated, time.perf_counter() - started, exported.stat().st_size)
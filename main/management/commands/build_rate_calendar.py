@@ -0,0 +1,19 @@
+# main/management/commands/build_rate_calendar.py
+from django.core.management.base import BaseCommand
+
+from main import rates
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the nightly rate calendar of every room type from prices and special offers.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--roll-forward', action='store_true',
+            help='Only build the months that came into the horizon and drop past ones (for a daily job).',
+        )
+
+    def handle(self, *args, **options):
+        months = rates.roll_forward() if options['roll_forward'] else rates.rebuild_all()
+        start, end = rates.horizon()
+        self.stdout.write(self.style.SUCCESS(f'Wrote {months} room-months of rates ({start} to {end}).'))
@@ -0,0 +1,35 @@
+# main/management/commands/build_renditions.py
+from django.apps import apps
+from django.core.management.base import BaseCommand
+
+from main.renditions import generate_renditions, image_fields
+
+
+class Command(BaseCommand):
+    help = "Build WebP/AVIF renditions for every uploaded image that doesn't have them yet."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Rebuild renditions that already exist.')
+
+    def handle(self, *args, **options):
+        built = failed = 0
+        for model in apps.get_app_config('main').get_models():
+            fields = image_fields(model)
+            if not fields:
+                continue
+            for instance in model.objects.only('pk', *[field.name for field in fields]).iterator():
+                for field in fields:
+                    fieldfile = getattr(instance, field.name)
+                    if not fieldfile:
+                        continue
+                    try:
+                        written = generate_renditions(fieldfile, force=options['force'])
+                    except (OSError, ValueError) as e:
+                        failed += 1
+                        self.stderr.write(self.style.WARNING(f'{fieldfile.name}: {e}'))
+                        continue
+                    if written:
+                        built += 1
+                        self.stdout.write(f'{fieldfile.name}: {len(written)} renditions')
+
+        self.stdout.write(self.style.SUCCESS(f'Built renditions for {built} images ({failed} failed).'))
@@ -0,0 +1,21 @@
+# main/management/commands/contact_rate_limits.py
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from main import ratelimit
+
+
+class Command(BaseCommand):
+    help = 'Show the contact form rate limits and how many POSTs each has rejected, across all workers.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Zero the rejection counters afterwards.')
+
+    def handle(self, *args, **options):
+        rejected = ratelimit.rejections()
+        for name, limit in settings.CONTACT_RATE_LIMITS.items():
+            budget = f"burst {limit['burst']}, {limit['per_minute']:g}/min" if limit['burst'] else 'off'
+            self.stdout.write(f'{name:<8}{budget:<24}{rejected[name]:>8} rejected')
+        if options['reset']:
+            ratelimit.reset_rejections()
+            self.stdout.write(self.style.SUCCESS('Reset the rejection counters.'))
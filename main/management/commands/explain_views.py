@@ -0,0 +1,70 @@
+# main/management/commands/explain_views.py
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+
+# Public pages whose queries must stay index-backed
+VIEW_NAMES = ['home', 'rooms', 'about', 'events', 'contact']
+
+# Single-row tables read with `.first()`; a scan of these is one row
+SINGLETON_TABLES = ['main_homepagedescription', 'main_aboutdescription']
+
+
+class Command(BaseCommand):
+    help = (
+        "Run every public view, EXPLAIN QUERY PLAN each query it issues and "
+        "fail if any of them scans a table or sorts with a temp B-tree."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verbose-plans', action='store_true', help='Print the plan of every query, not only the bad ones.')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('explain_views only understands SQLite query plans.')
+
+        factory = RequestFactory()
+        problems = []
+
+        # Bypass the fragment cache so every section runs its queries
+        with override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}):
+            for name in VIEW_NAMES:
+                path = reverse(name)
+                request = factory.get(path)
+                request.resolver_match = match = resolve(path)
+                # Views may create their default content rows; don't keep them
+                with transaction.atomic():
+                    with CaptureQueriesContext(connection) as captured:
+                        match.func(request)
+                    transaction.set_rollback(True)
+
+                self.stdout.write(self.style.MIGRATE_HEADING(f'{name} ({path}): {len(captured)} queries'))
+                for query in captured.captured_queries:
+                    sql = query['sql']
+                    with connection.cursor() as cursor:
+                        cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+                        details = [row[-1] for row in cursor.fetchall()]
+
+                    bad = [detail for detail in details if self.is_bad_step(detail)]
+                    if bad:
+                        problems.append((name, sql, bad))
+                    if bad or options['verbose_plans']:
+                        style = self.style.ERROR if bad else self.style.SUCCESS
+                        self.stdout.write(f'  {sql}')
+                        for detail in details:
+                            self.stdout.write(style(f'    {detail}'))
+
+        if problems:
+            raise CommandError(f'{len(problems)} queries are not index-backed.')
+        self.stdout.write(self.style.SUCCESS('All public view queries use indexes.'))
+
+    @staticmethod
+    def is_bad_step(detail):
+        if detail.startswith('USE TEMP B-TREE'):
+            return True
+        if detail.startswith('SCAN ') and 'INDEX' not in detail:
+            table = detail.split()[1]
+            return table not in SINGLETON_TABLES
+        return False
@@ -0,0 +1,45 @@
+# main/management/commands/import_rows.py
+import time
+
+from django.apps import apps
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from main import transfer
+
+
+class Command(BaseCommand):
+    help = (
+        'Create or update rows of a model from CSV or JSON Lines (main/transfer.py) with batched '
+        'bulk_create and UPDATE batches. Rows with the id of an existing row update it.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('model', choices=sorted(transfer.IMPORT_COLUMNS))
+        parser.add_argument('input', help='CSV or JSON Lines file.')
+        parser.add_argument('--format', choices=list(transfer.FORMATS), help='Default: from the file extension.')
+        parser.add_argument('--batch-size', type=int, default=transfer.BATCH_SIZE, help='Rows per transaction.')
+
+    def handle(self, *args, **options):
+        fmt = options['format'] or transfer.format_for(options['input'])
+        if fmt is None:
+            raise CommandError('Pass --format, or an input file ending in .csv or .jsonl.')
+        model = apps.get_model('main', options['model'])
+
+        started = time.perf_counter()
+        try:
+            with open(options['input'], 'rb') as stream:
+                result = transfer.import_rows(model, transfer.read_rows(stream, fmt), options['batch_size'])
+        except OSError as e:
+            raise CommandError(e)
+        except ValidationError as e:
+            raise CommandError(f"{' '.join(e.messages)} Earlier batches were imported.")
+        elapsed = time.perf_counter() - started
+
+        if result.ignored:
+            self.stderr.write(self.style.WARNING(f"Ignored columns: {', '.join(result.ignored)}"))
+        rows = result.created + result.updated
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {result.created:,} and updated {result.updated:,} {model._meta.verbose_name_plural} '
+            f'in {elapsed:.1f}s ({rows / max(elapsed, 1e-9):,.0f} rows/s).'
+        ))
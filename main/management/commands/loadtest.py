@@ -0,0 +1,237 @@
+# main/management/commands/loadtest.py
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from main import loadtest
+
+HOST = '127.0.0.1'
+
+# How each --stack is served: the sync views under gunicorn's sync workers,
+# the async views (main/async_views.py) under uvicorn, as in the Procfile
+STACKS = {
+    'sync': ['gunicorn', 'hotel_site.wsgi', '--bind', '{host}:{port}', '--workers', '{workers}', '--log-level', 'warning'],
+    'async': [
+        'uvicorn', 'hotel_site.asgi:application', '--host', '{host}', '--port', '{port}',
+        '--workers', '{workers}', '--log-level', 'warning', '--no-access-log',
+    ],
+}
+
+
+@contextmanager
+def use_database(path, profile=None):
+    """
+    Point the default connection at another SQLite file for the block,
+    optionally with another of settings.SQLITE_PROFILES.
+    """
+    connection.close()
+    changes = {'NAME': path, **(settings.SQLITE_PROFILES[profile] if profile else {})}
+    original = {key: connection.settings_dict.get(key) for key in changes}
+    connection.settings_dict.update(changes)
+    try:
+        yield
+    finally:
+        connection.close()
+        connection.settings_dict.update(original)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind((HOST, 0))
+        return sock.getsockname()[1]
+
+
+class Command(BaseCommand):
+    help = (
+        'Boot the site under gunicorn (or uvicorn) against a freshly seeded database, load every public '
+        'route and report latency, throughput, queries and response size against a stored baseline.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2, help='Server worker processes.')
+        parser.add_argument(
+            '--stack', choices=[*STACKS, 'both'], default='sync',
+            help='sync: WSGI views under gunicorn; async: ASGI views under uvicorn; both: compare the two.',
+        )
+        parser.add_argument('--concurrency', type=int, default=8, help='Client threads per route.')
+        parser.add_argument('--requests', type=int, default=200, help='Measured requests per route.')
+        parser.add_argument('--warmup', type=int, default=10, help='Unmeasured requests per route first.')
+        parser.add_argument('--routes', help='Comma-separated route names (default: all).')
+        parser.add_argument('--events', type=int, default=600)
+        parser.add_argument('--messages', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument(
+            '--baseline', default=str(settings.BASE_DIR / 'loadtest-baseline.json'),
+            help='Baseline report to compare against.',
+        )
+        parser.add_argument('--save-baseline', action='store_true', help='Store this run as the baseline.')
+        parser.add_argument(
+            '--tolerance', type=float, default=0.2,
+            help='Allowed relative slowdown before a route counts as regressed.',
+        )
+        parser.add_argument('--keep', action='store_true', help="Don't delete the working directory.")
+
+    def handle(self, *args, **options):
+        stacks = list(STACKS) if options['stack'] == 'both' else [options['stack']]
+        for stack in stacks:
+            server = STACKS[stack][0]
+            try:
+                __import__(server)
+            except ImportError:
+                raise CommandError(f'{server} is not installed (pip install -r requirements.txt).')
+
+        routes = loadtest.routes()
+        if options['routes']:
+            wanted = options['routes'].split(',')
+            routes = [route for route in routes if route.name in wanted]
+            if not routes:
+                raise CommandError(f"No routes named {options['routes']}.")
+
+        workdir = Path(tempfile.mkdtemp(prefix='loadtest-'))
+        env = self.server_env(workdir)
+        reports = {}
+        try:
+            self.prepare(env, options)
+            for stack in stacks:
+                port = free_port()
+                server = self.start_server(env, port, options['workers'], stack)
+                try:
+                    reports[stack] = self.run_routes(routes, port, options, stack)
+                finally:
+                    server.terminate()
+                    server.wait(timeout=30)
+        finally:
+            if options['keep']:
+                self.stdout.write(f'Working directory kept at {workdir}')
+            else:
+                shutil.rmtree(workdir, ignore_errors=True)
+
+        if len(reports) > 1:
+            self.compare_stacks(reports['sync'], reports['async'])
+        else:
+            self.check_baseline(reports[stacks[0]], options)
+
+    @staticmethod
+    def server_env(workdir):
+        """Environment for a production-like server with its database, cache and static files in ``workdir``."""
+        return {
+            **os.environ,
+            'SQLITE_PATH': str(workdir / 'db.sqlite3'),
+            'CACHE_DIR': str(workdir / 'cache'),
+            'STATIC_ROOT': str(workdir / 'static'),
+            'DEBUG': 'False',
+            'ALLOWED_HOSTS': HOST,
+            # Every POST comes from one address: keep the limiter's work, never its 429s
+            'CONTACT_RATE_IP_BURST': str(10 ** 9),
+            'CONTACT_RATE_GLOBAL_BURST': str(10 ** 9),
+        }
+
+    def prepare(self, env, options):
+        started = time.perf_counter()
+        with use_database(env['SQLITE_PATH'], env.get('SQLITE_PROFILE')):
+            call_command('migrate', verbosity=0, interactive=False)
+            loadtest.seed(random.Random(options['seed']), events=options['events'], messages=options['messages'])
+        # collectstatic reads STATIC_ROOT at startup, so it runs with the server's environment
+        subprocess.run(
+            [sys.executable, str(settings.BASE_DIR / 'manage.py'), 'collectstatic', '--noinput', '-v0'],
+            env=env, check=True,
+        )
+        self.stdout.write(f'Seeded database and collected static files in {time.perf_counter() - started:.1f}s')
+
+    def start_server(self, env, port, workers, stack='sync'):
+        args = [arg.format(host=HOST, port=port, workers=workers) for arg in STACKS[stack]]
+        name = args[0]
+        server = subprocess.Popen([sys.executable, '-m', *args], cwd=settings.BASE_DIR, env=env)
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise CommandError(f'{name} exited with status {server.returncode}.')
+            try:
+                socket.create_connection((HOST, port), timeout=1).close()
+                return server
+            except OSError:
+                time.sleep(0.2)
+        server.terminate()
+        raise CommandError(f'{name} did not start listening within 30 seconds.')
+
+    def run_routes(self, routes, port, options, stack='sync'):
+        csrf_token = loadtest.Client(HOST, port).fetch_csrf_token()
+        if not csrf_token:
+            raise CommandError('The contact page did not set a CSRF cookie.')
+
+        self.stdout.write(
+            f"\n{options['workers']} {STACKS[stack][0]} workers ({stack} views), {options['concurrency']} client threads, "
+            f"{options['requests']} requests per route\n"
+        )
+        self.stdout.write(
+            f"{'route':<16}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'queries':>9}{'bytes':>9}{'errors':>8}"
+        )
+        results = {}
+        for route in routes:
+            if options['warmup']:
+                loadtest.run_route(route, HOST, port, options['warmup'], 1, csrf_token)
+            result = loadtest.run_route(route, HOST, port, options['requests'], options['concurrency'], csrf_token)
+            results[route.name] = result
+            self.stdout.write(
+                f"{route.name:<16}{result['rps']:>9}{result['p50_ms']:>9}{result['p95_ms']:>9}{result['p99_ms']:>9}"
+                f"{result['queries'] if result['queries'] is not None else '-':>9}"
+                f"{result['bytes'] if result['bytes'] is not None else '-':>9}{result['errors']:>8}"
+            )
+
+        return {
+            'meta': {
+                'date': timezone.now().isoformat(timespec='seconds'),
+                'stack': stack,
+                **{key: options[key] for key in ('workers', 'concurrency', 'requests', 'events', 'messages', 'seed')},
+            },
+            'routes': results,
+        }
+
+    def check_baseline(self, report, options):
+        path = Path(options['baseline'])
+        if options['save_baseline']:
+            path.write_text(json.dumps(report, indent=2) + '\n')
+            self.stdout.write(self.style.SUCCESS(f'\nBaseline saved to {path}'))
+            return
+        if not path.exists():
+            self.stdout.write(f'\nNo baseline at {path}; run with --save-baseline to store this one.')
+            return
+
+        baseline = json.loads(path.read_text())
+        differing = [
+            key for key in ('stack', 'workers', 'concurrency', 'requests', 'events', 'messages')
+            # Baselines from before --stack existed were all sync
+            if baseline['meta'].get(key, 'sync' if key == 'stack' else None) != report['meta'][key]
+        ]
+        if differing:
+            self.stdout.write(self.style.WARNING(f"\nBaseline was run with different {', '.join(differing)}."))
+
+        problems = loadtest.compare(report, baseline, options['tolerance'])
+        if problems:
+            for problem in problems:
+                self.stdout.write(self.style.ERROR(f'  {problem}'))
+            raise CommandError(f'{len(problems)} regressions against the baseline from {baseline["meta"]["date"]}.')
+        self.stdout.write(self.style.SUCCESS(f'\nNo regressions against the baseline from {baseline["meta"]["date"]}.'))
+
+    def compare_stacks(self, sync, asynchronous):
+        self.stdout.write(f"\n{'route':<16}{'sync req/s':>12}{'async req/s':>13}{'sync p95':>10}{'async p95':>11}{'change':>9}")
+        for name, before in sync['routes'].items():
+            after = asynchronous['routes'][name]
+            change = (after['rps'] - before['rps']) / before['rps'] if before['rps'] else 0
+            self.stdout.write(
+                f"{name:<16}{before['rps']:>12}{after['rps']:>13}{before['p95_ms']:>10}{after['p95_ms']:>11}{change:>+9.0%}"
+            )
@@ -0,0 +1,52 @@
+# main/management/commands/publish_pages.py
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from main import publish
+
+
+class Command(BaseCommand):
+    help = (
+        'Bake the content pages to static HTML with gzip/brotli variants for publish mode '
+        '(settings.PUBLISH_PAGES). Run after each deploy, and with --loop to re-bake after midnight.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--page', action='append', choices=list(publish.PAGES),
+            help='Page to bake; repeatable (default: all of them).',
+        )
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Keep re-baking pages that are missing or from an earlier day instead of exiting.',
+        )
+        parser.add_argument('--interval', type=float, default=60, help='Seconds between passes with --loop (default 60).')
+        parser.add_argument('--prune', action='store_true', help="Delete earlier releases' pages.")
+
+    def handle(self, *args, **options):
+        if options['prune']:
+            for name in publish.prune():
+                self.stdout.write(f'Removed release {name}')
+
+        pages = options['page'] or list(publish.PAGES)
+        while True:
+            failed = self.report(pages, publish.bake(pages))
+            if not options['loop']:
+                if failed:
+                    raise CommandError(f"Could not bake {', '.join(failed)}; see the log.")
+                break
+            pages = []
+            while not pages:
+                time.sleep(options['interval'])
+                pages = publish.stale_pages()
+
+    def report(self, pages, baked):
+        for page, sizes in baked.items():
+            variants = ', '.join(f'{suffix} {size:,}' for suffix, size in sizes.items() if suffix != 'html')
+            self.stdout.write(f"{page}: {sizes['html']:,} bytes ({variants}) -> {publish.page_path(page)}")
+        failed = sorted(set(pages) - set(baked))
+        for page in failed:
+            self.stderr.write(self.style.WARNING(f'{page}: not baked, served live; see the log.'))
+        self.stdout.write(self.style.SUCCESS(f'Published {len(baked)} pages.'))
+        return failed
@@ -0,0 +1,63 @@
+# main/management/commands/purge_css.py
+import gzip
+
+from django.contrib.staticfiles import finders
+from django.core.management.base import BaseCommand, CommandError
+
+from main import bundles, csspurge
+
+
+class Command(BaseCommand):
+    help = (
+        'Report how much of each purged stylesheet survives against the templates, main.js and '
+        'forms (collectstatic writes the purged CSS into the page bundles). With --check, fail '
+        'if a purge dropped a selector the templates use.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='*', help='Static paths to report on (default: bundles.PURGED_CSS).')
+        parser.add_argument(
+            '--check', action='store_true',
+            help="Also list selectors dropped although the templates' tags have all their classes, ids "
+                 'and attributes, and exit non-zero if there are any (DEBUG serves the unpurged files).',
+        )
+
+    def handle(self, *args, **options):
+        paths = options['paths'] or sorted(bundles.PURGED_CSS)
+        used = csspurge.used_names()
+        self.stdout.write(f'{len(used)} names found in {len(csspurge.CONTENT)} files\n')
+        self.stdout.write(f"{'file':<32}{'before':>10}{'after':>10}{'gz before':>11}{'gz after':>10}{'saved':>8}")
+
+        totals = [0, 0, 0, 0]
+        removed = {}
+        for path in paths:
+            source = finders.find(path)
+            if not source:
+                raise CommandError(f"No static file '{path}'.")
+            with open(source, encoding='utf-8') as handle:
+                before = handle.read()
+            after = csspurge.purge(before, used)
+            sizes = [
+                len(before.encode()), len(after.encode()),
+                len(gzip.compress(before.encode())), len(gzip.compress(after.encode())),
+            ]
+            totals = [total + size for total, size in zip(totals, sizes)]
+            self.stdout.write(self.row(path, sizes))
+            if options['check']:
+                removed[path] = csspurge.removed_in_use(before, used)
+
+        self.stdout.write(self.style.SUCCESS(self.row('total', totals)))
+
+        if options['check']:
+            for path, selectors in removed.items():
+                for selector in selectors:
+                    self.stderr.write(f'{path}: dropped {selector}')
+            count = sum(map(len, removed.values()))
+            if count:
+                raise CommandError(f'{count} selectors used in the templates were purged.')
+            self.stdout.write(self.style.SUCCESS('No selector used in the templates was purged.'))
+
+    def row(self, name, sizes):
+        before, after, gz_before, gz_after = sizes
+        saved = 1 - after / before if before else 0
+        return f'{name:<32}{before:>10}{after:>10}{gz_before:>11}{gz_after:>10}{saved:>8.0%}'
@@ -0,0 +1,12 @@
+# main/management/commands/rebuild_event_archive.py
+from django.core.management.base import BaseCommand
+
+from main import event_archive
+
+
+class Command(BaseCommand):
+    help = 'Recount the per-month event archive (only needed after bulk edits that skip model signals).'
+
+    def handle(self, *args, **options):
+        months = event_archive.rebuild_month_counts()
+        self.stdout.write(self.style.SUCCESS(f'Counted events in {months} months.'))
@@ -0,0 +1,14 @@
+# main/management/commands/rebuild_search_index.py
+from django.core.management.base import BaseCommand, CommandError
+
+from main import search
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the site search index from rooms, events, menu, history, photos and contact messages.'
+
+    def handle(self, *args, **options):
+        if not search.available():
+            raise CommandError('Site search needs SQLite with FTS5.')
+        indexed = search.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Indexed {indexed} rows.'))
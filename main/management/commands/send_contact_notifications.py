@@ -0,0 +1,23 @@
+# main/management/commands/send_contact_notifications.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from main.outbox import send_pending
+
+
+class Command(BaseCommand):
+    help = "Email the admin about new contact messages waiting in the outbox."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Keep draining the outbox instead of exiting after one pass.')
+        parser.add_argument('--interval', type=float, default=15, help='Seconds between passes with --loop (default 15).')
+
+    def handle(self, *args, **options):
+        while True:
+            sent, failed = send_pending()
+            if sent or failed or not options['loop']:
+                self.stdout.write(f'Sent {sent} notifications, {failed} failed.')
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
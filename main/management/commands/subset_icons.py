@@ -0,0 +1,49 @@
+# main/management/commands/subset_icons.py
+from django.core.management.base import BaseCommand, CommandError
+
+from main import csspurge, iconfonts
+
+# What a modern browser downloaded before: the first format it supports in the full CSS
+FULL_FONTS = {
+    'fontawesome': 'fonts/fontawesome/fonts/fontawesome-webfont.woff2',
+    'ionicons': 'fonts/ionicons/fonts/ionicons.woff',
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Subset the Font Awesome and Ionicons webfonts to the icons used in the templates and '
+        'write static/fonts/subset/<font>.woff2 and the trimmed CSS.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Only fail if the committed subsets are missing icons the templates use.',
+        )
+
+    def handle(self, *args, **options):
+        used = csspurge.used_names()
+        if options['check']:
+            stale = [font.name for font in iconfonts.ICON_FONTS if not iconfonts.is_current(font, used)]
+            if stale:
+                raise CommandError(f"Icon subsets out of date: {', '.join(stale)}. Run manage.py subset_icons.")
+            self.stdout.write(self.style.SUCCESS('Icon subsets are up to date.'))
+            return
+
+        self.stdout.write(f"{'font':<14}{'glyphs':>8}{'css before':>12}{'css after':>11}{'font before':>13}{'font after':>12}")
+        for font in iconfonts.ICON_FONTS:
+            try:
+                glyphs = iconfonts.build(font, used)
+            except RuntimeError as exc:
+                raise CommandError(str(exc))
+            sizes = [
+                (iconfonts.STATIC_DIR / path).stat().st_size for path in (
+                    font.css, iconfonts.subset_css_path(font),
+                    FULL_FONTS[font.name], iconfonts.subset_font_path(font),
+                )
+            ]
+            self.stdout.write(f'{font.name:<14}{len(glyphs):>8}' + ''.join(
+                f'{size:>{width}}' for size, width in zip(sizes, (12, 11, 13, 12))
+            ))
+        self.stdout.write(self.style.SUCCESS(f'Wrote subsets to static/{iconfonts.SUBSET_DIR}/.'))
@@ -0,0 +1,96 @@
+# main/menu.py
+"""
+The restaurant menu, grouped by category and split into columns.
+
+All available items are read with one query, grouped in the order of
+RestaurantMenuItem.CATEGORY_CHOICES and split into the two columns the home
+page shows (first, third, fifth... item on the left). The result, with its
+JSON rendering for ``/menu.json`` and that rendering's ETag, is kept in the
+cache until a save or delete of a menu item commits (main/signals.py).
+"""
+import hashlib
+import json
+from collections import namedtuple
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.db import OperationalError, transaction
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
+
+from .models import RestaurantMenuItem
+
+MENU_KEY = 'menu:grouped'
+
+COLUMNS = ('id', 'name', 'price', 'description')
+
+Category = namedtuple('Category', 'key label items left right')
+Menu = namedtuple('Menu', 'categories etag body')
+
+
+def build(rows):
+    """A Menu from item dicts in category, name order."""
+    items = {key: [] for key, _ in RestaurantMenuItem.CATEGORY_CHOICES}
+    for row in rows:
+        # Decimals render the same in templates and keep exact in JSON as text
+        items.setdefault(row.pop('category'), []).append({**row, 'price': str(row['price'])})
+    labels = dict(RestaurantMenuItem.CATEGORY_CHOICES)
+    categories = {
+        key: Category(key, labels.get(key, key.title()), entries, entries[0::2], entries[1::2])
+        for key, entries in items.items()
+    }
+    body = json.dumps({
+        'categories': [
+            {'key': category.key, 'label': category.label, 'items': category.items,
+             'columns': [category.left, category.right]}
+            for category in categories.values()
+        ],
+    }, ensure_ascii=False, separators=(',', ':')).encode()
+    return Menu(categories, quote_etag(hashlib.sha1(body).hexdigest()[:32]), body)
+
+
+def load():
+    return build(
+        RestaurantMenuItem.objects.filter(is_available=True)
+        .order_by('category', 'name')
+        .values('category', *COLUMNS)
+    )
+
+
+def get_menu():
+    """The cached Menu, built on a miss; an empty, uncached one before migrations."""
+    menu = cache.get(MENU_KEY)
+    if menu is None:
+        try:
+            menu = load()
+        except OperationalError:
+            return build([])
+        cache.set(MENU_KEY, menu, None)
+    return menu
+
+
+async def aget_menu():
+    menu = await cache.aget(MENU_KEY)
+    if menu is None:
+        menu = await sync_to_async(get_menu)()
+    return menu
+
+
+def invalidate():
+    """
+    Drop the cached menu once the current transaction commits; dropped
+    earlier, a request could cache the old rows (and ETag) again for good.
+    """
+    transaction.on_commit(lambda: cache.delete(MENU_KEY))
+
+
+def json_response(request, menu):
+    """``menu.body``, or a 304 when the request's If-None-Match has its ETag."""
+    response = get_conditional_response(request, etag=menu.etag)
+    if response is None:
+        response = HttpResponse(menu.body, content_type='application/json')
+    response['ETag'] = menu.etag
+    # Screens may keep the menu but must check it is still current
+    patch_cache_control(response, no_cache=True)
+    return response
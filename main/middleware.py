@@ -0,0 +1,225 @@
+# main/middleware.py
+import cProfile
+import io
+import marshal
+import pstats
+from time import perf_counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from whitenoise.middleware import WhiteNoiseMiddleware
+from whitenoise.responders import MissingFileError
+
+from . import publish
+from .models import RequestProfile
+from .timing import RequestTiming, current_timing
+
+try:
+    from pyinstrument import Profiler
+except ImportError:  # optional; cProfile is used instead
+    Profiler = None
+
+# Staff trigger a profile with ?_profile=1 or an X-Profile header
+PROFILE_PARAM = '_profile'
+PROFILE_HEADER = 'HTTP_X_PROFILE'
+# Only the most recent profiles are kept
+PROFILES_KEPT = 50
+
+
+class AsyncCapableMixin:
+    """
+    Let a middleware run in both stacks: under ASGI ``__call__`` hands off to
+    ``__acall__``, instead of Django running it in a thread per request.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.handle(request)
+
+
+class ServerTimingMiddleware(AsyncCapableMixin):
+    """
+    Add a Server-Timing header with SQL time and query count, template render
+    time and total time. Keep it first in MIDDLEWARE so the total covers the
+    whole stack.
+    """
+
+    def handle(self, request):
+        timing = RequestTiming()
+        token = current_timing.set(timing)
+        started = perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            current_timing.reset(token)
+        response['Server-Timing'] = timing.header(perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        # sync_to_async copies the context, so queries and renders in worker
+        # threads still add to this timing
+        timing = RequestTiming()
+        token = current_timing.set(timing)
+        started = perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_timing.reset(token)
+        response['Server-Timing'] = timing.header(perf_counter() - started)
+        return response
+
+
+class AsyncWhiteNoiseMiddleware(WhiteNoiseMiddleware):
+    """
+    WhiteNoise, async-capable. WhiteNoise's own middleware is sync-only, which
+    makes Django run it, and every page request passing through it, through
+    an extra thread under ASGI.
+
+    In publish mode it also serves the baked pages (main/publish.py). Those
+    are looked up per request rather than indexed at startup like the static
+    files, since they are re-baked while the process runs.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, *args, **kwargs):
+        super().__init__(get_response, *args, **kwargs)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        published = self.published_file(request)
+        if published is not None:
+            return self.serve_published(published, request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        published = self.published_file(request)
+        if published is not None:
+            return self.serve_published(published, request)
+        if self.autorefresh:
+            static_file = self.find_file(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return self.serve(static_file, request)
+        return await self.get_response(request)
+
+    def published_file(self, request):
+        # Anything with a query string (events streams, ?_profile) goes to the view
+        if not publish.enabled() or request.method not in ('GET', 'HEAD') or request.META.get('QUERY_STRING'):
+            return None
+        path = publish.published_path(request.path_info)
+        if path is None:
+            return None
+        try:
+            return self.get_static_file(str(path), request.path_info)
+        except MissingFileError:
+            # Unpublished since the lookup
+            return None
+
+    def serve_published(self, static_file, request):
+        response = self.serve(static_file, request)
+        # Re-baked in place, so never cached without checking its ETag
+        response['Cache-Control'] = 'no-cache'
+        return response
+
+
+class ProfilerMiddleware(AsyncCapableMixin):
+    """
+    Profile one request for a staff user who asks for it and store the result
+    as a RequestProfile, downloadable from the admin. Must come after
+    AuthenticationMiddleware.
+
+    Under ASGI the profile is of the event loop thread, so it also samples
+    whatever other requests ran while this one was awaiting.
+    """
+
+    @staticmethod
+    def wants_profile(request):
+        # Cheap check first: most requests never parse the query string here
+        if PROFILE_PARAM not in request.META.get('QUERY_STRING', '') and PROFILE_HEADER not in request.META:
+            return False
+        return PROFILE_PARAM in request.GET or PROFILE_HEADER in request.META
+
+    def handle(self, request):
+        if not self.wants_profile(request) or not request.user.is_staff:
+            return self.get_response(request)
+
+        timing = current_timing.get()
+        queries_before = timing.queries if timing else 0
+        profiler = self.start()
+        started = perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            duration = perf_counter() - started
+            result = self.stop(profiler)
+        return self.save(request, request.user, response, duration, queries_before, *result)
+
+    async def __acall__(self, request):
+        if not self.wants_profile(request):
+            return await self.get_response(request)
+        user = await request.auser()
+        if not user.is_staff:
+            return await self.get_response(request)
+
+        timing = current_timing.get()
+        queries_before = timing.queries if timing else 0
+        profiler = self.start()
+        started = perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            duration = perf_counter() - started
+            result = self.stop(profiler)
+        return await sync_to_async(self.save)(request, user, response, duration, queries_before, *result)
+
+    @staticmethod
+    def start():
+        if Profiler is not None:
+            profiler = Profiler()
+            profiler.start()
+        else:
+            profiler = cProfile.Profile()
+            profiler.enable()
+        return profiler
+
+    @staticmethod
+    def stop(profiler):
+        """``(engine, data, summary)`` for a profiler from ``start()``."""
+        if Profiler is not None:
+            profiler.stop()
+            return 'pyinstrument', profiler.output_html().encode(), profiler.output_text(unicode=True)
+
+        profiler.disable()
+        profiler.create_stats()
+        stream = io.StringIO()
+        pstats.Stats(profiler, stream=stream).sort_stats('cumulative').print_stats(40)
+        # Same format as Profile.dump_stats(), so pstats/snakeviz can open it
+        return 'cprofile', marshal.dumps(profiler.stats), stream.getvalue()
+
+    def save(self, request, user, response, duration, queries_before, engine, data, summary):
+        timing = current_timing.get()
+        profile = RequestProfile.objects.create(
+            method=request.method, path=request.get_full_path()[:500], status_code=response.status_code,
+            duration_ms=duration * 1000, query_count=(timing.queries if timing else 0) - queries_before,
+            engine=engine, summary=summary, data=data, user=user,
+        )
+        stale = list(RequestProfile.objects.values_list('pk', flat=True)[PROFILES_KEPT:])
+        if stale:
+            RequestProfile.objects.filter(pk__in=stale).delete()
+
+        response['X-Profile-Id'] = str(profile.pk)
+        return response
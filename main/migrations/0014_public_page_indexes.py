@@ -0,0 +1,73 @@
+# Generated by Django 5.2.7 on 2026-10-18 07:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0013_contactheaderimage'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='aboutheaderimage',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['created_at'], name='aboutheader_active_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='contactheaderimage',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['created_at'], name='contacthdr_active_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='contactinfo',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['id'], name='contactinfo_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['event_date'], name='event_active_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='eventsheaderimage',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['created_at'], name='eventshdr_active_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='headerimage',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['id'], name='headerimage_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='history',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['order', 'created_at'], name='history_active_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='leadership',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['order', 'created_at'], name='leadership_active_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='photo',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['order', 'created_at'], name='photo_active_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='restaurantmenuitem',
+            index=models.Index(condition=models.Q(('is_available', True)), fields=['category', 'name'], name='menuitem_available_cat_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='roomgallery',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['created_at'], name='roomgallery_active_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='roomheaderimage',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['created_at'], name='roomheader_active_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='roomtype',
+            index=models.Index(condition=models.Q(('is_available', True)), fields=['id'], name='roomtype_available_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='specialoffer',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['id'], name='specialoffer_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='testimonial',
+            index=models.Index(condition=models.Q(('is_featured', True)), fields=['id'], name='testimonial_featured_idx'),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.7 on 2026-10-18 07:10
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0014_public_page_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contactmessage',
+            name='notification_attempts',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='contactmessage',
+            name='notification_error',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='contactmessage',
+            name='notification_next_attempt',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name='contactmessage',
+            name='notification_sent_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        # Existing messages were already handled by the old inline send_mail,
+        # so they enter the outbox as sent; only new rows default to pending.
+        migrations.AddField(
+            model_name='contactmessage',
+            name='notification_status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('sent', 'Sent'), ('failed', 'Failed')], default='sent', max_length=10),
+        ),
+        migrations.AlterField(
+            model_name='contactmessage',
+            name='notification_status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('sent', 'Sent'), ('failed', 'Failed')], default='pending', max_length=10),
+        ),
+        migrations.AddIndex(
+            model_name='contactmessage',
+            index=models.Index(condition=models.Q(('notification_status', 'pending')), fields=['notification_next_attempt'], name='contactmsg_outbox_due_idx'),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.7 on 2026-10-18 07:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0015_contactmessage_notification_outbox'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='roomtype',
+            name='unit_count',
+            field=models.PositiveIntegerField(default=1, help_text='Number of rooms of this type that can be booked'),
+        ),
+        migrations.CreateModel(
+            name='Reservation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('check_in', models.DateField()),
+                ('check_out', models.DateField()),
+                ('units', models.PositiveSmallIntegerField(default=1)),
+                ('adults', models.PositiveSmallIntegerField(default=2)),
+                ('children', models.PositiveSmallIntegerField(default=0)),
+                ('name', models.CharField(max_length=100)),
+                ('email', models.EmailField(max_length=254)),
+                ('phone', models.CharField(blank=True, max_length=20)),
+                ('status', models.CharField(choices=[('confirmed', 'Confirmed'), ('cancelled', 'Cancelled')], default='confirmed', max_length=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('room_type', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='reservations', to='main.roomtype')),
+            ],
+            options={
+                'ordering': ['-check_in'],
+                'indexes': [models.Index(fields=['check_in', 'check_out'], name='reservation_dates_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='RoomOccupancy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(help_text='First day of the month')),
+                ('nights', models.BinaryField(default=b'\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00')),
+                ('room_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='occupancy', to='main.roomtype')),
+            ],
+            options={
+                'verbose_name_plural': 'Room Occupancy',
+                'constraints': [models.UniqueConstraint(fields=('month', 'room_type'), name='roomoccupancy_month_room_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.7 on 2026-10-18 07:16
+
+from django.db import migrations, models
+
+
+def count_event_months(apps, schema_editor):
+    Event = apps.get_model('main', 'Event')
+    EventMonthCount = apps.get_model('main', 'EventMonthCount')
+    counts = {}
+    for event_date in Event.objects.filter(is_active=True).values_list('event_date', flat=True):
+        month = event_date.replace(day=1)
+        counts[month] = counts.get(month, 0) + 1
+    EventMonthCount.objects.bulk_create(
+        EventMonthCount(month=month, count=count) for month, count in counts.items()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0017_rate_calendar'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventMonthCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(unique=True)),
+                ('count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name_plural': 'Event Month Counts',
+                'ordering': ['-month'],
+            },
+        ),
+        migrations.RemoveIndex(
+            model_name='event',
+            name='event_active_date_idx',
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['event_date', 'id'], name='event_active_date_id_idx'),
+        ),
+        migrations.RunPython(count_event_months, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,72 @@
+# Generated by Django 5.2.7 on 2026-10-18 08:02
+
+from django.db import migrations
+
+# Frozen copy of main.search.SOURCES at the time of this migration:
+# kind: (rowid code, table, title SQL, body SQL, visible SQL, indexed columns)
+SOURCES = {
+    'room': (1, 'main_roomtype', '{t}.name', "{t}.category || ' ' || {t}.description || ' ' || {t}.amenities", '{t}.is_available',
+             'name, category, description, amenities, is_available'),
+    'event': (2, 'main_event', '{t}.title', '{t}.description', '{t}.is_active',
+              'title, description, is_active'),
+    'menu': (3, 'main_restaurantmenuitem', '{t}.name', "{t}.category || ' ' || {t}.description", '{t}.is_available',
+             'name, category, description, is_available'),
+    'history': (4, 'main_history', '{t}.title', "{t}.year || ' ' || {t}.description", '{t}.is_active',
+                'year, title, description, is_active'),
+    'photo': (5, 'main_photo', '{t}.title', '{t}.caption', '{t}.is_active',
+              'title, caption, is_active'),
+    'message': (6, 'main_contactmessage', '{t}.name', "{t}.email || ' ' || {t}.phone || ' ' || {t}.message", '0',
+                'name, email, phone, message'),
+}
+
+
+def forward_sql():
+    statements = [
+        "CREATE VIRTUAL TABLE main_search USING fts5("
+        "title, body, kind UNINDEXED, object_id UNINDEXED, visible UNINDEXED, "
+        "tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    ]
+    for kind, (code, table, title, body, visible, columns) in SOURCES.items():
+        def insert(t):
+            return (
+                f"INSERT INTO main_search (rowid, title, body, kind, object_id, visible) "
+                f"SELECT {t}.id * 8 + {code}, {title}, {body}, '{kind}', {t}.id, {visible}".format(t=t)
+            )
+        statements += [
+            f"{insert(table)} FROM {table}",
+            f"CREATE TRIGGER main_search_{kind}_ai AFTER INSERT ON {table} BEGIN {insert('new')}; END",
+            f"CREATE TRIGGER main_search_{kind}_ad AFTER DELETE ON {table} BEGIN "
+            f"DELETE FROM main_search WHERE rowid = old.id * 8 + {code}; END",
+            # Only text and visibility changes re-index (the outbox updates messages often)
+            f"CREATE TRIGGER main_search_{kind}_au AFTER UPDATE OF {columns} ON {table} BEGIN "
+            f"DELETE FROM main_search WHERE rowid = old.id * 8 + {code}; {insert('new')}; END",
+        ]
+    return statements
+
+
+def reverse_sql():
+    statements = []
+    for kind in SOURCES:
+        statements += [f'DROP TRIGGER IF EXISTS main_search_{kind}_{suffix}' for suffix in ('ai', 'ad', 'au')]
+    return statements + ['DROP TABLE IF EXISTS main_search']
+
+
+def run(statements):
+    def apply(apps, schema_editor):
+        # FTS5 is SQLite only; other databases go without site search
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for statement in statements():
+            schema_editor.execute(statement, params=None)
+    return apply
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0018_event_archive'),
+    ]
+
+    operations = [
+        migrations.RunPython(run(forward_sql), run(reverse_sql)),
+    ]
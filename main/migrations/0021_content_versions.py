@@ -0,0 +1,103 @@
+# Generated by Django 5.2.7 on 2026-10-18 07:58
+
+from django.db import migrations, models
+from django.utils import timezone
+
+# Every model the conditionally served pages are built from (main/versions.py)
+VERSIONED_MODELS = [
+    'AboutDescription', 'AboutHeaderImage', 'Event', 'EventsHeaderImage', 'HeaderImage', 'History',
+    'HomePageDescription', 'Leadership', 'Photo', 'RestaurantMenuItem', 'RoomGallery', 'RoomHeaderImage',
+    'RoomType', 'SpecialOffer', 'Testimonial',
+]
+
+
+def stamp_versions(apps, schema_editor):
+    ContentVersion = apps.get_model('main', 'ContentVersion')
+    now = timezone.now()
+    ContentVersion.objects.bulk_create(ContentVersion(model=name, updated_at=now) for name in VERSIONED_MODELS)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0020_request_profile'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContentVersion',
+            fields=[
+                ('model', models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ('updated_at', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name_plural': 'Content Versions',
+            },
+        ),
+        migrations.AddField(
+            model_name='aboutheaderimage',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='eventsheaderimage',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='headerimage',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='history',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='leadership',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='photo',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='restaurantmenuitem',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='roomgallery',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='roomheaderimage',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='roomtype',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='specialoffer',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='testimonial',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.RunPython(stamp_versions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 5.2.7 on 2026-10-18 08:20
+
+from django.db import migrations
+
+# 0021 added updated_at to the searchable models. SQLite adds a NOT NULL
+# column by rebuilding the table, which drops its triggers, so since then
+# rooms, events, menu items, history and photos have not been re-indexed
+# on save. Recreate every search trigger and rebuild the index.
+
+# Frozen copy of main.search.SOURCES at the time of this migration:
+# kind: (rowid code, table, title SQL, body SQL, visible SQL, indexed columns)
+SOURCES = {
+    'room': (1, 'main_roomtype', '{t}.name', "{t}.category || ' ' || {t}.description || ' ' || {t}.amenities", '{t}.is_available',
+             'name, category, description, amenities, is_available'),
+    'event': (2, 'main_event', '{t}.title', '{t}.description', '{t}.is_active',
+              'title, description, is_active'),
+    'menu': (3, 'main_restaurantmenuitem', '{t}.name', "{t}.category || ' ' || {t}.description", '{t}.is_available',
+             'name, category, description, is_available'),
+    'history': (4, 'main_history', '{t}.title', "{t}.year || ' ' || {t}.description", '{t}.is_active',
+                'year, title, description, is_active'),
+    'photo': (5, 'main_photo', '{t}.title', '{t}.caption', '{t}.is_active',
+              'title, caption, is_active'),
+    'message': (6, 'main_contactmessage', '{t}.name', "{t}.email || ' ' || {t}.phone || ' ' || {t}.message", '0',
+                'name, email, phone, message'),
+}
+
+
+def forward_sql():
+    statements = ['DELETE FROM main_search']
+    for kind, (code, table, title, body, visible, columns) in SOURCES.items():
+        def insert(t):
+            return (
+                f"INSERT INTO main_search (rowid, title, body, kind, object_id, visible) "
+                f"SELECT {t}.id * 8 + {code}, {title}, {body}, '{kind}', {t}.id, {visible}".format(t=t)
+            )
+        statements += [f'DROP TRIGGER IF EXISTS main_search_{kind}_{suffix}' for suffix in ('ai', 'ad', 'au')]
+        statements += [
+            f"{insert(table)} FROM {table}",
+            f"CREATE TRIGGER main_search_{kind}_ai AFTER INSERT ON {table} BEGIN {insert('new')}; END",
+            f"CREATE TRIGGER main_search_{kind}_ad AFTER DELETE ON {table} BEGIN "
+            f"DELETE FROM main_search WHERE rowid = old.id * 8 + {code}; END",
+            f"CREATE TRIGGER main_search_{kind}_au AFTER UPDATE OF {columns} ON {table} BEGIN "
+            f"DELETE FROM main_search WHERE rowid = old.id * 8 + {code}; {insert('new')}; END",
+        ]
+    return statements
+
+
+def apply(apps, schema_editor):
+    # FTS5 is SQLite only; other databases go without site search
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for statement in forward_sql():
+        schema_editor.execute(statement, params=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0021_content_versions'),
+    ]
+
+    operations = [
+        migrations.RunPython(apply, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.7 on 2026-10-18 08:24
+
+from django.db import migrations, models
+
+# Adding is_archived rebuilds main_contactmessage on SQLite, dropping its
+# search triggers (see 0022); recreate them. Frozen copy of the 'message'
+# entry of main.search.SOURCES.
+MESSAGE_INSERT = (
+    "INSERT INTO main_search (rowid, title, body, kind, object_id, visible) "
+    "SELECT new.id * 8 + 6, new.name, new.email || ' ' || new.phone || ' ' || new.message, 'message', new.id, 0"
+)
+MESSAGE_TRIGGERS = [
+    f"CREATE TRIGGER IF NOT EXISTS main_search_message_ai AFTER INSERT ON main_contactmessage BEGIN {MESSAGE_INSERT}; END",
+    "CREATE TRIGGER IF NOT EXISTS main_search_message_ad AFTER DELETE ON main_contactmessage BEGIN "
+    "DELETE FROM main_search WHERE rowid = old.id * 8 + 6; END",
+    "CREATE TRIGGER IF NOT EXISTS main_search_message_au AFTER UPDATE OF name, email, phone, message ON main_contactmessage BEGIN "
+    f"DELETE FROM main_search WHERE rowid = old.id * 8 + 6; {MESSAGE_INSERT}; END",
+]
+
+
+def restore_triggers(apps, schema_editor):
+    # FTS5 is SQLite only; other databases go without site search
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for statement in MESSAGE_TRIGGERS:
+        schema_editor.execute(statement, params=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0022_restore_search_triggers'),
+    ]
+
+    operations = [
+        # Runs last when unapplying, after is_archived is dropped
+        migrations.RunPython(migrations.RunPython.noop, restore_triggers),
+        migrations.AddField(
+            model_name='contactmessage',
+            name='is_archived',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddIndex(
+            model_name='contactmessage',
+            index=models.Index(fields=['is_archived', 'created_at', 'id'], name='contactmsg_inbox_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='contactmessage',
+            index=models.Index(fields=['is_archived', 'is_read', 'created_at', 'id'], name='contactmsg_inbox_read_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='contactmessage',
+            index=models.Index(fields=['notification_status', 'is_archived', 'created_at', 'id'], name='contactmsg_inbox_status_idx'),
+        ),
+        migrations.RunPython(restore_triggers, migrations.RunPython.noop),
+    ]
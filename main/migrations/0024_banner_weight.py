@@ -0,0 +1,42 @@
+# Generated by Django 5.2.7 on 2026-10-18 09:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0023_contact_inbox'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='headerimage',
+            options={'ordering': ['-created_at'], 'verbose_name_plural': 'Header Images'},
+        ),
+        migrations.AddField(
+            model_name='aboutheaderimage',
+            name='weight',
+            field=models.PositiveSmallIntegerField(default=1, help_text='Share of days this banner is shown while others are active too; 0 only as a fallback'),
+        ),
+        migrations.AddField(
+            model_name='contactheaderimage',
+            name='weight',
+            field=models.PositiveSmallIntegerField(default=1, help_text='Share of days this banner is shown while others are active too; 0 only as a fallback'),
+        ),
+        migrations.AddField(
+            model_name='eventsheaderimage',
+            name='weight',
+            field=models.PositiveSmallIntegerField(default=1, help_text='Share of days this banner is shown while others are active too; 0 only as a fallback'),
+        ),
+        migrations.AddField(
+            model_name='headerimage',
+            name='weight',
+            field=models.PositiveSmallIntegerField(default=1, help_text='Share of days this banner is shown while others are active too; 0 only as a fallback'),
+        ),
+        migrations.AddField(
+            model_name='roomheaderimage',
+            name='weight',
+            field=models.PositiveSmallIntegerField(default=1, help_text='Share of days this banner is shown while others are active too; 0 only as a fallback'),
+        ),
+    ]
@@ -1,5 +1,6 @@
 # main/models.py
 from django.db import models
+from django.utils import timezone
 
 class RoomGallery(models.Model):
     title = models.CharField(max_length=200)
@@ -8,6 +9,7 @@ class RoomGallery(models.Model):
     room_type = models.CharField(max_length=100, blank=True)
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     def __str__(self):
         return self.title
@@ -15,6 +17,11 @@ class RoomGallery(models.Model):
     class Meta:
         verbose_name_plural = "Room Gallery"
         ordering = ['-created_at']
+        # Partial indexes: Django filters booleans as a bare `WHERE "is_active"`,
+        # which SQLite only matches to an index with the same condition.
+        indexes = [
+            models.Index(fields=['created_at'], condition=models.Q(is_active=True), name='roomgallery_active_created_idx'),
+        ]
 
 class RoomType(models.Model):
     ROOM_CATEGORIES = [
@@ -31,12 +38,94 @@ class RoomType(models.Model):
     description = models.TextField()
     image = models.ImageField(upload_to='rooms/')
     amenities = models.TextField(help_text="List amenities separated by commas")
+    unit_count = models.PositiveIntegerField(default=1, help_text="Number of rooms of this type that can be booked")
     is_available = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     def __str__(self):
         return f"{self.name} - ${self.price_per_night}/night"
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['id'], condition=models.Q(is_available=True), name='roomtype_available_idx'),
+        ]
+
+class RoomOccupancy(models.Model):
+    """
+    Booked units per night for one room type and calendar month.
+
+    ``nights`` packs 31 little-endian uint16 counters (day 1 first), so a
+    date-range search reads one row per month instead of one per night.
+    Maintained by main/inventory.py; don't edit by hand.
+    """
+    room_type = models.ForeignKey(RoomType, on_delete=models.CASCADE, related_name='occupancy')
+    month = models.DateField(help_text="First day of the month")
+    nights = models.BinaryField(default=bytes(62))
+
+    def __str__(self):
+        return f"{self.room_type.name} - {self.month:%B %Y}"
+
+    class Meta:
+        verbose_name_plural = "Room Occupancy"
+        constraints = [
+            models.UniqueConstraint(fields=['month', 'room_type'], name='roomoccupancy_month_room_uniq'),
+        ]
+
+
+class RoomRate(models.Model):
+    """
+    Nightly price calendar for one room type and calendar month.
+
+    ``nights`` packs 31 little-endian uint32 prices in cents (day 1 first):
+    the base price with any active SpecialOffer applied. Maintained by
+    main/rates.py; don't edit by hand.
+    """
+    room_type = models.ForeignKey(RoomType, on_delete=models.CASCADE, related_name='rates')
+    month = models.DateField(help_text="First day of the month")
+    nights = models.BinaryField(default=bytes(124))
+
+    def __str__(self):
+        return f"{self.room_type.name} - {self.month:%B %Y}"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['month', 'room_type'], name='roomrate_month_room_uniq'),
+        ]
+
+
+class Reservation(models.Model):
+    STATUS_CHOICES = [
+        ('confirmed', 'Confirmed'),
+        ('cancelled', 'Cancelled'),
+    ]
+
+    room_type = models.ForeignKey(RoomType, on_delete=models.PROTECT, related_name='reservations')
+    check_in = models.DateField()
+    check_out = models.DateField()
+    units = models.PositiveSmallIntegerField(default=1)
+    adults = models.PositiveSmallIntegerField(default=2)
+    children = models.PositiveSmallIntegerField(default=0)
+    name = models.CharField(max_length=100)
+    email = models.EmailField()
+    phone = models.CharField(max_length=20, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='confirmed')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.name} - {self.room_type.name} ({self.check_in} to {self.check_out})"
+
+    @property
+    def nights(self):
+        return (self.check_out - self.check_in).days
+
+    class Meta:
+        ordering = ['-check_in']
+        indexes = [
+            models.Index(fields=['check_in', 'check_out'], name='reservation_dates_idx'),
+        ]
+
+
 class SpecialOffer(models.Model):
     title = models.CharField(max_length=200)
     room_type = models.ForeignKey(RoomType, on_delete=models.CASCADE)
@@ -45,12 +134,19 @@ class SpecialOffer(models.Model):
     description = models.TextField()
     image = models.ImageField(upload_to='offers/')
     is_active = models.BooleanField(default=True)
+    valid_from = models.DateField(blank=True, null=True, help_text="Leave empty to start the offer immediately")
     valid_until = models.DateField()
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     def __str__(self):
         return self.title
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['id'], condition=models.Q(is_active=True), name='specialoffer_active_idx'),
+        ]
+
 class Testimonial(models.Model):
     customer_name = models.CharField(max_length=100)
     position = models.CharField(max_length=100, blank=True)
@@ -59,23 +155,37 @@ class Testimonial(models.Model):
     rating = models.IntegerField(choices=[(i, i) for i in range(1, 6)])  # 1-5 stars
     is_featured = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     def __str__(self):
         return f"{self.customer_name} - {self.rating} stars"
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['id'], condition=models.Q(is_featured=True), name='testimonial_featured_idx'),
+        ]
+
 # NEW MODELS FOR INDEX.HTML
 class HeaderImage(models.Model):
     title = models.CharField(max_length=200)
     image = models.ImageField(upload_to='header/')
     subtitle = models.CharField(max_length=300, blank=True)
     is_active = models.BooleanField(default=True)
+    weight = models.PositiveSmallIntegerField(
+        default=1, help_text="Share of days this banner is shown while others are active too; 0 only as a fallback"
+    )
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     def __str__(self):
         return self.title
 
     class Meta:
         verbose_name_plural = "Header Images"
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['id'], condition=models.Q(is_active=True), name='headerimage_active_idx'),
+        ]
 
 class Event(models.Model):
     title = models.CharField(max_length=200)
@@ -84,12 +194,30 @@ class Event(models.Model):
     event_date = models.DateField()
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     def __str__(self):
         return self.title
 
     class Meta:
         ordering = ['-event_date']
+        indexes = [
+            # Keyset pagination walks (event_date, id) in both directions
+            models.Index(fields=['event_date', 'id'], condition=models.Q(is_active=True), name='event_active_date_id_idx'),
+        ]
+
+
+class EventMonthCount(models.Model):
+    """Active events per calendar month, kept up to date by main/signals.py."""
+    month = models.DateField(unique=True)
+    count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.month:%B %Y}: {self.count}"
+
+    class Meta:
+        ordering = ['-month']
+        verbose_name_plural = "Event Month Counts"
 
 class RestaurantMenuItem(models.Model):
     CATEGORY_CHOICES = [
@@ -104,6 +232,7 @@ class RestaurantMenuItem(models.Model):
     description = models.TextField()
     is_available = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     def __str__(self):
         return f"{self.name} - ${self.price}"
@@ -111,6 +240,9 @@ class RestaurantMenuItem(models.Model):
     class Meta:
         verbose_name_plural = "Restaurant Menu Items"
         ordering = ['category', 'name']
+        indexes = [
+            models.Index(fields=['category', 'name'], condition=models.Q(is_available=True), name='menuitem_available_cat_idx'),
+        ]
 
 
 
@@ -144,10 +276,14 @@ class Leadership(models.Model):
     order = models.PositiveIntegerField(default=0)
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         ordering = ['order', 'created_at']
         verbose_name_plural = "Leadership Team"
+        indexes = [
+            models.Index(fields=['order', 'created_at'], condition=models.Q(is_active=True), name='leadership_active_order_idx'),
+        ]
     
     def __str__(self):
         return f"{self.name} - {self.position}"
@@ -160,9 +296,13 @@ class Photo(models.Model):
     order = models.PositiveIntegerField(default=0)
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         ordering = ['order', 'created_at']
+        indexes = [
+            models.Index(fields=['order', 'created_at'], condition=models.Q(is_active=True), name='photo_active_order_idx'),
+        ]
     
     def __str__(self):
         return self.title if self.title else f"Photo {self.id}"
@@ -175,10 +315,14 @@ class History(models.Model):
     order = models.PositiveIntegerField(default=0)
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         ordering = ['order', 'created_at']
         verbose_name_plural = "History Events"
+        indexes = [
+            models.Index(fields=['order', 'created_at'], condition=models.Q(is_active=True), name='history_active_order_idx'),
+        ]
     
     def __str__(self):
         return f"{self.year} - {self.title}"
@@ -189,7 +333,11 @@ class AboutHeaderImage(models.Model):
     image = models.ImageField(upload_to='about_headers/')
     subtitle = models.CharField(max_length=300, blank=True)
     is_active = models.BooleanField(default=True)
+    weight = models.PositiveSmallIntegerField(
+        default=1, help_text="Share of days this banner is shown while others are active too; 0 only as a fallback"
+    )
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     def __str__(self):
         return self.title
@@ -197,6 +345,9 @@ class AboutHeaderImage(models.Model):
     class Meta:
         verbose_name_plural = "About Header Images"
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['created_at'], condition=models.Q(is_active=True), name='aboutheader_active_created_idx'),
+        ]
 
 
 
@@ -205,7 +356,11 @@ class EventsHeaderImage(models.Model):
     image = models.ImageField(upload_to='events_headers/')
     subtitle = models.CharField(max_length=300, blank=True)
     is_active = models.BooleanField(default=True)
+    weight = models.PositiveSmallIntegerField(
+        default=1, help_text="Share of days this banner is shown while others are active too; 0 only as a fallback"
+    )
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     def __str__(self):
         return self.title
@@ -213,6 +368,9 @@ class EventsHeaderImage(models.Model):
     class Meta:
         verbose_name_plural = "Events Header Images"
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['created_at'], condition=models.Q(is_active=True), name='eventshdr_active_created_idx'),
+        ]
 
 
 
@@ -233,14 +391,31 @@ class ContactInfo(models.Model):
     
     class Meta:
         verbose_name_plural = "Contact Information"
+        indexes = [
+            models.Index(fields=['id'], condition=models.Q(is_active=True), name='contactinfo_active_idx'),
+        ]
 
 class ContactMessage(models.Model):
+    NOTIFICATION_STATUSES = [
+        ('pending', 'Pending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+
     name = models.CharField(max_length=100)
     email = models.EmailField()
     phone = models.CharField(max_length=20, blank=True)
     message = models.TextField()
     is_read = models.BooleanField(default=False)
+    is_archived = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
+
+    # Admin email notification outbox (drained by main/outbox.py)
+    notification_status = models.CharField(max_length=10, choices=NOTIFICATION_STATUSES, default='pending')
+    notification_attempts = models.PositiveSmallIntegerField(default=0)
+    notification_next_attempt = models.DateTimeField(default=timezone.now)
+    notification_sent_at = models.DateTimeField(blank=True, null=True)
+    notification_error = models.TextField(blank=True)
     
     def __str__(self):
         return f"Message from {self.name}"
@@ -248,6 +423,18 @@ class ContactMessage(models.Model):
     class Meta:
         ordering = ['-created_at']
         verbose_name_plural = "Contact Messages"
+        indexes = [
+            models.Index(
+                fields=['notification_next_attempt'],
+                condition=models.Q(notification_status='pending'),
+                name='contactmsg_outbox_due_idx',
+            ),
+            # The admin inbox (main/inbox.py): keyset pages, newest first, of
+            # the inbox or archive, by read state or by notification status
+            models.Index(fields=['is_archived', 'created_at', 'id'], name='contactmsg_inbox_idx'),
+            models.Index(fields=['is_archived', 'is_read', 'created_at', 'id'], name='contactmsg_inbox_read_idx'),
+            models.Index(fields=['notification_status', 'is_archived', 'created_at', 'id'], name='contactmsg_inbox_status_idx'),
+        ]
 
 
 
@@ -261,7 +448,11 @@ class RoomHeaderImage(models.Model):
     image = models.ImageField(upload_to='headers/')
     subtitle = models.CharField(max_length=300, blank=True, help_text="Optional subtitle text")
     is_active = models.BooleanField(default=True)
+    weight = models.PositiveSmallIntegerField(
+        default=1, help_text="Share of days this banner is shown while others are active too; 0 only as a fallback"
+    )
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     def __str__(self):
         return self.title
@@ -269,6 +460,9 @@ class RoomHeaderImage(models.Model):
     class Meta:
         verbose_name_plural = "Room Header Images"
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['created_at'], condition=models.Q(is_active=True), name='roomheader_active_created_idx'),
+        ]
 
 
 ### home header description
@@ -352,6 +546,9 @@ class ContactHeaderImage(models.Model):
     image = models.ImageField(upload_to='contact_headers/')
     subtitle = models.CharField(max_length=300, blank=True, help_text="Optional subtitle text")
     is_active = models.BooleanField(default=True)
+    weight = models.PositiveSmallIntegerField(
+        default=1, help_text="Share of days this banner is shown while others are active too; 0 only as a fallback"
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     
     def __str__(self):
@@ -360,6 +557,49 @@ class ContactHeaderImage(models.Model):
     class Meta:
         verbose_name_plural = "Contact Header Images"
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['created_at'], condition=models.Q(is_active=True), name='contacthdr_active_created_idx'),
+        ]
+
+
+
+class RequestProfile(models.Model):
+    """A profile of one request, captured on demand by a staff user (main/middleware.py)."""
+    ENGINES = [
+        ('pyinstrument', 'pyinstrument (HTML)'),
+        ('cprofile', 'cProfile (pstats)'),
+    ]
+
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=500)
+    status_code = models.PositiveSmallIntegerField()
+    duration_ms = models.FloatField()
+    query_count = models.PositiveIntegerField()
+    engine = models.CharField(max_length=20, choices=ENGINES)
+    summary = models.TextField(blank=True)
+    data = models.BinaryField()
+    user = models.ForeignKey('auth.User', on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.method} {self.path} ({self.duration_ms:.0f} ms)"
+
+    @property
+    def filename(self):
+        extension = 'html' if self.engine == 'pyinstrument' else 'prof'
+        return f"profile-{self.pk}.{extension}"
+
+    class Meta:
+        ordering = ['-created_at']
+
 
+class ContentVersion(models.Model):
+    """When rows of a model were last saved or deleted, kept by main/signals.py (see main/versions.py)."""
+    model = models.CharField(max_length=100, primary_key=True)
+    updated_at = models.DateTimeField()
 
+    def __str__(self):
+        return f"{self.model}: {self.updated_at:%Y-%m-%d %H:%M:%S}"
 
+    class Meta:
+        verbose_name_plural = "Content Versions"
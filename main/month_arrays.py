@@ -0,0 +1,44 @@
+# main/month_arrays.py
+"""
+Helpers for per-night values packed into one row per calendar month.
+
+RoomOccupancy and RoomRate both store a month as a fixed array of 31 slots
+(day 1 first); these functions map a stay onto those slots.
+"""
+from datetime import date, timedelta
+
+MONTH_SLOTS = 31
+
+
+def month_start(day):
+    return day.replace(day=1)
+
+
+def next_month(month):
+    return date(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+
+def months_spanned(check_in, check_out):
+    """First day of every month containing one of the nights check_in..check_out-1."""
+    month, last = month_start(check_in), month_start(check_out - timedelta(days=1))
+    while month <= last:
+        yield month
+        month = next_month(month)
+
+
+def month_slice(month, first, last):
+    """Slots of ``month`` covering the nights first..last-1 (clipped to the month)."""
+    first = max(first, month)
+    last = min(last, next_month(month))
+    if last <= first:
+        return slice(0, 0)
+    return slice(first.day - 1, first.day - 1 + (last - first).days)
+
+
+def paste_month(target, check_in, month, values):
+    """Copy the part of a month's values that overlaps the stay into ``target``."""
+    offset = (month - check_in).days
+    lo = max(0, -offset)
+    hi = min(MONTH_SLOTS, len(target) - offset)
+    if lo < hi:
+        target[offset + lo:offset + hi] = values[lo:hi]
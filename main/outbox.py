@@ -0,0 +1,224 @@
+# main/outbox.py
+"""
+Contact form notification outbox.
+
+The contact view only saves the ContactMessage; its notification_* fields
+make the table a durable outbox. ``send_pending()`` drains it over a single
+SMTP connection, folding bursts into one digest email and retrying failures
+with exponential backoff. Run it from ``manage.py send_contact_notifications``.
+``asend_pending()`` does the same from the event loop for the async contact
+view, talking SMTP through aiosmtplib.
+"""
+import logging
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.utils import timezone
+
+from .models import ContactMessage
+
+try:
+    import aiosmtplib
+except ImportError:  # optional; asend_pending() then sends through Django's backend in a thread
+    aiosmtplib = None
+
+logger = logging.getLogger(__name__)
+
+SMTP_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+
+# Most messages sent in one drain
+BATCH_SIZE = 50
+# This many due messages (or more) go out as one digest instead of one email each
+DIGEST_THRESHOLD = 3
+# Retry after 1, 2, 4, ... minutes, capped at an hour, then give up
+BACKOFF_BASE = timedelta(minutes=1)
+BACKOFF_MAX = timedelta(hours=1)
+MAX_ATTEMPTS = 8
+# How long a drain holds its claimed rows before another sender may retry them
+CLAIM_LEASE = timedelta(minutes=5)
+
+
+def notification_recipients():
+    return getattr(settings, 'CONTACT_NOTIFICATION_RECIPIENTS', None) or [settings.DEFAULT_FROM_EMAIL]
+
+
+def format_message(contact_message):
+    return f'''Name: {contact_message.name}
+Email: {contact_message.email}
+Phone: {contact_message.phone or 'Not provided'}
+
+Message:
+{contact_message.message}
+
+Submitted: {timezone.localtime(contact_message.created_at).strftime("%Y-%m-%d %H:%M")}
+'''
+
+
+def build_notification(contact_message):
+    subject = f'New Contact Message from {contact_message.name} - Cinnamon Chalet'
+    body = f'''New contact form submission:
+
+{format_message(contact_message)}
+---
+This message was sent from the Cinnamon Chalet contact form.
+'''
+    return EmailMessage(
+        subject, body, settings.DEFAULT_FROM_EMAIL, notification_recipients(),
+        reply_to=[contact_message.email],
+    )
+
+
+def build_digest(contact_messages):
+    subject = f'{len(contact_messages)} New Contact Messages - Cinnamon Chalet'
+    parts = [
+        f'#{number}\n{format_message(contact_message)}'
+        for number, contact_message in enumerate(contact_messages, start=1)
+    ]
+    body = (
+        f'{len(contact_messages)} contact form submissions:\n\n'
+        + '\n---\n\n'.join(parts)
+        + '\n---\nThis digest was sent from the Cinnamon Chalet contact form.\n'
+    )
+    return EmailMessage(subject, body, settings.DEFAULT_FROM_EMAIL, notification_recipients())
+
+
+def backoff(attempts):
+    return min(BACKOFF_BASE * 2 ** (attempts - 1), BACKOFF_MAX)
+
+
+def claim_due(now=None, limit=BATCH_SIZE):
+    """
+    Reserve up to ``limit`` due messages for this sender.
+
+    Pushing notification_next_attempt to a lease time unique to this call
+    means a concurrent sender can't pick the same rows.
+    """
+    now = now or timezone.now()
+    due = ContactMessage.objects.filter(
+        notification_status='pending', notification_next_attempt__lte=now,
+    ).order_by('notification_next_attempt', 'pk').values_list('pk', flat=True)[:limit]
+    pks = list(due)
+    if not pks:
+        return []
+
+    lease = now + CLAIM_LEASE
+    ContactMessage.objects.filter(
+        pk__in=pks, notification_status='pending', notification_next_attempt__lte=now,
+    ).update(notification_next_attempt=lease)
+    return list(
+        ContactMessage.objects.filter(pk__in=pks, notification_next_attempt=lease).order_by('created_at', 'pk')
+    )
+
+
+def mark_sent(contact_messages, now):
+    ContactMessage.objects.filter(pk__in=[m.pk for m in contact_messages]).update(
+        notification_status='sent', notification_sent_at=now, notification_error='',
+    )
+
+
+def mark_failed(contact_messages, error, now):
+    for contact_message in contact_messages:
+        attempts = contact_message.notification_attempts + 1
+        ContactMessage.objects.filter(pk=contact_message.pk).update(
+            notification_status='pending' if attempts < MAX_ATTEMPTS else 'failed',
+            notification_attempts=attempts,
+            notification_next_attempt=now + backoff(attempts),
+            notification_error=str(error)[:1000],
+        )
+
+
+def notification_groups(batch):
+    """``(email, contact_messages)`` pairs to send for a claimed batch."""
+    if len(batch) >= DIGEST_THRESHOLD:
+        return [(build_digest(batch), batch)]
+    return [(build_notification(m), [m]) for m in batch]
+
+
+def send_pending(connection=None):
+    """
+    Send every due notification. Returns ``(sent, failed)`` message counts.
+
+    All emails of one drain share a single SMTP connection.
+    """
+    now = timezone.now()
+    batch = claim_due(now)
+    if not batch:
+        return 0, 0
+
+    groups = notification_groups(batch)
+
+    sent = failed = 0
+    connection = connection or get_connection(fail_silently=False)
+    try:
+        connection.open()
+    except Exception as e:
+        logger.warning('Could not connect to the mail server: %s', e)
+        mark_failed(batch, e, now)
+        return 0, len(batch)
+
+    try:
+        for email, contact_messages in groups:
+            try:
+                connection.send_messages([email])
+            except Exception as e:
+                logger.warning('Contact notification failed: %s', e)
+                mark_failed(contact_messages, e, now)
+                failed += len(contact_messages)
+            else:
+                mark_sent(contact_messages, now)
+                sent += len(contact_messages)
+    finally:
+        connection.close()
+    return sent, failed
+
+
+async def asend_pending():
+    """
+    ``send_pending()`` without blocking the event loop: the SMTP conversation
+    goes through aiosmtplib, the outbox updates through sync_to_async.
+
+    Falls back to ``send_pending()`` in a thread when aiosmtplib isn't
+    installed or EMAIL_BACKEND isn't SMTP (console, locmem in tests).
+    """
+    if aiosmtplib is None or settings.EMAIL_BACKEND != SMTP_BACKEND:
+        return await sync_to_async(send_pending, thread_sensitive=False)()
+
+    now = timezone.now()
+    batch = await sync_to_async(claim_due)(now)
+    if not batch:
+        return 0, 0
+    groups = notification_groups(batch)
+
+    smtp = aiosmtplib.SMTP(
+        hostname=settings.EMAIL_HOST, port=settings.EMAIL_PORT, timeout=settings.EMAIL_TIMEOUT,
+        use_tls=settings.EMAIL_USE_SSL, start_tls=settings.EMAIL_USE_TLS,
+    )
+    try:
+        await smtp.connect()
+        if settings.EMAIL_HOST_USER and settings.EMAIL_HOST_PASSWORD:
+            await smtp.login(settings.EMAIL_HOST_USER, settings.EMAIL_HOST_PASSWORD)
+    except Exception as e:
+        logger.warning('Could not connect to the mail server: %s', e)
+        await sync_to_async(mark_failed)(batch, e, now)
+        return 0, len(batch)
+
+    sent = failed = 0
+    try:
+        for email, contact_messages in groups:
+            try:
+                await smtp.send_message(email.message(), sender=email.from_email, recipients=email.recipients())
+            except Exception as e:
+                logger.warning('Contact notification failed: %s', e)
+                await sync_to_async(mark_failed)(contact_messages, e, now)
+                failed += len(contact_messages)
+            else:
+                await sync_to_async(mark_sent)(contact_messages, now)
+                sent += len(contact_messages)
+    finally:
+        try:
+            await smtp.quit()
+        except aiosmtplib.SMTPException:
+            pass
+    return sent, failed
@@ -0,0 +1,197 @@
+# main/publish.py
+"""
+Publish mode: the content pages baked to static, precompressed HTML.
+
+``bake()`` renders home, rooms, about and events through their views and
+writes each, with gzip and brotli variants, to
+``PUBLISH_ROOT/<release>/<path>/index.html``. With settings.PUBLISH_PAGES
+on, a save or delete of a model a page is built from re-bakes just the
+pages it appears on, once the transaction commits (main/signals.py), and
+AsyncWhiteNoiseMiddleware serves the baked files to plain GETs, so they
+never reach a view. Query strings, POSTs and every other path still do.
+A front proxy can serve ``PUBLISH_ROOT/current`` the same way
+(``try_files $uri/index.html``).
+
+The offers, the events streams and the booking widget also change with
+the date, so a page baked before today is not served;
+``manage.py publish_pages --loop`` re-bakes them after midnight. Bakes of
+another release (an older deploy) are never served either.
+"""
+import gzip
+import logging
+import os
+import shutil
+from datetime import datetime, time
+from functools import cache
+from pathlib import Path
+
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.db import transaction
+from django.test import RequestFactory
+from django.urls import resolve, reverse
+from django.utils import timezone
+
+from . import versions
+
+try:
+    import brotli
+except ImportError:  # optional; only the gzip variant is written
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Pages (URL names) that are baked, with the models they are built from
+PAGES = versions.PAGES
+
+INDEX_FILE = 'index.html'
+
+# Pages whose models changed in a transaction that hasn't committed yet
+_pending = set()
+
+
+def enabled():
+    return settings.PUBLISH_PAGES
+
+
+@cache
+def page_urls():
+    """URL -> page, for the pages that are baked."""
+    return {reverse(page): page for page in PAGES}
+
+
+def release_dir():
+    return Path(settings.PUBLISH_ROOT) / versions.release()[:12]
+
+
+def page_path(page):
+    return release_dir() / reverse(page).lstrip('/') / INDEX_FILE
+
+
+def pages_for_model(model_name):
+    return [page for page, names in PAGES.items() if model_name in names]
+
+
+def today_started():
+    return timezone.make_aware(datetime.combine(timezone.localdate(), time.min)).timestamp()
+
+
+def published_path(url):
+    """The baked file to serve for ``url``, or None to let the view render it."""
+    page = page_urls().get(url)
+    if page is None:
+        return None
+    path = page_path(page)
+    try:
+        if path.stat().st_mtime < today_started():
+            return None
+    except FileNotFoundError:
+        return None
+    return path
+
+
+def render(page):
+    """The page's HTML, rendered by its view as for an anonymous visitor."""
+    url = reverse(page)
+    request = RequestFactory().get(url, secure=True)
+    request.user = AnonymousUser()
+    request.resolver_match = match = resolve(url)
+    view = async_to_sync(match.func) if iscoroutinefunction(match.func) else match.func
+    response = view(request, *match.args, **match.kwargs)
+    if response.status_code != 200:
+        raise RuntimeError(f'{url} returned {response.status_code}')
+    return response.content
+
+
+def write_atomic(path, content):
+    temporary = path.with_name(f'.{path.name}.tmp')
+    temporary.write_bytes(content)
+    os.replace(temporary, path)
+
+
+def write(path, html):
+    """Write ``html`` and its compressed variants; returns their sizes."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    sizes = {'html': len(html)}
+    # Variants first: a request in between gets the old page, never a mix
+    variants = {'gz': gzip.compress(html, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants['br'] = brotli.compress(html, quality=11)
+    for suffix, content in variants.items():
+        write_atomic(path.with_name(f'{path.name}.{suffix}'), content)
+        sizes[suffix] = len(content)
+    write_atomic(path, html)
+    return sizes
+
+
+def unpublish(page):
+    path = page_path(page)
+    for variant in (path, path.with_name(f'{path.name}.gz'), path.with_name(f'{path.name}.br')):
+        variant.unlink(missing_ok=True)
+
+
+def point_current():
+    """Point PUBLISH_ROOT/current, the front proxy's root, at this release."""
+    current = Path(settings.PUBLISH_ROOT) / 'current'
+    temporary = current.with_name('.current.tmp')
+    temporary.unlink(missing_ok=True)
+    temporary.symlink_to(release_dir().name)
+    os.replace(temporary, current)
+
+
+def bake(pages=None):
+    """Bake ``pages`` (default: all); returns the sizes written per page."""
+    baked = {}
+    for page in pages or PAGES:
+        try:
+            baked[page] = write(page_path(page), render(page))
+        except Exception:
+            # Serve it live rather than an outdated copy
+            logger.exception('Could not bake the %s page', page)
+            unpublish(page)
+    if baked:
+        point_current()
+    return baked
+
+
+def stale_pages():
+    """Pages missing from this release or baked before today."""
+    started = today_started()
+    stale = []
+    for page in PAGES:
+        try:
+            if page_path(page).stat().st_mtime < started:
+                stale.append(page)
+        except FileNotFoundError:
+            stale.append(page)
+    return stale
+
+
+def prune():
+    """Delete the bakes of other releases; returns the directories removed."""
+    root = Path(settings.PUBLISH_ROOT)
+    keep = release_dir().name
+    removed = []
+    for directory in root.iterdir() if root.is_dir() else []:
+        if directory.is_dir() and not directory.is_symlink() and directory.name != keep:
+            shutil.rmtree(directory)
+            removed.append(directory.name)
+    return removed
+
+
+def schedule(model_name):
+    """Re-bake the pages built from ``model_name`` once the current transaction commits."""
+    pages = pages_for_model(model_name)
+    if not enabled() or not pages:
+        return
+    _pending.update(pages)
+    transaction.on_commit(bake_pending)
+
+
+def bake_pending():
+    pages = set()
+    while _pending:
+        pages.add(_pending.pop())
+    if pages:
+        bake(sorted(pages))
@@ -0,0 +1,209 @@
+# main/ratelimit.py
+"""
+Token-bucket rate limits for the contact form.
+
+Each POST takes a token from its client's bucket and from one bucket shared
+by the whole site (settings.CONTACT_RATE_LIMITS). A bucket holds up to
+``burst`` tokens and refills at ``per_minute``; when either is empty the
+POST is answered 429 with Retry-After before the form is even parsed, so a
+burst of spam costs neither SQLite writes nor outbox sends.
+
+The buckets live in the 'ratelimit' cache, so every worker enforces the
+same budgets: one entry per client bucket plus the global one, each
+expiring once its bucket would have refilled, so an accepted POST reads
+and writes just its own two entries. The file cache has no atomic update,
+so the read-modify-write runs under an flock on a file next to its
+entries, and so does the count of rejections per bucket (``rejections()``,
+``manage.py contact_rate_limits``). ``manage.py bench_rate_limit``
+measures what the check adds to an accepted POST.
+"""
+import logging
+import math
+import os
+import random
+import time
+from collections import Counter, namedtuple
+from contextlib import contextmanager
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.filebased import FileBasedCache
+from django.http import HttpResponse
+
+try:
+    import fcntl
+except ImportError:  # optional; without it concurrent workers may overspend a bucket slightly
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+CACHE_ALIAS = 'ratelimit'
+
+KEY_PREFIX = 'ratelimit:contact'
+
+# BucketCache sweeps out expired entries on about one write in this many
+SWEEP_EVERY = 100
+
+Limit = namedtuple('Limit', 'burst rate')  # rate in tokens per second
+Decision = namedtuple('Decision', 'allowed retry_after bucket')
+
+# Rejections by this worker process, per bucket
+stats = Counter()
+
+
+class BucketCache(FileBasedCache):
+    """
+    The file cache, for the 'ratelimit' alias. Its entries expire by
+    themselves once a bucket has refilled (only the few rejection counts
+    are kept for good), so rather than list the whole directory on every
+    write to cull random entries past MAX_ENTRIES, which cost more than the
+    rest of an accepted POST, a sample of writes deletes the expired ones.
+    """
+
+    def _cull(self):
+        if random.random() * SWEEP_EVERY >= 1:
+            return
+        for name in self._list_cache_files():
+            try:
+                with open(name, 'rb') as handle:
+                    self._is_expired(handle)
+            except FileNotFoundError:
+                continue
+
+
+def rate_cache():
+    return caches[CACHE_ALIAS]
+
+
+def client_ip(request):
+    """The client's address, as seen by the outermost of our RATELIMIT_PROXY_HOPS proxies."""
+    hops = settings.RATELIMIT_PROXY_HOPS
+    forwarded = request.META.get('HTTP_X_FORWARDED_FOR')
+    if hops and forwarded:
+        # Entries left of the ones our proxies appended are the client's say-so
+        addresses = [address.strip() for address in forwarded.split(',')]
+        return addresses[max(len(addresses) - hops, 0)]
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def limits():
+    """Bucket name -> Limit, for the limits that are on (a zero burst turns one off)."""
+    return {
+        name: Limit(limit['burst'], limit['per_minute'] / 60)
+        for name, limit in settings.CONTACT_RATE_LIMITS.items() if limit['burst']
+    }
+
+
+def refill(limit, stored, now):
+    """Tokens in a bucket stored as ``(tokens, stamp)``; None is a full one."""
+    if stored is None:
+        return limit.burst
+    tokens, stamp = stored
+    return min(limit.burst, tokens + max(now - stamp, 0) * limit.rate)
+
+
+@contextmanager
+def locked(cache):
+    directory = getattr(cache, '_dir', None)
+    if fcntl is None or directory is None:
+        yield
+        return
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, 'ratelimit.lock'), 'a') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def bucket_key(name, ip):
+    """The cache key of bucket ``name`` ('ip' or 'global') for a POST from ``ip``."""
+    return f'{KEY_PREFIX}:ip:{ip}' if name == 'ip' else f'{KEY_PREFIX}:{name}'
+
+
+def rejection_key(bucket_name):
+    return f'{KEY_PREFIX}:rejected:{bucket_name}'
+
+
+def count_rejection(cache, bucket_name):
+    """Add one to the rejections of ``bucket_name``; call with the lock held."""
+    stats[bucket_name] += 1
+    key = rejection_key(bucket_name)
+    cache.set(key, cache.get(key, 0) + 1, timeout=None)
+
+
+def take(ip, now=None):
+    """Take a token from the ``ip`` and global buckets, or from neither if one is empty."""
+    active = limits()
+    if not active:
+        return Decision(True, 0, None)
+    cache = rate_cache()
+    now = time.time() if now is None else now
+    keys = {name: bucket_key(name, ip) for name in active}
+    with locked(cache):
+        stored = cache.get_many(keys.values())
+        levels = {name: refill(limit, stored.get(keys[name]), now) for name, limit in active.items()}
+        empty = [name for name in active if levels[name] < 1]
+        if empty:
+            # Longest wait for an empty bucket to refill one token
+            wait, name = max(((1 - levels[name]) / active[name].rate, name) for name in empty)
+            count_rejection(cache, name)
+            return Decision(False, wait, name)
+
+        for name, limit in active.items():
+            tokens = levels[name] - 1
+            # A bucket that has refilled reads the same as no entry, so the
+            # entry needn't outlive that and idle clients take no space
+            cache.set(keys[name], (tokens, now), timeout=math.ceil((limit.burst - tokens) / limit.rate))
+    return Decision(True, 0, None)
+
+
+def rejections():
+    """Rejected POSTs per bucket, across all workers since the last reset."""
+    cache = rate_cache()
+    counts = cache.get_many([rejection_key(name) for name in settings.CONTACT_RATE_LIMITS])
+    return {name: counts.get(rejection_key(name), 0) for name in settings.CONTACT_RATE_LIMITS}
+
+
+def reset_rejections():
+    cache = rate_cache()
+    with locked(cache):
+        cache.delete_many([rejection_key(name) for name in settings.CONTACT_RATE_LIMITS])
+
+
+def check(request):
+    """A 429 response if ``request`` is over a limit, else None (and a token is spent)."""
+    ip = client_ip(request)
+    decision = take(ip)
+    if decision.allowed:
+        return None
+    logger.info('Contact POST from %s over the %s rate limit', ip, decision.bucket)
+    response = HttpResponse(
+        'Too many messages. Please try again shortly.', status=429, content_type='text/plain; charset=utf-8',
+    )
+    response['Retry-After'] = str(math.ceil(decision.retry_after))
+    return response
+
+
+def rate_limited_posts(view):
+    """Apply the contact rate limits to POSTs to ``view``; sync and async views."""
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def inner(request, *args, **kwargs):
+            if request.method == 'POST':
+                limited = await sync_to_async(check)(request)
+                if limited is not None:
+                    return limited
+            return await view(request, *args, **kwargs)
+    else:
+        @wraps(view)
+        def inner(request, *args, **kwargs):
+            if request.method == 'POST':
+                limited = check(request)
+                if limited is not None:
+                    return limited
+            return view(request, *args, **kwargs)
+    return inner
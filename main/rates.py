@@ -0,0 +1,155 @@
+# main/rates.py
+"""
+Nightly rate calendar.
+
+RoomRate rows hold the price of every night for one room type and month: the
+base ``price_per_night``, lowered by any active SpecialOffer whose validity
+window covers that night. Saving a room type or offer rebuilds only the
+months it can affect (see main/signals.py), and a stay is quoted for every
+room type at once with a numpy sum over the calendar.
+
+The calendar covers HORIZON_DAYS from the start of the current month. Each
+new month, the first search in every process rolls it forward
+(``ensure_horizon()``): the months that came into the horizon are built
+and the past ones deleted. ``manage.py build_rate_calendar --roll-forward``
+does the same from a scheduled job.
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Max, Q
+from django.utils import timezone
+
+from .models import RoomRate, RoomType, SpecialOffer
+from .month_arrays import MONTH_SLOTS, month_slice, month_start, months_spanned, next_month, paste_month
+
+RATE_DTYPE = np.dtype('<u4')
+# How far ahead of the current month the calendar is materialized;
+# stays beyond it are priced on the fly
+HORIZON_DAYS = 548
+
+# First month of the horizon this process last rolled the calendar to
+_rolled_to = None
+
+
+def to_cents(amount):
+    return int((Decimal(amount) * 100).to_integral_value())
+
+
+def horizon():
+    start = month_start(timezone.localdate())
+    return start, start + timedelta(days=HORIZON_DAYS)
+
+
+def active_offers(room_type_id, first, last):
+    """Active offers for the room type whose window overlaps the nights first..last-1."""
+    return list(
+        SpecialOffer.objects.filter(room_type_id=room_type_id, is_active=True, valid_until__gte=first)
+        .filter(Q(valid_from__isnull=True) | Q(valid_from__lt=last))
+        .only('discounted_price', 'valid_from', 'valid_until')
+    )
+
+
+def month_prices(room_type, month, offers):
+    """Price in cents of each night of ``month``."""
+    prices = np.full(MONTH_SLOTS, to_cents(room_type.price_per_night), dtype=RATE_DTYPE)
+    for offer in offers:
+        span = month_slice(month, offer.valid_from or month, offer.valid_until + timedelta(days=1))
+        prices[span] = np.minimum(prices[span], to_cents(offer.discounted_price))
+    return prices
+
+
+def rebuild(room_type, first=None, last=None):
+    """
+    Rewrite the calendar of ``room_type`` for the months overlapping the
+    nights first..last-1 (the whole horizon by default). Returns the number
+    of months written.
+    """
+    start, end = horizon()
+    first = max(first or start, start)
+    last = min(last or end, end)
+    if last <= first:
+        return 0
+
+    months = list(months_spanned(first, last))
+    offers = active_offers(room_type.pk, months[0], next_month(months[-1]))
+    with transaction.atomic():
+        RoomRate.objects.filter(room_type=room_type, month__in=months).delete()
+        RoomRate.objects.bulk_create(
+            RoomRate(room_type=room_type, month=month, nights=month_prices(room_type, month, offers).tobytes())
+            for month in months
+        )
+    return len(months)
+
+
+def rebuild_offer_window(room_type_id, valid_from, valid_until):
+    """Rebuild the nights an offer covers (or covered, before an edit)."""
+    room_type = RoomType.objects.filter(pk=room_type_id).first()
+    if room_type:
+        rebuild(room_type, valid_from, valid_until + timedelta(days=1))
+
+
+def rebuild_all():
+    return sum(rebuild(room_type) for room_type in RoomType.objects.all())
+
+
+def roll_forward():
+    """
+    Build the months that came into the horizon since each room type's
+    calendar was written and delete the months before the current one.
+    Returns the number of months written.
+    """
+    start, end = horizon()
+    last = month_start(end - timedelta(days=1))
+    RoomRate.objects.filter(month__lt=start).delete()
+    newest = dict(
+        RoomRate.objects.values('room_type').annotate(newest=Max('month')).values_list('room_type', 'newest')
+    )
+    written = 0
+    for room_type in RoomType.objects.all():
+        if room_type.pk not in newest:
+            written += rebuild(room_type)
+        elif newest[room_type.pk] < last:
+            written += rebuild(room_type, next_month(newest[room_type.pk]))
+    return written
+
+
+def ensure_horizon():
+    """Roll the calendar forward if this process hasn't yet this month; no queries after that."""
+    global _rolled_to
+    start = month_start(timezone.localdate())
+    if _rolled_to != start:
+        roll_forward()
+        _rolled_to = start
+
+
+def quote(check_in, check_out, room_types):
+    """Total price of the stay for each room type, keyed by room type id."""
+    months = list(months_spanned(check_in, check_out))
+    row_of = {room_type.pk: row for row, room_type in enumerate(room_types)}
+    prices = np.zeros((len(room_types), (check_out - check_in).days), dtype=RATE_DTYPE)
+
+    covered = set()
+    rates = RoomRate.objects.filter(
+        room_type_id__in=list(row_of), month__gte=months[0], month__lte=months[-1],
+    ).values_list('room_type_id', 'month', 'nights')
+    for room_type_id, month, blob in rates:
+        paste_month(prices[row_of[room_type_id]], check_in, month, np.frombuffer(blob, dtype=RATE_DTYPE))
+        covered.add((room_type_id, month))
+
+    # Months outside the materialized calendar
+    for room_type in room_types:
+        missing = [month for month in months if (room_type.pk, month) not in covered]
+        if missing:
+            offers = active_offers(room_type.pk, missing[0], next_month(missing[-1]))
+            for month in missing:
+                paste_month(prices[row_of[room_type.pk]], check_in, month, month_prices(room_type, month, offers))
+
+    return {pk: total_price(prices[row]) for pk, row in row_of.items()}
+
+
+def total_price(prices):
+    """The sum of nightly ``prices`` in cents, as a Decimal amount."""
+    return Decimal(int(prices.sum(dtype=np.int64))).scaleb(-2)
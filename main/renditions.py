@@ -0,0 +1,179 @@
+# main/renditions.py
+"""
+Resized WebP/AVIF copies of uploaded images.
+
+Every ImageField upload gets one rendition per width and format, stored next
+to the media files under ``renditions/``. Renditions are recompressed and
+carry no EXIF data. See main/templatetags/images.py for the template side.
+
+A save schedules its renditions once the transaction commits, and one
+background thread per process builds them, so the admin save doesn't wait
+on the encoders. Until they are written the templates show the original.
+Replacing or deleting an upload deletes its renditions the same way.
+``manage.py build_renditions`` catches up on any a restart dropped.
+"""
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.db import models, transaction
+from PIL import Image, ImageOps, features
+
+logger = logging.getLogger(__name__)
+
+RENDITION_DIR = 'renditions'
+RENDITION_WIDTHS = (480, 960, 1600)
+RENDITION_QUALITY = {'avif': 55, 'webp': 80}
+# Best compression first
+RENDITION_FORMATS = ('avif', 'webp')
+
+_executor = None
+
+
+def rendition_formats():
+    """The formats this Pillow can write (AVIF needs libavif)."""
+    return [fmt for fmt in RENDITION_FORMATS if fmt != 'avif' or features.check('avif')]
+
+
+def rendition_name(name, width, fmt):
+    stem, _ = os.path.splitext(name)
+    return f'{RENDITION_DIR}/{stem}-{width}w.{fmt}'
+
+
+def has_renditions(fieldfile, fmt='webp'):
+    """Renditions are written smallest first, so the largest marks a full set of ``fmt``."""
+    return fieldfile.storage.exists(rendition_name(fieldfile.name, RENDITION_WIDTHS[-1], fmt))
+
+
+def available_formats(fieldfile):
+    """The formats ``fieldfile`` has a full set of renditions in, best first."""
+    return [fmt for fmt in RENDITION_FORMATS if has_renditions(fieldfile, fmt)]
+
+
+def image_fields(model):
+    return [field for field in model._meta.get_fields() if isinstance(field, models.ImageField)]
+
+
+def generate_renditions(fieldfile, force=False):
+    """
+    Write every width/format rendition of ``fieldfile``.
+
+    Images narrower than a target width are recompressed at their own size
+    rather than upscaled. Returns the names written.
+    """
+    formats = rendition_formats()
+    if not fieldfile or (not force and all(has_renditions(fieldfile, fmt) for fmt in formats)):
+        return []
+
+    storage = fieldfile.storage
+    with storage.open(fieldfile.name, 'rb') as source:
+        original = Image.open(source)
+        original = ImageOps.exif_transpose(original)
+        original.load()
+
+    mode = 'RGBA' if original.mode in ('RGBA', 'LA', 'P') else 'RGB'
+    original = original.convert(mode)
+
+    written = []
+    for width in RENDITION_WIDTHS:
+        if original.width > width:
+            height = round(original.height * width / original.width)
+            resized = original.resize((width, height), Image.LANCZOS)
+        else:
+            resized = original.copy()
+        resized.info.clear()
+
+        for fmt in formats:
+            buffer = BytesIO()
+            resized.save(buffer, fmt.upper(), quality=RENDITION_QUALITY[fmt])
+            name = rendition_name(fieldfile.name, width, fmt)
+            if storage.exists(name):
+                storage.delete(name)
+            written.append(storage.save(name, ContentFile(buffer.getvalue())))
+    return written
+
+
+def delete_renditions(storage, name):
+    """Delete every rendition of the upload ``name``; returns the names deleted."""
+    deleted = []
+    for width in RENDITION_WIDTHS:
+        for fmt in RENDITION_FORMATS:
+            rendition = rendition_name(name, width, fmt)
+            if storage.exists(rendition):
+                storage.delete(rendition)
+                deleted.append(rendition)
+    return deleted
+
+
+def generate_fieldfile_renditions(fieldfile, force=False):
+    try:
+        return generate_renditions(fieldfile, force=force)
+    except (OSError, ValueError) as e:
+        # A broken or missing upload shouldn't fail anything; templates
+        # fall back to the original file.
+        logger.warning('Could not build renditions for %s: %s', fieldfile.name, e)
+        return []
+
+
+def executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='renditions')
+    return _executor
+
+
+def run_in_background(function, *args):
+    """Run ``function`` on the renditions thread once the current transaction commits."""
+    transaction.on_commit(lambda: executor().submit(function, *args))
+
+
+def replaced_uploads(instance):
+    """``(storage, name)`` of the saved uploads that ``instance``'s image fields no longer hold."""
+    fields = image_fields(type(instance))
+    if not fields or instance.pk is None:
+        return []
+    previous = type(instance)._default_manager.filter(pk=instance.pk).values(*[field.name for field in fields]).first()
+    if not previous:
+        return []
+    return [
+        (field.storage, previous[field.name]) for field in fields
+        if previous[field.name] and previous[field.name] != getattr(instance, field.name).name
+    ]
+
+
+def schedule(instance, stale=(), on_built=None):
+    """
+    Build the renditions of ``instance``'s uploads in the background once
+    the transaction commits, after deleting those of the ``stale``
+    ``(storage, name)`` uploads. ``on_built`` runs if anything was written.
+    """
+    fieldfiles = [getattr(instance, field.name) for field in image_fields(type(instance))]
+    fieldfiles = [fieldfile for fieldfile in fieldfiles if fieldfile]
+    if fieldfiles or stale:
+        run_in_background(build_scheduled, fieldfiles, list(stale), on_built)
+
+
+def schedule_deletion(instance):
+    """Delete the renditions of a deleted ``instance``'s uploads once the transaction commits."""
+    stale = [
+        (field.storage, getattr(instance, field.name).name)
+        for field in image_fields(type(instance)) if getattr(instance, field.name)
+    ]
+    if stale:
+        run_in_background(build_scheduled, [], stale, None)
+
+
+def build_scheduled(fieldfiles, stale, on_built):
+    # Nothing waits on the thread's result, so failures are only logged
+    try:
+        for storage, name in stale:
+            delete_renditions(storage, name)
+        written = [name for fieldfile in fieldfiles for name in generate_fieldfile_renditions(fieldfile)]
+        if written and on_built is not None:
+            on_built()
+    except Exception:
+        logger.exception('Could not update renditions')
+        return []
+    return written
@@ -0,0 +1,294 @@
+# main/resize.py
+"""
+Uploaded images resized, cropped and converted on request.
+
+``/media/r/<spec>/<path>`` serves the media file ``path`` at ``spec``, e.g.
+``600x400-crop-webp-<signature>``: width x height (0 for either leaves it to
+the aspect ratio when fitting), ``fit`` inside the box or ``crop`` to fill
+it, and the output format. The signature is an HMAC of the rest and the
+path under SECRET_KEY, so only what the templates produced
+(``{% resized_url %}``, ``{% resized_image %}``) is served: a client can
+neither have the server render arbitrary sizes nor move a spec onto
+another upload. Images are never upscaled.
+
+Outputs are kept under settings.RESIZE_CACHE_ROOT, named by the spec, the
+path and the upload's size and modification time, so a replaced upload is
+resized again. A served output's mtime is bumped. Once a worker has written
+SCAN_EVERY of settings.RESIZE_CACHE_MAX_BYTES since it last looked (and on
+its first write), it walks the cache and deletes the least recently served
+outputs until it is back under the limit. A walk on every write took as
+long as the resize itself (31 ms at 5,000 files), so in between the cache
+may run over by that much per worker. Concurrent requests for the same
+output, from any worker on the host, wait on one flock and the first one
+resizes; the rest serve its file.
+"""
+import hashlib
+import logging
+import os
+import re
+import tempfile
+from collections import namedtuple
+from contextlib import contextmanager
+from io import BytesIO
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import default_storage
+from django.http import Http404, HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.crypto import constant_time_compare, salted_hmac
+from django.utils.http import quote_etag
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from .renditions import RENDITION_QUALITY, rendition_formats
+
+try:
+    import fcntl
+except ImportError:  # optional; without it a burst may resize the same output more than once
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+SPEC = re.compile(r'^(?P<width>\d{1,4})x(?P<height>\d{1,4})-(?P<fit>fit|crop)-(?P<fmt>[a-z]+)-(?P<signature>[0-9a-f]{16})$')
+
+# Even signed specs stay within this box
+MAX_SIZE = 3200
+
+FORMATS = {
+    'webp': ('WEBP', 'image/webp'),
+    'avif': ('AVIF', 'image/avif'),
+    'jpeg': ('JPEG', 'image/jpeg'),
+    'png': ('PNG', 'image/png'),
+}
+
+QUALITY = {**RENDITION_QUALITY, 'jpeg': 82}
+
+SOURCE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.webp', '.gif', '.bmp', '.tif', '.tiff'}
+
+# Evictions go this far under the limit, so a full cache doesn't delete
+# files on every write
+EVICT_TO = 0.9
+
+# Share of the limit a worker writes between walks of the cache
+SCAN_EVERY = 0.02
+
+# Outputs share this many lock files, picked by key
+LOCK_STRIPES = 64
+
+# Browsers and proxies keep an output this long before revalidating
+CACHE_SECONDS = 7 * 24 * 3600
+
+Spec = namedtuple('Spec', 'width height fit fmt')
+Resized = namedtuple('Resized', 'path content_type key')
+
+
+# Bytes written by this worker since it last walked the cache; None before
+# its first walk
+_unscanned = None
+
+
+class InvalidSpec(ValueError):
+    pass
+
+
+def signature(spec_text, name):
+    return salted_hmac('main.resize', f'{spec_text}:{name}').hexdigest()[:16]
+
+
+def format_spec(name, width, height, fit='fit', fmt='webp'):
+    """The spec for upload ``name`` in a ``width`` x ``height`` box, signed for that upload, as used in URLs."""
+    text = f'{int(width)}x{int(height)}-{fit}-{fmt}'
+    return f'{text}-{signature(text, name)}'
+
+
+def parse_spec(spec, name):
+    """A Spec from a spec signed for ``name``; InvalidSpec if malformed, unsigned or out of bounds."""
+    match = SPEC.match(spec)
+    if not match:
+        raise InvalidSpec(f'Malformed spec {spec!r}')
+    text = spec.rsplit('-', 1)[0]
+    if not constant_time_compare(match['signature'], signature(text, name)):
+        raise InvalidSpec(f'Bad signature for {text!r} of {name!r}')
+    width, height, fit, fmt = int(match['width']), int(match['height']), match['fit'], match['fmt']
+    if fmt not in FORMATS or (fmt == 'avif' and 'avif' not in rendition_formats()):
+        raise InvalidSpec(f'Unsupported format {fmt!r}')
+    if width > MAX_SIZE or height > MAX_SIZE or not (width or height) or (fit == 'crop' and not (width and height)):
+        raise InvalidSpec(f'Unsupported size {width}x{height} for {fit}')
+    return Spec(width, height, fit, fmt)
+
+
+def source_path(name):
+    """Absolute path of the upload ``name``; SuspiciousFileOperation outside MEDIA_ROOT."""
+    if Path(name).suffix.lower() not in SOURCE_EXTENSIONS:
+        raise SuspiciousFileOperation(f'Not an image: {name!r}')
+    return Path(default_storage.path(name))
+
+
+def cache_root():
+    return Path(settings.RESIZE_CACHE_ROOT)
+
+
+def output_key(spec, name, stat):
+    token = f'{spec.width}x{spec.height}-{spec.fit}-{spec.fmt}:{name}:{stat.st_size}:{stat.st_mtime_ns}'
+    return hashlib.sha1(token.encode()).hexdigest()
+
+
+def output_path(key, fmt):
+    return cache_root() / key[:2] / f'{key}.{fmt}'
+
+
+@contextmanager
+def locked(key):
+    """Hold the lock for output ``key`` across every worker on the host."""
+    if fcntl is None:
+        yield
+        return
+    locks = cache_root() / 'locks'
+    locks.mkdir(parents=True, exist_ok=True)
+    with open(locks / f'{int(key[:8], 16) % LOCK_STRIPES}.lock', 'a') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def render(source, spec):
+    """The bytes of ``source`` (a path) resized and encoded per ``spec``."""
+    with Image.open(source) as original:
+        image = ImageOps.exif_transpose(original)
+        image.load()
+
+    has_alpha = image.mode in ('RGBA', 'LA', 'P') and spec.fmt != 'jpeg'
+    image = image.convert('RGBA' if has_alpha else 'RGB')
+
+    if spec.fit == 'crop':
+        # Shrink the box rather than upscale a small original into it
+        scale = min(1, image.width / spec.width, image.height / spec.height)
+        box = (max(1, round(spec.width * scale)), max(1, round(spec.height * scale)))
+        image = ImageOps.fit(image, box, Image.LANCZOS)
+    else:
+        image.thumbnail((spec.width or MAX_SIZE, spec.height or MAX_SIZE), Image.LANCZOS)
+    image.info.clear()
+
+    buffer = BytesIO()
+    options = {'optimize': True} if spec.fmt == 'png' else {'quality': QUALITY[spec.fmt]}
+    image.save(buffer, FORMATS[spec.fmt][0], **options)
+    return buffer.getvalue()
+
+
+def write_atomic(path, content):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    descriptor, temporary = tempfile.mkstemp(dir=path.parent, prefix='.', suffix='.tmp')
+    try:
+        with os.fdopen(descriptor, 'wb') as output:
+            output.write(content)
+        os.replace(temporary, path)
+    finally:
+        if os.path.exists(temporary):
+            os.unlink(temporary)
+
+
+def cached_outputs():
+    """``(mtime, size, path)`` of every cached output."""
+    root = cache_root()
+    if not root.is_dir():
+        return []
+    found = []
+    for directory in os.scandir(root):
+        if not directory.is_dir() or directory.name == 'locks':
+            continue
+        for entry in os.scandir(directory.path):
+            if entry.name.startswith('.'):
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            found.append((stat.st_mtime, stat.st_size, entry.path))
+    return found
+
+
+def evict(limit=None):
+    """Delete the least recently served outputs while the cache is over ``limit`` bytes; bytes freed."""
+    limit = settings.RESIZE_CACHE_MAX_BYTES if limit is None else limit
+    outputs = cached_outputs()
+    total = sum(size for _, size, _ in outputs)
+    if total <= limit:
+        return 0
+    freed = 0
+    for _, size, path in sorted(outputs):
+        if total - freed <= limit * EVICT_TO:
+            break
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            # Another worker evicted it first
+            continue
+        freed += size
+    logger.info('Evicted %d bytes of resized images', freed)
+    return freed
+
+
+def written(size):
+    """Count ``size`` more bytes written by this worker; evict() if that makes SCAN_EVERY of the limit."""
+    global _unscanned
+    limit = settings.RESIZE_CACHE_MAX_BYTES
+    # Unlocked: threads racing here at worst walk the cache once more
+    if _unscanned is not None and _unscanned + size < limit * SCAN_EVERY:
+        _unscanned += size
+        return 0
+    _unscanned = 0
+    return evict(limit)
+
+
+def resized(spec, name):
+    """
+    The Resized output of upload ``name`` at ``spec``, rendered first on a
+    miss. OSError for a missing upload, UnidentifiedImageError for one that
+    isn't an image.
+    """
+    source = source_path(name)
+    key = output_key(spec, name, source.stat())
+    path = output_path(key, spec.fmt)
+    output = Resized(path, FORMATS[spec.fmt][1], key)
+    try:
+        # Served, so most recently used
+        os.utime(path)
+        return output
+    except FileNotFoundError:
+        pass
+
+    with locked(key):
+        # A request that held the lock before us may have written it
+        if path.exists():
+            return output
+        try:
+            content = render(source, spec)
+        except Image.DecompressionBombError as e:
+            raise UnidentifiedImageError(str(e))
+        write_atomic(path, content)
+    logger.info('Resized %s to %s', name, path.name)
+    written(len(content))
+    return output
+
+
+def response(request, spec, name):
+    """The image for ``/media/r/<spec>/<name>``, a 304 for a current copy, or Http404."""
+    try:
+        output = resized(parse_spec(spec, name), name)
+    except (InvalidSpec, SuspiciousFileOperation, OSError, UnidentifiedImageError) as e:
+        # Unsigned specs, non-images and paths outside MEDIA_ROOT look like
+        # any other missing file
+        raise Http404(str(e))
+    result = get_conditional_response(request, etag=quote_etag(output.key))
+    if result is None:
+        try:
+            result = HttpResponse(output.path.read_bytes(), content_type=output.content_type)
+        except FileNotFoundError:
+            raise Http404('Evicted while being served')
+    result['ETag'] = quote_etag(output.key)
+    # The key covers the upload's size and mtime, so a changed upload has a new ETag
+    patch_cache_control(result, public=True, max_age=CACHE_SECONDS)
+    return result
@@ -0,0 +1,234 @@
+# main/retention.py
+"""
+Retention for contact messages.
+
+Whole calendar months of messages older than settings.CONTACT_RETENTION_DAYS
+move out of the database into gzipped JSON Lines files under
+settings.CONTACT_ARCHIVE_ROOT, one per month (``2024-03.jsonl.gz``; a later
+move into a month already on disk adds ``2024-03.1.jsonl.gz`` and so on).
+
+A month is written in full to a temporary file that is renamed into place
+once it is on disk, and only then are its rows deleted, a batch per
+transaction. Rows already in a month's files are not written again, so a
+move interrupted at any point just carries on when run again.
+
+The admin reads the archives back lazily (``month_page``), and
+``reclaim_space`` hands the pages the deletes freed back to the file system
+with incremental vacuums.
+"""
+import gzip
+import json
+import logging
+import os
+import re
+import tempfile
+import time
+from collections import namedtuple
+from datetime import date, datetime, timedelta
+from itertools import islice
+from pathlib import Path
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.utils import timezone
+
+from . import search
+from .models import ContactMessage
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 2000
+
+# Pages freed per incremental vacuum step; each step holds the write lock
+VACUUM_STEP_PAGES = 2000
+
+ARCHIVE_NAME = re.compile(r'^(?P<month>\d{4}-\d{2})(?:\.(?P<part>\d+))?\.jsonl\.gz$')
+
+# Columns the archive browser's search looks in
+SEARCHED = ('name', 'email', 'phone', 'message')
+
+ArchiveFile = namedtuple('ArchiveFile', 'month part path size modified')
+MonthMoved = namedtuple('MonthMoved', 'month written deleted path')
+
+
+def archive_root():
+    return Path(settings.CONTACT_ARCHIVE_ROOT)
+
+
+def cutoff(now=None, days=None):
+    """
+    Start of the oldest month still kept: the month holding the day ``days``
+    (default CONTACT_RETENTION_DAYS) ago, so only complete months move.
+    None when retention is off.
+    """
+    days = settings.CONTACT_RETENTION_DAYS if days is None else days
+    if not days:
+        return None
+    day = timezone.localtime(now) - timedelta(days=days)
+    return day.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def month_bounds(month):
+    """Aware ``(start, end)`` datetimes of a ``date`` month in the current time zone."""
+    start = timezone.make_aware(datetime(month.year, month.month, 1))
+    following = date(month.year + month.month // 12, month.month % 12 + 1, 1)
+    return start, timezone.make_aware(datetime(following.year, following.month, 1))
+
+
+def columns():
+    return [field.attname for field in ContactMessage._meta.concrete_fields]
+
+
+def archive_files(month=None):
+    """ArchiveFile for each archive on disk, oldest month first, or those of ``month`` ('2024-03')."""
+    root = archive_root()
+    if not root.is_dir():
+        return []
+    found = []
+    for entry in os.scandir(root):
+        match = ARCHIVE_NAME.match(entry.name)
+        if match and (month is None or match['month'] == month):
+            stat = entry.stat()
+            found.append(ArchiveFile(
+                match['month'], int(match['part'] or 0), Path(entry.path), stat.st_size,
+                datetime.fromtimestamp(stat.st_mtime, tz=timezone.get_current_timezone()),
+            ))
+    return sorted(found, key=lambda archive: (archive.month, archive.part))
+
+
+def read_month(month):
+    """Every archived message of ``month`` ('2024-03') as a dict, read as iterated."""
+    for archive in archive_files(month):
+        with gzip.open(archive.path, 'rt', encoding='utf-8') as lines:
+            for line in lines:
+                yield json.loads(line)
+
+
+def month_page(month, page=1, per_page=100, search=''):
+    """
+    ``(rows, has_next)`` for one page of ``month``'s archive, optionally only
+    messages containing ``search``. Decompresses only as far as the page.
+    """
+    rows = read_month(month)
+    if search:
+        search = search.lower()
+        rows = (row for row in rows if any(search in str(row[name] or '').lower() for name in SEARCHED))
+    found = list(islice(rows, (page - 1) * per_page, page * per_page + 1))
+    return found[:per_page], len(found) > per_page
+
+
+def archived_ids(month):
+    return {row['id'] for row in read_month(month)}
+
+
+def pending_months(before):
+    """Months (as dates) with messages created before ``before``."""
+    return list(ContactMessage.objects.filter(created_at__lt=before).dates('created_at', 'month'))
+
+
+def _rows(queryset, batch_size):
+    """
+    ``queryset``'s rows as value lists, a batch per query in id order. Not
+    one long-lived ``.iterator()``: SQLite cursors don't see a consistent
+    table while the same connection deletes from it.
+    """
+    after = 0
+    names = columns()
+    while True:
+        batch = list(queryset.filter(id__gt=after).order_by('id').values_list(*names)[:batch_size])
+        if not batch:
+            return
+        yield from batch
+        after = batch[-1][0]
+
+
+def _write_archive(month, rows):
+    """Write ``rows`` to the month's next archive file; the ids written, or none and no file."""
+    existing = archive_files(month)
+    part = existing[-1].part + 1 if existing else 0
+    root = archive_root()
+    root.mkdir(parents=True, exist_ok=True)
+    path = root / (f'{month}.jsonl.gz' if part == 0 else f'{month}.{part}.jsonl.gz')
+
+    names = columns()
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    written = []
+    descriptor, temporary = tempfile.mkstemp(dir=root, prefix=f'.{month}-', suffix='.tmp')
+    try:
+        with os.fdopen(descriptor, 'wb') as raw:
+            with gzip.GzipFile(filename=path.name, mode='wb', fileobj=raw) as output:
+                for row in rows:
+                    output.write((encoder.encode(dict(zip(names, row))) + '\n').encode())
+                    written.append(row[0])
+            raw.flush()
+            os.fsync(raw.fileno())
+        if written:
+            os.replace(temporary, path)
+    finally:
+        if os.path.exists(temporary):
+            os.unlink(temporary)
+    return written, (path if written else None)
+
+
+def move_month(month, batch_size=BATCH_SIZE):
+    """Archive the messages of ``month`` (a date) to disk, then delete them from the database."""
+    label = f'{month:%Y-%m}'
+    start, end = month_bounds(month)
+    queryset = ContactMessage.objects.filter(created_at__gte=start, created_at__lt=end)
+    already = archived_ids(label)
+    written, path = _write_archive(label, (row for row in _rows(queryset, batch_size) if row[0] not in already))
+
+    deleted = 0
+    ids = iter(sorted(already.union(written)))
+    while batch := list(islice(ids, batch_size)):
+        with transaction.atomic():
+            deleted += queryset.filter(pk__in=batch).delete()[0]
+    logger.info('Archived %s: %d messages written to %s, %d deleted', label, len(written), path, deleted)
+    return MonthMoved(label, len(written), deleted, path)
+
+
+def move_expired(now=None, batch_size=BATCH_SIZE, days=None):
+    """Move every month before ``cutoff(now, days)``; a MonthMoved per month."""
+    before = cutoff(now, days)
+    if before is None:
+        return []
+    return [move_month(month, batch_size) for month in pending_months(before)]
+
+
+def reclaim_space(step_pages=VACUUM_STEP_PAGES, pause=0.05):
+    """
+    Return the database's free pages to the file system, ``step_pages`` per
+    incremental vacuum so the write lock is never held for long. A database
+    not yet in incremental auto-vacuum mode is switched once with a full
+    VACUUM. Returns ``(pages_freed, switched)``; SQLite only.
+    """
+    if connection.vendor != 'sqlite':
+        return 0, False
+    # Drop the search index's tombstones of the deleted messages first
+    search.optimize()
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA freelist_count')
+        free = cursor.fetchone()[0]
+        cursor.execute('PRAGMA auto_vacuum')
+        switched = cursor.fetchone()[0] != 2
+        if switched:
+            # Only takes effect with a VACUUM, which rewrites the whole file
+            cursor.execute('PRAGMA auto_vacuum = INCREMENTAL')
+            cursor.execute('VACUUM')
+            freed = free
+        else:
+            freed = 0
+            while free:
+                step = min(free, step_pages)
+                # Frees a page per step of the statement; the sqlite3 module
+                # steps a PRAGMA without results only once, executescript
+                # runs it to the end
+                connection.connection.executescript(f'PRAGMA incremental_vacuum({step})')
+                freed += step
+                cursor.execute('PRAGMA freelist_count')
+                free = cursor.fetchone()[0]
+                time.sleep(pause)
+        # Let the WAL shrink back too
+        cursor.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+    return freed, switched
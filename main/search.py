@@ -0,0 +1,231 @@
+# main/search.py
+"""
+Site search over an SQLite FTS5 index.
+
+``main_search`` holds one row per RoomType, Event, RestaurantMenuItem,
+History, Photo and ContactMessage. SQL triggers keep it in sync on every
+insert, update and delete, including bulk queryset updates that never fire
+model signals. Each row's rowid is ``id * 8 + kind code``, so a trigger
+touches its row by rowid instead of scanning the table.
+
+SQLite drops a table's triggers whenever a migration rebuilds the table
+(most AlterField/AddField operations), so after every ``migrate``
+``ensure_triggers()`` (main/signals.py) recreates any trigger that is
+missing or differs from SOURCES, and re-indexes if it had to.
+
+Contact messages are indexed for the admin only; ``visible`` is 0 for
+them and for inactive/unavailable content.
+"""
+import re
+from collections import namedtuple
+
+from django.db import connection, connections, transaction
+from django.db.models.expressions import RawSQL
+from django.urls import reverse
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import Event
+
+SEARCH_TABLE = 'main_search'
+
+# kind: (rowid code, table, title SQL, body SQL, visible SQL, columns whose
+# updates re-index); {t} is the row alias
+SOURCES = {
+    'room': (1, 'main_roomtype', '{t}.name', "{t}.category || ' ' || {t}.description || ' ' || {t}.amenities", '{t}.is_available',
+             'name, category, description, amenities, is_available'),
+    'event': (2, 'main_event', '{t}.title', '{t}.description', '{t}.is_active',
+              'title, description, is_active'),
+    'menu': (3, 'main_restaurantmenuitem', '{t}.name', "{t}.category || ' ' || {t}.description", '{t}.is_available',
+             'name, category, description, is_available'),
+    'history': (4, 'main_history', '{t}.title', "{t}.year || ' ' || {t}.description", '{t}.is_active',
+                'year, title, description, is_active'),
+    'photo': (5, 'main_photo', '{t}.title', '{t}.caption', '{t}.is_active',
+              'title, caption, is_active'),
+    # Only text changes re-index (the outbox updates messages often)
+    'message': (6, 'main_contactmessage', '{t}.name', "{t}.email || ' ' || {t}.phone || ' ' || {t}.message", '0',
+                'name, email, phone, message'),
+}
+PUBLIC_KINDS = ('room', 'event', 'menu', 'history', 'photo')
+KIND_LABELS = {
+    'room': 'Room', 'event': 'Event', 'menu': 'Restaurant', 'history': 'Our Story', 'photo': 'Gallery',
+    'message': 'Message',
+}
+
+RESULT_LIMIT = 20
+SUGGEST_LIMIT = 8
+# Longest query accepted, in words
+MAX_TERMS = 8
+# Title hits count ten times as much as body hits
+TITLE_WEIGHT = 10.0
+
+# highlight()/snippet() wrap matches in these, so the text can be escaped first
+MARK_START, MARK_END = '\x02', '\x03'
+
+TERM_RE = re.compile(r'\w+')
+
+Result = namedtuple('Result', ['kind', 'label', 'object_id', 'title', 'snippet', 'url'])
+
+
+def available():
+    return connection.vendor == 'sqlite'
+
+
+def match_expression(text):
+    """
+    FTS5 query matching every word of ``text`` as a prefix ("sui" finds
+    "suite", "room" finds "rooms"). Each word is quoted, so user input
+    can't use FTS5 query syntax.
+    """
+    return ' '.join(f'"{term}"*' for term in TERM_RE.findall(text or '')[:MAX_TERMS])
+
+
+def marked(text):
+    return mark_safe(escape(text or '').replace(MARK_START, '<mark>').replace(MARK_END, '</mark>'))
+
+
+def result_urls(rows):
+    """Page URL of each (kind, object_id) result."""
+    event_ids = [object_id for kind, object_id in rows if kind == 'event']
+    event_dates = dict(Event.objects.filter(pk__in=event_ids).values_list('pk', 'event_date')) if event_ids else {}
+
+    urls = {}
+    for kind, object_id in rows:
+        if kind == 'room':
+            urls[kind, object_id] = reverse('rooms')
+        elif kind == 'event' and object_id in event_dates:
+            urls[kind, object_id] = f"{reverse('events')}?month={event_dates[object_id]:%Y-%m}"
+        elif kind == 'event':
+            urls[kind, object_id] = reverse('events')
+        elif kind == 'menu':
+            urls[kind, object_id] = reverse('home') + '#menu'
+        else:
+            urls[kind, object_id] = reverse('about')
+    return urls
+
+
+def _query(expression, kinds, limit, snippet_words=16):
+    placeholders = ', '.join(['%s'] * len(kinds))
+    sql = f'''
+        SELECT kind, object_id,
+               highlight({SEARCH_TABLE}, 0, %s, %s),
+               snippet({SEARCH_TABLE}, 1, %s, %s, '…', %s)
+        FROM {SEARCH_TABLE}
+        WHERE {SEARCH_TABLE} MATCH %s AND visible = 1 AND kind IN ({placeholders})
+        ORDER BY bm25({SEARCH_TABLE}, %s, 1.0)
+        LIMIT %s
+    '''
+    params = [MARK_START, MARK_END, MARK_START, MARK_END, snippet_words, expression, *kinds, TITLE_WEIGHT, limit]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+def search(text, kinds=PUBLIC_KINDS, limit=RESULT_LIMIT):
+    """Best matches for ``text``, with the matched words in <mark> tags."""
+    expression = match_expression(text)
+    if not expression or not available():
+        return []
+
+    rows = _query(expression, kinds, limit)
+    urls = result_urls([(kind, object_id) for kind, object_id, _, _ in rows])
+    return [
+        Result(kind, KIND_LABELS[kind], object_id, marked(title), marked(snippet), urls[kind, object_id])
+        for kind, object_id, title, snippet in rows
+    ]
+
+
+def suggest(text, kinds=PUBLIC_KINDS, limit=SUGGEST_LIMIT):
+    """Titles starting with the words typed so far, for autocomplete."""
+    expression = match_expression(text)
+    if not expression or not available():
+        return []
+
+    rows = _query(f'title : ({expression})', kinds, limit, snippet_words=1)
+    urls = result_urls([(kind, object_id) for kind, object_id, _, _ in rows])
+    return [
+        {
+            'title': title.replace(MARK_START, '').replace(MARK_END, ''),
+            'kind': KIND_LABELS[kind],
+            'url': urls[kind, object_id],
+        }
+        for kind, object_id, title, _ in rows
+    ]
+
+
+def filter_queryset(queryset, kind, text):
+    """
+    Narrow ``queryset`` to rows whose index entry matches ``text``, or return
+    None when the text has no searchable words.
+    """
+    expression = match_expression(text)
+    if not expression:
+        return None
+    return queryset.filter(pk__in=RawSQL(
+        f'SELECT object_id FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s AND kind = %s',
+        [expression, kind],
+    ))
+
+
+def insert_sql(kind, row):
+    """INSERT of ``row``'s (a table name, or new) index entry."""
+    code, table, title, body, visible, _ = SOURCES[kind]
+    return (
+        f"INSERT INTO {SEARCH_TABLE} (rowid, title, body, kind, object_id, visible) "
+        f"SELECT {row}.id * 8 + {code}, {title}, {body}, '{kind}', {row}.id, {visible}".format(t=row)
+    )
+
+
+def triggers():
+    """Trigger name -> its CREATE TRIGGER statement, for every source."""
+    statements = {}
+    for kind, (code, table, _, _, _, columns) in SOURCES.items():
+        delete = f'DELETE FROM {SEARCH_TABLE} WHERE rowid = old.id * 8 + {code}'
+        statements.update({
+            f'{SEARCH_TABLE}_{kind}_ai': f"AFTER INSERT ON {table} BEGIN {insert_sql(kind, 'new')}; END",
+            f'{SEARCH_TABLE}_{kind}_ad': f'AFTER DELETE ON {table} BEGIN {delete}; END',
+            f'{SEARCH_TABLE}_{kind}_au': f"AFTER UPDATE OF {columns} ON {table} BEGIN {delete}; {insert_sql(kind, 'new')}; END",
+        })
+    return {name: f'CREATE TRIGGER {name} {body}' for name, body in statements.items()}
+
+
+def ensure_triggers(using='default'):
+    """
+    Recreate the triggers that are missing or differ from SOURCES, then
+    re-index if any did, as rows may have changed while they were gone.
+    Returns the names recreated.
+    """
+    database = connections[using]
+    # FTS5 is SQLite only; before migration 0019 there is nothing to keep in sync
+    if database.vendor != 'sqlite' or SEARCH_TABLE not in database.introspection.table_names():
+        return []
+    with transaction.atomic(using=using), database.cursor() as cursor:
+        cursor.execute("SELECT name, sql FROM sqlite_master WHERE type = 'trigger'")
+        found = dict(cursor.fetchall())
+        stale = {name: sql for name, sql in triggers().items() if found.get(name) != sql}
+        for name, sql in stale.items():
+            cursor.execute(f'DROP TRIGGER IF EXISTS {name}')
+            cursor.execute(sql)
+        if stale:
+            rebuild(using)
+    return sorted(stale)
+
+
+def rebuild(using='default'):
+    """Re-index every source table. Returns the number of rows indexed."""
+    with transaction.atomic(using=using), connections[using].cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+        for kind, (_, table, *_) in SOURCES.items():
+            cursor.execute(f'{insert_sql(kind, table)} FROM {table}')
+        cursor.execute(f'SELECT count(*) FROM {SEARCH_TABLE}')
+        return cursor.fetchone()[0]
+
+
+def optimize():
+    """
+    Merge the index into one segment. FTS5 keeps deleted rows as tombstones
+    until their segments merge, so after deleting many source rows (see
+    main/retention.py) the index only shrinks with this.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}) VALUES ('optimize')")
@@ -0,0 +1,161 @@
+# main/signals.py
+import sys
+
+from django.apps import apps
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_migrate, post_save, pre_save
+
+from . import banners, event_archive, fragments, menu, publish, rates, renditions, search, versions
+from .timing import install_query_timer
+from .models import Event, RestaurantMenuItem, RoomType, SpecialOffer
+
+
+def invalidate_fragments(sender, **kwargs):
+    fragments.invalidate_model(sender.__name__)
+
+
+def invalidate_menu(sender, **kwargs):
+    menu.invalidate()
+
+
+def reload_banners(sender, **kwargs):
+    banners.invalidate()
+
+
+def bump_version(sender, **kwargs):
+    versions.bump(sender.__name__)
+
+
+def republish(sender, **kwargs):
+    publish.schedule(sender.__name__)
+
+
+def remember_replaced_uploads(sender, instance, raw=False, **kwargs):
+    instance._replaced_uploads = [] if raw else renditions.replaced_uploads(instance)
+
+
+def build_renditions(sender, instance, raw=False, **kwargs):
+    # Fixture loads (raw) don't carry the files
+    if raw:
+        return
+    model_name = sender.__name__
+    # Sections rendered meanwhile show the originals; re-render them once
+    # the renditions are there
+    renditions.schedule(
+        instance, getattr(instance, '_replaced_uploads', ()),
+        on_built=lambda: fragments.invalidate_model(model_name),
+    )
+
+
+def delete_renditions(sender, instance, **kwargs):
+    renditions.schedule_deletion(instance)
+
+
+def rebuild_room_rates(sender, instance, raw=False, **kwargs):
+    if not raw:
+        rates.rebuild(instance)
+
+
+def remember_offer_window(sender, instance, raw=False, **kwargs):
+    # An edit can move the offer to other dates or another room type;
+    # the nights it used to cover need repricing too
+    instance._previous_rate_window = None
+    if instance.pk and not raw:
+        instance._previous_rate_window = (
+            SpecialOffer.objects.filter(pk=instance.pk)
+            .values_list('room_type_id', 'valid_from', 'valid_until').first()
+        )
+
+
+def rebuild_offer_rates(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    rates.rebuild_offer_window(instance.room_type_id, instance.valid_from, instance.valid_until)
+    previous = getattr(instance, '_previous_rate_window', None)
+    if previous:
+        rates.rebuild_offer_window(*previous)
+
+
+def rebuild_deleted_offer_rates(sender, instance, **kwargs):
+    # After the commit: when a room type is deleted, its offers go first in
+    # the same cascade, and rates rebuilt then would point at a deleted row
+    window = (instance.room_type_id, instance.valid_from, instance.valid_until)
+    transaction.on_commit(lambda: rates.rebuild_offer_window(*window))
+
+
+def remember_event_month(sender, instance, raw=False, **kwargs):
+    instance._previous_archive_state = None
+    if instance.pk and not raw:
+        instance._previous_archive_state = (
+            Event.objects.filter(pk=instance.pk).values_list('event_date', 'is_active').first()
+        )
+
+
+def count_saved_event(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_previous_archive_state', None)
+    if previous and previous[1]:
+        event_archive.adjust_month_count(previous[0], -1)
+    if instance.is_active:
+        event_archive.adjust_month_count(instance.event_date, 1)
+
+
+def count_deleted_event(sender, instance, **kwargs):
+    if instance.is_active:
+        event_archive.adjust_month_count(instance.event_date, -1)
+
+
+def restore_search_triggers(sender, using, verbosity=1, stdout=None, **kwargs):
+    # Table rebuilds in any migration drop the site search triggers
+    restored = search.ensure_triggers(using)
+    if restored and verbosity:
+        (stdout or sys.stdout).write(f'Recreated {len(restored)} site search triggers and re-indexed.\n')
+
+
+def connect_signals():
+    # Built in the background after the commit (main/renditions.py)
+    for model in apps.get_app_config('main').get_models():
+        if renditions.image_fields(model):
+            pre_save.connect(remember_replaced_uploads, sender=model, dispatch_uid=f'renditions-presave-{model.__name__}')
+            post_save.connect(build_renditions, sender=model, dispatch_uid=f'renditions-save-{model.__name__}')
+            post_delete.connect(delete_renditions, sender=model, dispatch_uid=f'renditions-delete-{model.__name__}')
+
+    # Before the sections, which are rebuilt from the cached menu
+    post_save.connect(invalidate_menu, sender=RestaurantMenuItem, dispatch_uid='menu-save')
+    post_delete.connect(invalidate_menu, sender=RestaurantMenuItem, dispatch_uid='menu-delete')
+
+    for model_name in fragments.fragment_models():
+        model = apps.get_model('main', model_name)
+        post_save.connect(invalidate_fragments, sender=model, dispatch_uid=f'fragments-save-{model_name}')
+        post_delete.connect(invalidate_fragments, sender=model, dispatch_uid=f'fragments-delete-{model_name}')
+
+    post_save.connect(rebuild_room_rates, sender=RoomType, dispatch_uid='rates-roomtype-save')
+    pre_save.connect(remember_offer_window, sender=SpecialOffer, dispatch_uid='rates-offer-presave')
+    post_save.connect(rebuild_offer_rates, sender=SpecialOffer, dispatch_uid='rates-offer-save')
+    post_delete.connect(rebuild_deleted_offer_rates, sender=SpecialOffer, dispatch_uid='rates-offer-delete')
+
+    pre_save.connect(remember_event_month, sender=Event, dispatch_uid='archive-event-presave')
+    post_save.connect(count_saved_event, sender=Event, dispatch_uid='archive-event-save')
+    post_delete.connect(count_deleted_event, sender=Event, dispatch_uid='archive-event-delete')
+
+    # Before the republish below, so the bake sees the new banners
+    for page, model in banners.MODELS.items():
+        post_save.connect(reload_banners, sender=model, dispatch_uid=f'banners-save-{page}')
+        post_delete.connect(reload_banners, sender=model, dispatch_uid=f'banners-delete-{page}')
+
+    # Last, so the page version moves after the renditions and counts are in place
+    for model_name in versions.versioned_models():
+        model = apps.get_model('main', model_name)
+        post_save.connect(bump_version, sender=model, dispatch_uid=f'versions-save-{model_name}')
+        post_delete.connect(bump_version, sender=model, dispatch_uid=f'versions-delete-{model_name}')
+        # Bakes once the transaction commits, whatever else it saves
+        post_save.connect(republish, sender=model, dispatch_uid=f'publish-save-{model_name}')
+        post_delete.connect(republish, sender=model, dispatch_uid=f'publish-delete-{model_name}')
+
+    connection_created.connect(install_query_timer, dispatch_uid='timing-connection-created')
+
+    post_migrate.connect(
+        restore_search_triggers, sender=apps.get_app_config('main'), dispatch_uid='search-post-migrate',
+    )
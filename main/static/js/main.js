@@ -34,11 +34,17 @@
 	  console.log('show');
 	});
 
+  // Each page's bundle only carries the plugins it uses (main/bundles.py)
+  var hasPlugin = function(name) {
+    return typeof $.fn[name] === 'function';
+  };
+
   // aos
   AOS.init({
     duration: 1000
   });
 
+	if (hasPlugin('owlCarousel')) {
 	// home slider
 	$('.home-slider').owlCarousel({
     loop:true,
@@ -128,8 +134,10 @@
       }
   	}
 	});
+	}
 
   var siteStellar = function() {
+    if (!hasPlugin('stellar')) return;
     $(window).stellar({
       responsive: false,
       parallaxBackgrounds: true,
@@ -154,6 +162,7 @@
   smoothScroll();
 
   var dateAndTime = function() {
+    if (hasPlugin('datepicker')) {
     $('#m_date').datepicker({
       'format': 'm/d/yyyy',
       'autoclose': true
@@ -162,7 +171,10 @@
       'format': 'd MM, yyyy',
       'autoclose': true
     });
-    $('#m_time').timepicker();
+    }
+    if (hasPlugin('timepicker')) {
+      $('#m_time').timepicker();
+    }
   };
   dateAndTime();
 
@@ -0,0 +1,54 @@
+# main/storage.py
+import logging
+
+from django.core.files.base import ContentFile
+from whitenoise.storage import CompressedManifestStaticFilesStorage
+
+from . import bundles
+
+logger = logging.getLogger(__name__)
+
+
+class BundledStaticFilesStorage(CompressedManifestStaticFilesStorage):
+    """
+    WhiteNoise's hashed, compressed storage that also writes the per-page
+    bundles declared in main/bundles.py before post-processing, so they are
+    fingerprinted, have their url()s hashed and get .gz/.br variants like
+    every other file.
+    """
+
+    def post_process(self, paths, dry_run=False, **options):
+        if not dry_run:
+            for name, content in self.build_bundles(paths):
+                if self.exists(name):
+                    self.delete(name)
+                self.save(name, ContentFile(content.encode()))
+                paths[name] = (self, name)
+        yield from super().post_process(paths, dry_run, **options)
+
+    def build_bundles(self, paths):
+        def read(path):
+            if path not in paths:
+                raise ValueError(f"Bundle source '{path}' was not collected.")
+            storage, source = paths[path]
+            with storage.open(source) as handle:
+                return handle.read().decode()
+
+        for page in bundles.PAGES:
+            for kind in ('css', 'js'):
+                yield bundles.bundle_name(page, kind), bundles.build(page, kind, read)
+
+    def url_converter(self, name, hashed_files, template=None):
+        # The vendored CSS/JS point at a few files that were never shipped
+        # (source maps, owl's video icon); leave those references alone
+        # rather than failing the whole collectstatic
+        convert = super().url_converter(name, hashed_files, template)
+
+        def converter(matchobj):
+            try:
+                return convert(matchobj)
+            except ValueError as exc:
+                logger.warning('Leaving unresolved reference in %s: %s', name, str(exc).splitlines()[0])
+                return matchobj.group(0)
+
+        return converter
@@ -0,0 +1,54 @@
+# main/templatetags/bundles.py
+from django import template
+from django.conf import settings
+from django.templatetags.static import static
+from django.utils.html import format_html, format_html_join
+
+from .. import bundles, iconfonts
+
+register = template.Library()
+
+
+@register.simple_tag
+def bundle_css(page):
+    """
+    The page's stylesheet bundle: one hashed file in production, the
+    separate source files under DEBUG (bundles only exist after collectstatic).
+
+    Usage: {% bundle_css 'home' %}
+    """
+    if settings.DEBUG:
+        return format_html_join(
+            '\n', '<link rel="stylesheet" href="{}">',
+            ((static(path),) for path in bundles.bundle_files(page, 'css')),
+        )
+    return format_html('<link rel="stylesheet" href="{}">', static(bundles.bundle_name(page, 'css')))
+
+
+@register.simple_tag
+def bundle_js(page):
+    """
+    The page's script bundle, deferred so it never blocks rendering.
+
+    Usage: {% bundle_js 'home' %}
+    """
+    if settings.DEBUG:
+        return format_html_join(
+            '\n', '<script src="{}" defer></script>',
+            ((static(path),) for path in bundles.bundle_files(page, 'js')),
+        )
+    return format_html('<script src="{}" defer></script>', static(bundles.bundle_name(page, 'js')))
+
+
+@register.simple_tag
+def icon_font_preloads():
+    """
+    Preload hints for the subset icon fonts, which every page uses but the
+    browser would otherwise only discover after parsing the CSS.
+
+    Usage: {% icon_font_preloads %}
+    """
+    return format_html_join(
+        '\n', '<link rel="preload" href="{}" as="font" type="font/woff2" crossorigin>',
+        ((static(iconfonts.subset_font_path(font)),) for font in iconfonts.ICON_FONTS),
+    )
@@ -0,0 +1,108 @@
+# main/templatetags/images.py
+from django import template
+from django.urls import reverse
+from django.utils.html import format_html, format_html_join
+
+from ..renditions import RENDITION_WIDTHS, available_formats, has_renditions, rendition_formats, rendition_name
+from ..resize import MAX_SIZE, format_spec
+
+register = template.Library()
+
+
+def _srcset(fieldfile, fmt):
+    storage = fieldfile.storage
+    return ', '.join(
+        f'{storage.url(rendition_name(fieldfile.name, width, fmt))} {width}w'
+        for width in RENDITION_WIDTHS
+    )
+
+
+@register.filter
+def rendition_url(fieldfile, width=RENDITION_WIDTHS[-1]):
+    """
+    URL of the WebP rendition of an image at (or just above) ``width``.
+
+    Meant for CSS backgrounds and fancybox links; falls back to the original.
+    """
+    if not fieldfile:
+        return ''
+    if not has_renditions(fieldfile):
+        return fieldfile.url
+    width = int(width)
+    width = next((w for w in RENDITION_WIDTHS if w >= width), RENDITION_WIDTHS[-1])
+    return fieldfile.storage.url(rendition_name(fieldfile.name, width, 'webp'))
+
+
+@register.simple_tag
+def responsive_image(fieldfile, alt='', css_class='', sizes='100vw'):
+    """
+    <picture> with a srcset per rendition format the image has (AVIF, WebP)
+    and a lazy-loaded <img> fallback.
+
+    Usage: {% responsive_image photo.image alt=photo.title css_class="img-fluid" sizes="50vw" %}
+    """
+    if not fieldfile:
+        return ''
+    # AVIF is missing where Pillow lacks libavif, and both until built
+    formats = available_formats(fieldfile)
+    if not formats:
+        return format_html(
+            '<img src="{}" alt="{}" class="{}" loading="lazy" decoding="async">',
+            fieldfile.url, alt, css_class,
+        )
+
+    sources = format_html_join(
+        '', '<source type="image/{}" srcset="{}" sizes="{}">',
+        ((fmt, _srcset(fieldfile, fmt), sizes) for fmt in formats),
+    )
+    return format_html(
+        '<picture>{}<img src="{}" alt="{}" class="{}" loading="lazy" decoding="async"></picture>',
+        sources, fieldfile.url, alt, css_class,
+    )
+
+
+@register.simple_tag
+def resized_url(fieldfile, size, fit='fit', fmt='webp'):
+    """
+    URL of ``fieldfile`` resized on request to ``size`` ('600x400'; 0 for
+    either side keeps the aspect ratio), fitted inside the box or cropped
+    to fill it. See main/resize.py.
+
+    Usage: {% resized_url leader.image '360x360' 'crop' %}
+    """
+    if not fieldfile:
+        return ''
+    width, height = size.split('x')
+    return reverse('resized_image', args=[format_spec(fieldfile.name, width, height, fit, fmt), fieldfile.name])
+
+
+def _resized_srcset(fieldfile, width, height, fit, fmt):
+    """``url 1x, url 2x`` at ``width`` x ``height``; the 2x only where it stays within MAX_SIZE."""
+    candidates = [resized_url(fieldfile, f'{width}x{height}', fit, fmt) + ' 1x']
+    if max(width, height) * 2 <= MAX_SIZE:
+        candidates.append(resized_url(fieldfile, f'{width * 2}x{height * 2}', fit, fmt) + ' 2x')
+    return ', '.join(candidates)
+
+
+@register.simple_tag
+def resized_image(fieldfile, size, fit='crop', alt='', css_class=''):
+    """
+    <picture> of ``fieldfile`` resized on request to ``size`` (see
+    ``resized_url``), at 1x and 2x, in each rendition format the server can
+    write, with a lazy-loaded JPEG <img> fallback. For the places whose
+    sizes the design sets: the carousels and the leadership cards.
+
+    Usage: {% resized_image photo.image '1110x624' alt=photo.title css_class="img-fluid" %}
+    """
+    if not fieldfile:
+        return ''
+    width, height = (int(side) for side in size.split('x'))
+    sources = format_html_join(
+        '', '<source type="image/{}" srcset="{}">',
+        ((fmt, _resized_srcset(fieldfile, width, height, fit, fmt)) for fmt in rendition_formats()),
+    )
+    return format_html(
+        '<picture>{}<img src="{}" srcset="{}" alt="{}" class="{}" loading="lazy" decoding="async"></picture>',
+        sources, resized_url(fieldfile, size, fit, 'jpeg'), _resized_srcset(fieldfile, width, height, fit, 'jpeg'),
+        alt, css_class,
+    )
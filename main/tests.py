@@ -0,0 +1,798 @@
+# main/tests.py
+import math
+import os
+import shutil
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from io import BytesIO, StringIO
+from pathlib import Path
+from unittest import mock
+
+from django.core import mail
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.cache import caches
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection
+from django.db.models.signals import post_save
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from PIL import Image
+
+from main import (
+    banners, csspurge, event_archive, inbox, inventory, menu, outbox, ratelimit, rates, renditions, resize, retention,
+    search, transfer, versions,
+)
+from main.models import (
+    ContactMessage, Event, EventMonthCount, Leadership, Photo, Reservation, RestaurantMenuItem, RoomRate, RoomType,
+    SpecialOffer, Testimonial,
+)
+from main.month_arrays import month_start, months_spanned, next_month
+from main.templatetags.images import resized_image, resized_url, responsive_image
+
+# Every test runs against its own file caches, media and archive roots
+SCRATCH = Path(tempfile.mkdtemp(prefix='hotel-tests-'))
+
+
+def scratch_settings():
+    return {
+        'CACHES': {
+            'default': {
+                'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+                'LOCATION': str(SCRATCH / 'cache'),
+            },
+            'ratelimit': {
+                'BACKEND': 'main.ratelimit.BucketCache',
+                'LOCATION': str(SCRATCH / 'cache' / 'ratelimit'),
+            },
+        },
+        'MEDIA_ROOT': SCRATCH / 'media',
+        'RESIZE_CACHE_ROOT': SCRATCH / 'resized',
+        'CONTACT_ARCHIVE_ROOT': SCRATCH / 'archive',
+        'PUBLISH_PAGES': False,
+        'SECURE_SSL_REDIRECT': False,
+        'STORAGES': {
+            'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+            'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+        },
+    }
+
+
+def upload(name='photo.jpg', size=(2000, 1000)):
+    buffer = BytesIO()
+    Image.new('RGB', size, 'teal').save(buffer, 'JPEG')
+    return ContentFile(buffer.getvalue(), name=name)
+
+
+def wait_for_renditions():
+    # One thread, so this runs after everything scheduled before it
+    renditions.executor().submit(lambda: None).result()
+
+
+def room_type(name='Deluxe', price=100, units=2, **fields):
+    return RoomType.objects.create(
+        name=name, category='deluxe', price_per_night=price, description='Sea view',
+        image='rooms/deluxe.jpg', amenities='wifi', unit_count=units, **fields,
+    )
+
+
+@override_settings(**scratch_settings())
+class SiteTestCase(TestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(SCRATCH, ignore_errors=True)
+
+    def setUp(self):
+        for alias in ('default', 'ratelimit'):
+            caches[alias].clear()
+        # Loaded in-process, so it could hold rows of a rolled back test
+        banners._registry = None
+
+
+class HomePageTests(SiteTestCase):
+
+    def setUp(self):
+        super().setUp()
+        versions.bump_all()
+
+    def test_warm_home_page_runs_no_queries(self):
+        self.client.get('/')
+        with self.assertNumQueries(0):
+            response = self.client.get('/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Fragment-Cache'], 'hits=6, misses=0')
+
+    def test_warm_revalidation_runs_no_queries(self):
+        etag = self.client.get('/')['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get('/', headers={'if-none-match': etag})
+        self.assertEqual(response.status_code, 304)
+
+    def test_saved_section_model_changes_the_version_after_commit(self):
+        etag = self.client.get('/')['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            Testimonial.objects.create(customer_name='Guest', content='Lovely stay', rating=5, is_featured=True)
+        response = self.client.get('/', headers={'if-none-match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertIsNotNone(caches['default'].get(versions.version_key('home')))
+
+
+class RenditionTests(SiteTestCase):
+
+    def save_photo(self, **fields):
+        with self.captureOnCommitCallbacks(execute=True):
+            photo = Photo.objects.create(image=upload(), **fields)
+        wait_for_renditions()
+        return photo
+
+    def test_save_builds_renditions_after_the_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            photo = Photo.objects.create(image=upload())
+        self.assertFalse(renditions.has_renditions(photo.image))
+        for callback in callbacks:
+            callback()
+        wait_for_renditions()
+        self.assertTrue(renditions.has_renditions(photo.image))
+
+    def test_picture_only_lists_formats_with_renditions(self):
+        photo = self.save_photo()
+        for width in renditions.RENDITION_WIDTHS:
+            default_storage.delete(renditions.rendition_name(photo.image.name, width, 'avif'))
+        html = responsive_image(photo.image)
+        self.assertIn('<source type="image/webp"', html)
+        self.assertNotIn('image/avif', html)
+
+    def test_picture_falls_back_to_the_original(self):
+        with self.captureOnCommitCallbacks(execute=False):
+            photo = Photo.objects.create(image=upload())
+        self.assertEqual(
+            responsive_image(photo.image),
+            f'<img src="{photo.image.url}" alt="" class="" loading="lazy" decoding="async">',
+        )
+
+    def test_replaced_and_deleted_uploads_lose_their_renditions(self):
+        photo = self.save_photo()
+        first = photo.image.name
+        photo.image = upload('other.jpg')
+        with self.captureOnCommitCallbacks(execute=True):
+            photo.save()
+        wait_for_renditions()
+        self.assertFalse(default_storage.exists(renditions.rendition_name(first, 480, 'webp')))
+        self.assertTrue(renditions.has_renditions(photo.image))
+
+        second = photo.image.name
+        with self.captureOnCommitCallbacks(execute=True):
+            photo.delete()
+        wait_for_renditions()
+        self.assertFalse(default_storage.exists(renditions.rendition_name(second, 480, 'webp')))
+
+
+class OutboxTests(SiteTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.now = timezone.now()
+
+    def message(self, **fields):
+        fields.setdefault('notification_next_attempt', self.now)
+        return ContactMessage.objects.create(name='Guest', email='guest@example.com', message='Hello', **fields)
+
+    def test_claimed_messages_are_leased(self):
+        first = self.message()
+        self.assertEqual(outbox.claim_due(self.now), [first])
+        # A concurrent sender finds nothing until the lease runs out
+        self.assertEqual(outbox.claim_due(self.now), [])
+        self.assertEqual(outbox.claim_due(self.now + outbox.CLAIM_LEASE), [first])
+
+    def test_claims_respect_the_limit_and_order(self):
+        messages = [self.message() for _ in range(3)]
+        self.assertEqual(outbox.claim_due(self.now, limit=2), messages[:2])
+        self.assertEqual(outbox.claim_due(self.now), messages[2:])
+
+    def test_failures_back_off_then_give_up(self):
+        message = self.message()
+        when = self.now
+        for attempt in range(1, outbox.MAX_ATTEMPTS + 1):
+            self.assertEqual(outbox.claim_due(when), [message])
+            outbox.mark_failed([ContactMessage.objects.get(pk=message.pk)], 'refused', when)
+            retry = when + outbox.backoff(attempt)
+            self.assertEqual(outbox.claim_due(retry - timedelta(seconds=1)), [])
+            when = retry
+        message.refresh_from_db()
+        self.assertEqual(message.notification_status, 'failed')
+        self.assertEqual(message.notification_attempts, outbox.MAX_ATTEMPTS)
+        self.assertEqual(outbox.backoff(outbox.MAX_ATTEMPTS), outbox.BACKOFF_MAX)
+
+    @override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+    def test_bursts_go_out_as_one_digest(self):
+        for _ in range(outbox.DIGEST_THRESHOLD):
+            self.message(notification_next_attempt=self.now - timedelta(seconds=1))
+        self.assertEqual(outbox.send_pending(), (outbox.DIGEST_THRESHOLD, 0))
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn(f'{outbox.DIGEST_THRESHOLD} New Contact Messages', mail.outbox[0].subject)
+        self.assertFalse(ContactMessage.objects.filter(notification_status='pending').exists())
+
+
+class InventoryTests(SiteTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.today = timezone.localdate()
+        self.deluxe = room_type(units=2)
+
+    def stay(self, first, nights):
+        check_in = self.today + timedelta(days=first)
+        return check_in, check_in + timedelta(days=nights)
+
+    def book(self, room, first, nights, units=1):
+        return inventory.book(room, *self.stay(first, nights), units=units, name='Guest', email='guest@example.com')
+
+    def test_book_rejects_an_overbooked_night(self):
+        self.book(self.deluxe, 10, 3, units=2)
+        with self.assertRaises(ValidationError):
+            # Overlaps the last night only
+            self.book(self.deluxe, 12, 2)
+        self.assertEqual(Reservation.objects.count(), 1)
+        # Check-out day is free again
+        self.book(self.deluxe, 13, 2)
+
+    def test_cancel_frees_the_nights(self):
+        reservation = self.book(self.deluxe, 5, 2, units=2)
+        inventory.cancel(reservation)
+        self.book(self.deluxe, 5, 2, units=2)
+
+    def test_stays_must_move_forward_and_stay_short(self):
+        with self.assertRaises(ValidationError):
+            self.book(self.deluxe, 5, 0)
+        with self.assertRaises(ValidationError):
+            self.book(self.deluxe, 5, inventory.MAX_NIGHTS + 1)
+
+    def test_search_counts_free_units_and_prices_the_stay(self):
+        suite = room_type('Suite', price=250, units=1)
+        self.book(self.deluxe, 20, 2)
+        self.book(suite, 21, 1)
+
+        results = inventory.search(*self.stay(20, 2))
+        self.assertEqual([(r.room_type, r.available, r.nights, r.total_price) for r in results], [
+            (self.deluxe, 1, 2, Decimal('200.00')),
+        ])
+        self.assertEqual(inventory.search(*self.stay(20, 2), units=2), [])
+
+    def test_search_is_one_query(self):
+        room_type('Suite', price=250, units=1)
+        self.book(self.deluxe, 25, 3)
+        # Spans a month boundary
+        month = next_month(next_month(rates.horizon()[0]))
+        with self.assertNumQueries(1):
+            inventory.search(month - timedelta(days=2), month + timedelta(days=3))
+
+    def test_search_past_the_calendar_prices_on_the_fly(self):
+        check_in = rates.horizon()[1] + timedelta(days=3)
+        inventory.book(self.deluxe, check_in, check_in + timedelta(days=2), name='Guest', email='guest@example.com')
+        [result] = inventory.search(check_in, check_in + timedelta(days=2))
+        self.assertEqual((result.available, result.total_price), (1, Decimal('200.00')))
+
+
+class RateCalendarTests(SiteTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.today = timezone.localdate()
+        self.deluxe = room_type(price=100)
+
+    def offer(self, first, last, price=80):
+        return SpecialOffer.objects.create(
+            title='Early bird', room_type=self.deluxe, discounted_price=price, original_price=100,
+            description='Save', image='offers/early.jpg',
+            valid_from=self.today + timedelta(days=first), valid_until=self.today + timedelta(days=last),
+        )
+
+    def calendar_months(self):
+        months = RoomRate.objects.filter(room_type=self.deluxe).values_list('month', flat=True)
+        return min(months), max(months), len(months)
+
+    def horizon_months(self):
+        start, end = rates.horizon()
+        return start, month_start(end - timedelta(days=1)), len(list(months_spanned(start, end)))
+
+    def quote(self, first, nights):
+        check_in = self.today + timedelta(days=first)
+        return rates.quote(check_in, check_in + timedelta(days=nights), [self.deluxe])[self.deluxe.pk]
+
+    def test_saving_a_room_type_builds_the_whole_horizon(self):
+        self.assertEqual(self.calendar_months(), self.horizon_months())
+
+    def test_offers_lower_the_nights_they_cover(self):
+        self.offer(11, 12)
+        # Nights 10, 11, 12, 13: the offer covers the middle two
+        self.assertEqual(self.quote(10, 4), Decimal('360.00'))
+
+    def test_moved_and_deleted_offers_reprice_their_old_nights(self):
+        offer = self.offer(11, 12)
+        offer.valid_from = offer.valid_until = self.today + timedelta(days=30)
+        offer.save()
+        self.assertEqual(self.quote(10, 4), Decimal('400.00'))
+        self.assertEqual(self.quote(30, 1), Decimal('80.00'))
+        with self.captureOnCommitCallbacks(execute=True):
+            offer.delete()
+        self.assertEqual(self.quote(30, 1), Decimal('100.00'))
+
+    def test_roll_forward_extends_the_calendar_into_new_months(self):
+        later = next_month(next_month(self.today)) + timedelta(days=3)
+        with mock.patch('main.rates.timezone.localdate', return_value=later):
+            self.assertEqual(rates.roll_forward(), 2)
+            self.assertEqual(self.calendar_months(), self.horizon_months())
+            self.assertEqual(rates.roll_forward(), 0)
+
+    def test_ensure_horizon_only_rolls_once_a_month(self):
+        rates.ensure_horizon()
+        with self.assertNumQueries(0):
+            rates.ensure_horizon()
+
+
+class EventArchiveTests(SiteTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.today = timezone.localdate()
+        # Two events a day, so cursors have to break date ties by id
+        self.events = [
+            self.event(day) for day in range(-10, 10) for _ in range(2)
+        ]
+
+    def event(self, day, description='Music'):
+        return Event.objects.create(
+            title=f'Event {day}', description=description, image='events/night.jpg',
+            event_date=self.today + timedelta(days=day),
+        )
+
+    def walk(self, stream):
+        pages = [event_archive.stream_page(stream, today=self.today)]
+        while pages[-1].has_next():
+            pages.append(event_archive.stream_page(stream, after=pages[-1].next_cursor, today=self.today))
+        return pages
+
+    def test_after_cursors_walk_every_event_once_in_order(self):
+        upcoming = [event for page in self.walk('upcoming') for event in page]
+        self.assertEqual(upcoming, sorted(self.events[20:], key=lambda e: (e.event_date, e.pk)))
+        past = [event for page in self.walk('past') for event in page]
+        self.assertEqual(past, sorted(self.events[:20], key=lambda e: (e.event_date, e.pk), reverse=True))
+
+    def test_before_cursors_return_the_same_pages(self):
+        pages = self.walk('upcoming')
+        self.assertEqual([len(page) for page in pages], [9, 9, 2])
+        self.assertFalse(pages[0].has_previous())
+        for previous, page in zip(reversed(pages[:-1]), reversed(pages[1:])):
+            back = event_archive.stream_page('upcoming', before=page.previous_cursor, today=self.today)
+            self.assertEqual(list(back), list(previous))
+            self.assertEqual(back.next_cursor, previous.next_cursor)
+
+    def test_pages_stay_stable_when_earlier_events_are_added(self):
+        first = event_archive.stream_page('upcoming', today=self.today)
+        expected = event_archive.stream_page('upcoming', after=first.next_cursor, today=self.today)
+        self.event(0)
+        self.event(1)
+        second = event_archive.stream_page('upcoming', after=first.next_cursor, today=self.today)
+        self.assertEqual(list(second), list(expected))
+
+    def test_malformed_cursors_start_from_the_top(self):
+        page = event_archive.stream_page('upcoming', after='not-a-cursor', today=self.today)
+        self.assertEqual(list(page), list(event_archive.stream_page('upcoming', today=self.today)))
+
+    def test_month_counts_follow_saves_and_deletes(self):
+        event_archive.rebuild_month_counts()
+        expected = dict(EventMonthCount.objects.values_list('month', 'count'))
+        event = self.events[0]
+        month = month_start(event.event_date)
+
+        event.is_active = False
+        event.save()
+        self.assertEqual(EventMonthCount.objects.get(month=month).count, expected[month] - 1)
+        event.is_active = True
+        event.event_date = self.today + timedelta(days=400)
+        event.save()
+        self.assertEqual(EventMonthCount.objects.get(month=month).count, expected[month] - 1)
+        self.assertEqual(EventMonthCount.objects.get(month=month_start(event.event_date)).count, 1)
+        event.delete()
+        self.assertEqual(EventMonthCount.objects.get(month=month_start(event.event_date)).count, 0)
+
+    def test_ics_lines_are_folded_at_75_octets(self):
+        self.event(2, description='Live jazz ' * 40)
+        calendar = event_archive.ics_calendar(event_archive.ics_events(self.today), 'example.com')
+        lines = calendar.split('\r\n')
+        self.assertTrue(all(len(line.encode()) <= 75 for line in lines))
+        self.assertEqual(calendar.count('BEGIN:VEVENT'), 41)
+
+
+class CssPurgeTests(SiteTestCase):
+
+    def test_check_passes_for_the_shipped_stylesheets(self):
+        output = StringIO()
+        call_command('purge_css', '--check', stdout=output)
+        self.assertIn('No selector used in the templates was purged.', output.getvalue())
+
+    def test_check_reports_selectors_a_purge_wrongly_dropped(self):
+        css = '.btn{color:red}@media (min-width:1px){.btn,.never-rendered-anywhere{color:blue}}'
+        # Nothing counts as used, so the purge drops rules the templates need
+        self.assertEqual(csspurge.removed_in_use(css, used=frozenset()), ['.btn', '.btn'])
+        self.assertEqual(csspurge.removed_in_use(css), [])
+
+
+class SearchTests(SiteTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.curry = RestaurantMenuItem.objects.create(
+            category='mains', name='Cinnamon chicken curry', price=12, description='Slow cooked',
+        )
+
+    def titles(self, text):
+        return [result.title for result in search.search(text)]
+
+    def test_prefixes_match_and_titles_are_marked(self):
+        self.assertEqual(self.titles('cinn curr'), ['<mark>Cinnamon</mark> chicken <mark>curry</mark>'])
+
+    def test_triggers_follow_bulk_updates_and_deletes(self):
+        RestaurantMenuItem.objects.filter(pk=self.curry.pk).update(name='Lamb curry')
+        self.assertEqual(self.titles('cinnamon'), [])
+        self.assertEqual(len(self.titles('lamb')), 1)
+        RestaurantMenuItem.objects.filter(pk=self.curry.pk).update(is_available=False)
+        self.assertEqual(self.titles('lamb'), [])
+        self.curry.delete()
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT count(*) FROM {search.SEARCH_TABLE}')
+            self.assertEqual(cursor.fetchone()[0], 0)
+
+    def test_query_syntax_is_not_passed_through(self):
+        self.assertEqual(self.titles('curry OR "'), self.titles('curry or'))
+        self.assertEqual(self.titles('***'), [])
+
+    def test_dropped_triggers_are_recreated_and_the_index_rebuilt(self):
+        self.assertEqual(search.ensure_triggers(), [])
+        # As a migration's table rebuild would
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP TRIGGER {search.SEARCH_TABLE}_menu_au')
+        RestaurantMenuItem.objects.filter(pk=self.curry.pk).update(name='Lamb curry')
+        self.assertEqual(self.titles('lamb'), [])
+
+        self.assertEqual(search.ensure_triggers(), [f'{search.SEARCH_TABLE}_menu_au'])
+        self.assertEqual(len(self.titles('lamb')), 1)
+        RestaurantMenuItem.objects.filter(pk=self.curry.pk).update(name='Fish curry')
+        self.assertEqual(len(self.titles('fish')), 1)
+
+
+@override_settings(CONTACT_RATE_LIMITS={
+    'ip': {'burst': 3, 'per_minute': 1},
+    'global': {'burst': 5, 'per_minute': 1},
+})
+class RateLimitTests(SiteTestCase):
+
+    def post(self, address='203.0.113.1'):
+        return self.client.post('/contact/', {}, REMOTE_ADDR=address)
+
+    def test_post_past_the_client_burst_is_rejected(self):
+        for _ in range(3):
+            self.assertEqual(self.post().status_code, 200)
+        response = self.post()
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '60')
+        # Other clients have their own buckets
+        self.assertEqual(self.post('203.0.113.2').status_code, 200)
+        self.assertEqual(ratelimit.rejections(), {'ip': 1, 'global': 0})
+
+    def test_post_past_the_global_burst_is_rejected(self):
+        for n in range(5):
+            self.assertEqual(self.post(f'203.0.113.{n}').status_code, 200)
+        self.assertEqual(self.post('203.0.113.9').status_code, 429)
+        self.assertEqual(ratelimit.rejections(), {'ip': 0, 'global': 1})
+
+    def test_each_client_bucket_is_its_own_entry_that_expires_when_full(self):
+        ratelimit.take('203.0.113.1', now=1000)
+        cache = ratelimit.rate_cache()
+        self.assertEqual(cache.get(ratelimit.bucket_key('ip', '203.0.113.1')), (2, 1000))
+        self.assertIsNone(cache.get(ratelimit.bucket_key('ip', '203.0.113.2')))
+        self.assertEqual(cache.get(ratelimit.bucket_key('global', '203.0.113.1')), (4, 1000))
+        # Refilled a minute later, so the POST takes from a full bucket
+        self.assertTrue(ratelimit.take('203.0.113.1', now=1060).allowed)
+        self.assertEqual(cache.get(ratelimit.bucket_key('ip', '203.0.113.1')), (2, 1060))
+
+    def test_sweep_deletes_only_expired_entries(self):
+        cache = ratelimit.rate_cache()
+        cache.set('fresh', 1, timeout=600)
+        cache.set('kept', 1, timeout=None)
+        cache.set('stale', 1, timeout=60)
+        with mock.patch('time.time', return_value=time.time() + 120):
+            with mock.patch('random.random', return_value=0):
+                cache.set('written', 1, timeout=None)
+        self.assertEqual(len(cache._list_cache_files()), 3)
+        self.assertEqual(cache.get_many(['fresh', 'kept', 'written']), {'fresh': 1, 'kept': 1, 'written': 1})
+
+    def test_bench_stays_on_the_accepted_path(self):
+        output = StringIO()
+        call_command('bench_rate_limit', requests=50, clients=5, dir=str(SCRATCH), stdout=output)
+        self.assertIn('50 accepted POSTs from 5 clients', output.getvalue())
+
+
+class InboxTests(SiteTestCase):
+
+    def messages(self, count, **fields):
+        created = ContactMessage.objects.bulk_create(
+            ContactMessage(name=f'Guest {n}', email='guest@example.com', message='Hello', **fields)
+            for n in range(count)
+        )
+        # Two messages to each timestamp, so pages split between ties
+        base = timezone.now()
+        for n, message in enumerate(created):
+            ContactMessage.objects.filter(pk=message.pk).update(created_at=base + timedelta(minutes=n // 2))
+        return list(ContactMessage.objects.order_by(*inbox.ORDERING))
+
+    def test_pages_walk_every_message_once_both_ways(self):
+        newest_first = self.messages(11)
+        queryset = ContactMessage.objects.all()
+        pages, page = [], inbox.paginate(queryset, per_page=4)
+        while True:
+            pages.append(list(page.object_list))
+            if not page.next_cursor:
+                break
+            page = inbox.paginate(queryset, after=page.next_cursor, per_page=4)
+        self.assertEqual([len(rows) for rows in pages], [4, 4, 3])
+        self.assertEqual(sum(pages, []), newest_first)
+        self.assertIsNone(inbox.paginate(queryset, per_page=4).previous_cursor)
+
+        # Back from the oldest page
+        back = [pages[-1]]
+        while page.previous_cursor:
+            page = inbox.paginate(queryset, before=page.previous_cursor, per_page=4)
+            back.insert(0, list(page.object_list))
+        self.assertEqual(back, pages)
+
+    def test_malformed_cursor_shows_the_newest_page(self):
+        newest_first = self.messages(3)
+        page = inbox.paginate(ContactMessage.objects.all(), after='not-a-cursor', per_page=2)
+        self.assertEqual(list(page.object_list), newest_first[:2])
+
+    def test_counts_are_exact_then_estimated(self):
+        self.messages(6)
+        self.assertEqual(inbox.estimated_count(ContactMessage.objects.all()), (6, True))
+        with mock.patch.object(inbox, 'COUNT_EXACT_UP_TO', 4):
+            count, exact = inbox.estimated_count(ContactMessage.objects.all())
+        self.assertFalse(exact)
+        # Contiguous ids are as dense all the way down, so the estimate is right
+        self.assertEqual(count, 6)
+        ContactMessage.objects.filter(pk__in=[m.pk for m in ContactMessage.objects.order_by('id')[1:3]]).delete()
+        with mock.patch.object(inbox, 'COUNT_EXACT_UP_TO', 2):
+            # Assumed as dense as the newest matches, the gap below them counts too
+            self.assertEqual(inbox.estimated_count(ContactMessage.objects.all()), (6, False))
+
+    def test_admin_changelist_pages_with_cursors(self):
+        self.messages(inbox.PAGE_SIZE + 5)
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+        response = self.client.get('/admin/main/contactmessage/')
+        self.assertEqual(response.status_code, 200)
+        changelist = response.context['cl']
+        self.assertEqual(len(changelist.result_list), inbox.PAGE_SIZE)
+        response = self.client.get('/admin/main/contactmessage/' + changelist.older_url())
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['cl'].result_list), 5)
+
+
+class TransferTests(SiteTestCase):
+
+    def menu_item(self, name, price=10, **fields):
+        return RestaurantMenuItem.objects.create(category='mains', name=name, price=price, description='Hot', **fields)
+
+    def export(self, queryset, fmt):
+        return ''.join(transfer.export_chunks(queryset, fmt, chunk_size=2))
+
+    def reimport(self, model, text, fmt):
+        with self.captureOnCommitCallbacks(execute=True):
+            return transfer.import_rows(model, transfer.read_rows(BytesIO(text.encode()), fmt), batch_size=2)
+
+    def test_csv_round_trip_updates_rows_and_their_timestamps(self):
+        items = [self.menu_item(f'Dish {n}') for n in range(3)]
+        RestaurantMenuItem.objects.update(updated_at=timezone.now() - timedelta(days=1))
+        before = {item.pk: item for item in RestaurantMenuItem.objects.all()}
+        text = self.export(RestaurantMenuItem.objects.all(), 'csv').replace(',10.00,', ',12.50,')
+
+        menu_before = menu.get_menu()
+        result = self.reimport(RestaurantMenuItem, text, 'csv')
+        self.assertEqual(result, transfer.ImportResult(0, 3, ['created_at', 'updated_at']))
+        for item in RestaurantMenuItem.objects.all():
+            self.assertEqual(item.price, Decimal('12.50'))
+            self.assertEqual(item.created_at, before[item.pk].created_at)
+            self.assertGreater(item.updated_at, before[item.pk].updated_at)
+        # The cached menu was dropped with the import
+        self.assertNotEqual(menu.get_menu().etag, menu_before.etag)
+        self.assertEqual(len(items), RestaurantMenuItem.objects.count())
+
+    def test_jsonl_rows_without_an_existing_id_are_created(self):
+        text = '{"id": 999, "category": "mains", "name": "New", "price": "9.5", "description": "x", "is_available": "yes"}\n'
+        self.assertEqual(self.reimport(RestaurantMenuItem, text, 'jsonl').created, 1)
+        self.assertTrue(RestaurantMenuItem.objects.get(name='New').is_available)
+
+    def test_formula_cells_are_quoted_on_export_and_restored_on_import(self):
+        ContactMessage.objects.create(name='=HYPERLINK("x")', email='guest@example.com', message='-1')
+        text = self.export(ContactMessage.objects.all(), 'csv')
+        self.assertIn("\'=HYPERLINK", text)
+        row = next(transfer.read_rows(BytesIO(text.encode()), 'csv'))
+        self.assertEqual((row['name'], row['message']), ('=HYPERLINK("x")', '-1'))
+
+    def test_invalid_row_stops_the_import_after_the_earlier_batches(self):
+        rows = [{'category': 'mains', 'name': f'Dish {n}', 'price': '5', 'description': 'x'} for n in range(3)]
+        rows.append({'category': 'mains', 'name': 'Broken', 'price': 'free', 'description': 'x'})
+        with self.assertRaisesMessage(ValidationError, 'Row 4: price'):
+            transfer.import_rows(RestaurantMenuItem, rows, batch_size=2)
+        self.assertEqual(RestaurantMenuItem.objects.count(), 2)
+
+    def test_imported_images_get_renditions(self):
+        name = default_storage.save('events/imported.jpg', upload())
+        rows = [{'title': 'Jazz', 'description': 'Live', 'image': name, 'event_date': '2030-01-01'}]
+        with self.captureOnCommitCallbacks(execute=True):
+            transfer.import_rows(Event, rows)
+        wait_for_renditions()
+        event = Event.objects.get()
+        self.assertTrue(renditions.has_renditions(event.image))
+        self.assertEqual(EventMonthCount.objects.get(month=date(2030, 1, 1)).count, 1)
+
+        # Replacing the image drops the old one's renditions
+        with mock.patch.object(renditions, 'schedule') as schedule:
+            transfer.import_rows(Event, [{'id': event.pk, 'image': 'events/other.jpg'}])
+        (instance, stale), _ = schedule.call_args
+        self.assertEqual(instance.image.name, 'events/other.jpg')
+        self.assertEqual(stale, [(event.image.storage, name)])
+
+    def test_refresh_dependents_covers_every_save_receiver(self):
+        # Add a receiver for an importable model? Do its work in the import too
+        covered = {
+            'build_renditions', 'invalidate_menu', 'invalidate_fragments', 'bump_version', 'republish',
+            'count_saved_event',
+        }
+        for model in (Event, RestaurantMenuItem):
+            receivers, async_receivers = post_save._live_receivers(model)
+            self.assertLessEqual({receiver.__name__ for receiver in [*receivers, *async_receivers]}, covered)
+
+
+class RetentionTests(SiteTestCase):
+
+    def setUp(self):
+        super().setUp()
+        # Ids are reused once a test's rows roll back, so no archive may outlive its test
+        shutil.rmtree(retention.archive_root(), ignore_errors=True)
+        self.now = timezone.make_aware(datetime(2026, 6, 15, 12))
+
+    def message(self, when, **fields):
+        fields.setdefault('message', 'Hello')
+        message = ContactMessage.objects.create(name='Guest', email='guest@example.com', **fields)
+        ContactMessage.objects.filter(pk=message.pk).update(created_at=timezone.make_aware(when))
+        return message.pk
+
+    def test_cutoff_is_the_start_of_the_month_days_ago(self):
+        self.assertEqual(retention.cutoff(self.now, days=30), timezone.make_aware(datetime(2026, 5, 1)))
+        self.assertEqual(retention.cutoff(self.now, days=400), timezone.make_aware(datetime(2025, 5, 1)))
+        self.assertIsNone(retention.cutoff(self.now, days=0))
+
+    def test_only_whole_months_before_the_cutoff_move(self):
+        march = [self.message(datetime(2026, 3, day)) for day in (1, 31)]
+        april = self.message(datetime(2026, 4, 30, 23, 59), message='Late April')
+        may = self.message(datetime(2026, 5, 2))
+
+        moved = retention.move_expired(self.now, batch_size=1, days=30)
+        self.assertEqual([(month.month, month.written, month.deleted) for month in moved], [
+            ('2026-03', 2, 2), ('2026-04', 1, 1),
+        ])
+        self.assertEqual(list(ContactMessage.objects.values_list('pk', flat=True)), [may])
+        self.assertEqual(retention.archived_ids('2026-03'), set(march))
+        self.assertEqual([row['id'] for row in retention.read_month('2026-04')], [april])
+        self.assertEqual([archive.path.name for archive in retention.archive_files()], [
+            '2026-03.jsonl.gz', '2026-04.jsonl.gz',
+        ])
+
+    def test_interrupted_move_carries_on_without_writing_twice(self):
+        pks = [self.message(datetime(2026, 3, day)) for day in (1, 2)]
+        # Written to disk, but stopped before the deletes
+        retention._write_archive('2026-03', ContactMessage.objects.order_by('id').values_list(*retention.columns()))
+        moved = retention.move_month(date(2026, 3, 1))
+        self.assertEqual((moved.written, moved.deleted, moved.path), (0, 2, None))
+        self.assertFalse(ContactMessage.objects.exists())
+
+        # A later message in the same month goes to a second file
+        late = self.message(datetime(2026, 3, 3))
+        moved = retention.move_month(date(2026, 3, 1))
+        self.assertEqual(moved.path.name, '2026-03.1.jsonl.gz')
+        self.assertEqual(retention.archived_ids('2026-03'), {*pks, late})
+
+    def test_month_page_searches_and_pages_the_archive(self):
+        for day in range(1, 6):
+            self.message(datetime(2026, 3, day), message=f'Note {day}', phone='555' if day % 2 else '')
+        retention.move_month(date(2026, 3, 1))
+        rows, has_next = retention.month_page('2026-03', page=1, per_page=2, search='555')
+        self.assertEqual([row['message'] for row in rows], ['Note 1', 'Note 3'])
+        self.assertTrue(has_next)
+        rows, has_next = retention.month_page('2026-03', page=2, per_page=2, search='555')
+        self.assertEqual(([row['message'] for row in rows], has_next), (['Note 5'], False))
+
+    def test_dry_run_only_lists_the_months(self):
+        self.message(timezone.localtime().replace(tzinfo=None) - timedelta(days=90))
+        output = StringIO()
+        call_command('archive_messages', '--days=30', '--dry-run', stdout=output)
+        self.assertIn('1 months before', output.getvalue())
+        self.assertEqual(ContactMessage.objects.count(), 1)
+        self.assertEqual(retention.archive_files(), [])
+
+
+class ResizeTests(SiteTestCase):
+
+    def setUp(self):
+        super().setUp()
+        shutil.rmtree(resize.cache_root(), ignore_errors=True)
+        resize._unscanned = None
+        self.name = default_storage.save('gallery/resize.jpg', upload())
+
+    def get(self, url):
+        response = self.client.get(url)
+        if response.status_code == 200:
+            response.image = Image.open(BytesIO(response.content))
+        return response
+
+    def test_tag_urls_serve_the_resized_image(self):
+        fieldfile = Photo(image=self.name).image
+        response = self.get(resized_url(fieldfile, '300x200', 'crop'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/webp')
+        self.assertEqual(response.image.size, (300, 200))
+        # Fitted, never upscaled
+        self.assertEqual(self.get(resized_url(fieldfile, '0x500')).image.size, (1000, 500))
+        self.assertEqual(self.get(resized_url(fieldfile, '3000x3000')).image.size, (2000, 1000))
+
+    def test_bad_or_moved_signatures_are_404s(self):
+        other = default_storage.save('gallery/other.jpg', upload())
+        spec = resize.format_spec(self.name, 300, 200, 'crop')
+        self.assertEqual(self.client.get(f'/media/r/{spec}/{self.name}').status_code, 200)
+        # Another size under the same signature, or the signature on another upload
+        self.assertEqual(self.client.get(f'/media/r/{spec.replace("300x", "301x")}/{self.name}').status_code, 404)
+        self.assertEqual(self.client.get(f'/media/r/{spec}/{other}').status_code, 404)
+        self.assertEqual(self.client.get(f'/media/r/300x200-crop-webp/{self.name}').status_code, 404)
+
+    def test_picture_offers_each_format_at_1x_and_2x(self):
+        html = resized_image(Photo(image=self.name).image, '1110x624', alt='Pool')
+        self.assertIn('<source type="image/webp"', html)
+        self.assertEqual(html.count(' 2x'), len(renditions.rendition_formats()) + 1)
+        self.assertIn('alt="Pool"', html)
+
+    @override_settings(RESIZE_CACHE_MAX_BYTES=10_000)
+    def test_cache_is_walked_once_a_share_of_the_limit_is_written(self):
+        spec = resize.Spec(40, 40, 'crop', 'webp')
+        with mock.patch.object(resize, 'evict', wraps=resize.evict) as evict:
+            first = resize.resized(spec, self.name)
+            self.assertEqual(evict.call_count, 1)
+            # Under SCAN_EVERY of the limit since: no walk
+            resize.written(1)
+            self.assertEqual(evict.call_count, 1)
+            resize.written(int(10_000 * resize.SCAN_EVERY))
+            self.assertEqual(evict.call_count, 2)
+        self.assertTrue(first.path.exists())
+
+    def test_least_recently_served_outputs_are_evicted(self):
+        paths = [resize.resized(resize.Spec(size, size, 'crop', 'webp'), self.name).path for size in (40, 50, 60)]
+        for age, path in enumerate(reversed(paths)):
+            os.utime(path, (time.time() - 100 * (age + 1),) * 2)
+        # Served again, so now the most recent
+        resize.resized(resize.Spec(40, 40, 'crop', 'webp'), self.name)
+        sizes = {path: path.stat().st_size for path in paths}
+        # Down to EVICT_TO of the limit: room for exactly the other two
+        resize.evict(limit=math.ceil((sizes[paths[0]] + sizes[paths[2]]) / resize.EVICT_TO))
+        self.assertEqual([path.exists() for path in paths], [True, False, True])
+
+    def test_about_page_uses_resized_leadership_images(self):
+        Leadership.objects.create(name='Ana', position='Manager', quote='Welcome', image=self.name, is_active=True)
+        response = self.client.get('/about/')
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, '/media/r/700x854-crop-webp-')
+        self.assertContains(response, '/media/r/40x40-crop-jpeg-')
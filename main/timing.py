@@ -0,0 +1,82 @@
+# main/timing.py
+"""
+Per-request timing behind the Server-Timing header (see main/middleware.py).
+
+ServerTimingMiddleware puts a RequestTiming in ``current_timing`` for the
+duration of a request. SQL time is collected by ``time_current_query``,
+an execute wrapper every connection gets when it opens (connections are
+per thread, and under ASGI a request's queries run in worker threads), and
+template time by TimedDjangoTemplates, the template backend configured in
+settings.TEMPLATES.
+"""
+from contextvars import ContextVar
+from time import perf_counter
+
+from django.template import TemplateDoesNotExist
+from django.template.backends.django import DjangoTemplates, Template, reraise
+
+current_timing = ContextVar('current_timing', default=None)
+
+
+class RequestTiming:
+    __slots__ = ('db', 'queries', 'template')
+
+    def __init__(self):
+        self.db = 0.0
+        self.queries = 0
+        self.template = 0.0
+
+    def time_query(self, execute, sql, params, many, context):
+        started = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db += perf_counter() - started
+            self.queries += 1
+
+    def header(self, total):
+        """Server-Timing value; durations in milliseconds."""
+        return (
+            f'db;dur={self.db * 1000:.1f};desc="{self.queries} queries", '
+            f'tpl;dur={self.template * 1000:.1f};desc="templates", '
+            f'total;dur={total * 1000:.1f};desc="view"'
+        )
+
+
+def time_current_query(execute, sql, params, many, context):
+    timing = current_timing.get()
+    if timing is None:
+        return execute(sql, params, many, context)
+    return timing.time_query(execute, sql, params, many, context)
+
+
+def install_query_timer(sender, connection, **kwargs):
+    """connection_created receiver adding ``time_current_query`` to the connection."""
+    if time_current_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(time_current_query)
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        timing = current_timing.get()
+        if timing is None:
+            return super().render(context, request)
+        started = perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            # Includes any queries the template triggers itself
+            timing.template += perf_counter() - started
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """The standard Django template backend, timing every top-level render."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return TimedTemplate(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
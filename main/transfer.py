@@ -0,0 +1,314 @@
+# main/transfer.py
+"""
+CSV and JSON Lines export and import of admin-managed content.
+
+Exports stream: rows are read with ``.iterator(chunk_size=...)`` and written
+out a chunk at a time, through a StreamingHttpResponse in the admin or to a
+file from ``manage.py export_rows``, so memory stays flat at any row count.
+
+Imports (``manage.py import_rows`` and the admin's Import page) validate
+each row like a model form would, then write a batch at a time with
+``bulk_create`` and batched UPDATEs, each batch in its own transaction.
+Rows with the ``id`` of an existing row update it; the rest are created.
+
+Bulk writes skip save() and the model signals, so the import does their
+work itself. Values are converted with each field's get_db_prep_save and
+auto_now fields are set with the field's pre_save, as save() would. Each
+batch schedules renditions for the images it set or replaced, like the
+renditions receivers in main/signals.py. After the last batch,
+``refresh_dependents()`` does once what every other post_save receiver of
+an importable model would have done per row. The search index needs
+nothing: its triggers fire on the bulk writes too.
+"""
+import csv
+import io
+import json
+import logging
+from collections import namedtuple
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, models, transaction
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from . import event_archive, fragments, menu, publish, renditions, versions
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 2000
+BATCH_SIZE = 1000
+
+FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'jsonl': 'application/x-ndjson; charset=utf-8',
+}
+
+# Model name -> exported columns
+EXPORT_COLUMNS = {
+    'ContactMessage': [
+        'id', 'name', 'email', 'phone', 'message', 'is_read', 'is_archived', 'created_at',
+        'notification_status', 'notification_sent_at',
+    ],
+    'Event': ['id', 'title', 'description', 'image', 'event_date', 'is_active', 'created_at', 'updated_at'],
+    'RestaurantMenuItem': ['id', 'category', 'name', 'price', 'description', 'is_available', 'created_at', 'updated_at'],
+}
+
+# Model name -> columns an import may set, besides the ``id`` that picks the
+# row to update. Other columns (e.g. the timestamps of an export) are ignored.
+IMPORT_COLUMNS = {
+    'Event': ['title', 'description', 'image', 'event_date', 'is_active'],
+    'RestaurantMenuItem': ['category', 'name', 'price', 'description', 'is_available'],
+}
+
+# Spreadsheets run cells starting with these as formulas; contact messages
+# are written by anyone, so such cells are exported behind a quote
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+# Spellings of booleans in CSV cells, beyond the model field's own t/f/1/0
+BOOLEAN_TEXT = {'true': True, 'false': False, 'yes': True, 'no': False}
+
+ImportResult = namedtuple('ImportResult', 'created updated ignored')
+
+
+def format_for(filename):
+    """'csv' or 'jsonl' from a file name's extension, or None."""
+    extension = filename.rsplit('.', 1)[-1].lower()
+    return {'csv': 'csv', 'jsonl': 'jsonl', 'ndjson': 'jsonl'}.get(extension)
+
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def _csv_cell(value):
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def _csv_value(cell):
+    if cell[:1] == "'" and cell[1:].startswith(FORMULA_PREFIXES):
+        return cell[1:]
+    return cell
+
+
+def export_chunks(queryset, fmt, columns=None, chunk_size=CHUNK_SIZE):
+    """The rows of ``queryset`` as CSV or JSON Lines text, ``chunk_size`` rows per string."""
+    columns = columns or EXPORT_COLUMNS[queryset.model.__name__]
+    rows = queryset.order_by('pk').values_list(*columns).iterator(chunk_size=chunk_size)
+    if fmt == 'csv':
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+        for chunk in _chunks(rows, chunk_size):
+            writer.writerows([_csv_cell(value) for value in row] for row in chunk)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        # A header-only export still has its header
+        if buffer.tell():
+            yield buffer.getvalue()
+    elif fmt == 'jsonl':
+        encoder = DjangoJSONEncoder(ensure_ascii=False)
+        for chunk in _chunks(rows, chunk_size):
+            yield ''.join(encoder.encode(dict(zip(columns, row))) + '\n' for row in chunk)
+    else:
+        raise ValueError(f'Unknown export format {fmt!r}')
+
+
+def export_response(queryset, fmt):
+    """A download of ``export_chunks(queryset, fmt)``, streamed as it is read."""
+    response = StreamingHttpResponse(export_chunks(queryset, fmt), content_type=FORMATS[fmt])
+    filename = f'{queryset.model._meta.model_name}-{timezone.localtime():%Y%m%d-%H%M}.{fmt}'
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+def read_rows(stream, fmt):
+    """Dicts of column -> text (CSV) or JSON value, from a binary file object."""
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    if fmt == 'csv':
+        for row in csv.DictReader(text):
+            yield {column: _csv_value(cell) for column, cell in row.items() if column is not None}
+    elif fmt == 'jsonl':
+        for number, line in enumerate(text, 1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                raise ValidationError(f'Line {number}: {e}')
+            if not isinstance(row, dict):
+                raise ValidationError(f'Line {number}: expected a JSON object')
+            yield row
+    else:
+        raise ValueError(f'Unknown import format {fmt!r}')
+
+
+def _build(model, number, row, allowed):
+    """An unsaved ``model`` instance from an import row, and the columns it sets."""
+    columns = [column for column in allowed if column in row]
+    pk = row.get('id')
+    if pk in ('', None):
+        pk = None
+    else:
+        try:
+            pk = int(pk)
+        except (TypeError, ValueError):
+            raise ValidationError(f'Row {number}: id: {pk!r} is not a number.')
+    values = {}
+    for column in columns:
+        value = '' if row[column] is None else row[column]
+        if isinstance(value, str) and isinstance(model._meta.get_field(column), models.BooleanField):
+            value = BOOLEAN_TEXT.get(value.strip().lower(), value)
+        values[column] = value
+    return model(pk=pk, **values), columns
+
+
+def _validate(number, instance, columns=None):
+    """Clean ``instance``'s fields like a model form, only ``columns`` if given."""
+    exclude = None if columns is None else [field.name for field in instance._meta.fields if field.name not in columns]
+    try:
+        instance.clean_fields(exclude=exclude)
+    except ValidationError as e:
+        errors = '; '.join(f'{field}: {" ".join(messages)}' for field, messages in e.message_dict.items())
+        raise ValidationError(f'Row {number}: {errors}')
+
+
+def _update_rows(model, instances, columns):
+    """
+    ``bulk_update(instances, columns)`` as one executemany of plain UPDATEs:
+    building bulk_update's CASE/WHEN for every row and column cost about 1 ms
+    a row, more than the writes themselves (20,000 updates: 4,185 rows/s,
+    against 633-744 rows/s for bulk_update at batch sizes of 50 to 1,000).
+    Values are prepared with get_db_prep_save, as bulk_update and save() do.
+    """
+    fields = [model._meta.get_field(column) for column in columns]
+    quote = connection.ops.quote_name
+    assignments = ', '.join(f'{quote(field.column)} = %s' for field in fields)
+    sql = f'UPDATE {quote(model._meta.db_table)} SET {assignments} WHERE {quote(model._meta.pk.column)} = %s'
+    params = [
+        [field.get_db_prep_save(getattr(instance, field.attname), connection) for field in fields] + [instance.pk]
+        for instance in instances
+    ]
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, params)
+
+
+def _image_changes(model, creates, updates):
+    """
+    ``(instance, stale uploads)`` for the rows of a batch that set or
+    replace an image, read before the batch is written.
+    """
+    fields = renditions.image_fields(model)
+    if not fields:
+        return []
+    names = [field.name for field in fields]
+    changes = [(instance, []) for instance in creates if any(getattr(instance, name) for name in names)]
+    replacing = [
+        instance for columns, instances in updates.items() if set(names) & set(columns)
+        for instance in instances
+    ]
+    if replacing:
+        previous = {
+            row['pk']: row for row in
+            model.objects.filter(pk__in=[instance.pk for instance in replacing]).values('pk', *names)
+        }
+        for instance in replacing:
+            old = previous[instance.pk]
+            changed = [field for field in fields if old[field.name] != getattr(instance, field.name).name]
+            if changed:
+                changes.append((instance, [(field.storage, old[field.name]) for field in changed if old[field.name]]))
+    return changes
+
+
+def _write_batch(model, batch):
+    """Validate, then create or update one batch of ``(number, instance, columns)``; ``(created, updated)``."""
+    ids = [instance.pk for _, instance, _ in batch if instance.pk is not None]
+    existing = set(model.objects.filter(pk__in=ids).values_list('pk', flat=True)) if ids else set()
+    creates, updates = [], {}
+    for number, instance, columns in batch:
+        if instance.pk in existing:
+            # Updates only change the columns given
+            _validate(number, instance, columns)
+            updates.setdefault(tuple(columns), []).append(instance)
+        else:
+            _validate(number, instance)
+            creates.append(instance)
+
+    auto_now = [field for field in model._meta.concrete_fields if getattr(field, 'auto_now', False)]
+    images = _image_changes(model, creates, updates)
+    model_name = model.__name__
+    with transaction.atomic():
+        if creates:
+            model.objects.bulk_create(creates)
+        for columns, instances in updates.items():
+            columns = list(columns)
+            # Plain UPDATEs don't apply auto_now; the field sets it as save() would
+            for field in auto_now:
+                for instance in instances:
+                    field.pre_save(instance, add=False)
+                columns.append(field.name)
+            if columns:
+                _update_rows(model, instances, columns)
+        # Built in the background once the batch commits, as after a save
+        for instance, stale in images:
+            renditions.schedule(instance, stale, on_built=lambda: fragments.invalidate_model(model_name))
+    return len(creates), sum(len(instances) for instances in updates.values())
+
+
+def import_rows(model, rows, batch_size=BATCH_SIZE):
+    """
+    Create or update ``model`` rows from ``rows`` (see ``read_rows``), a batch
+    at a time. Raises ValidationError at the first invalid row; the batches
+    before it stay imported.
+    """
+    allowed = IMPORT_COLUMNS[model.__name__]
+    created = updated = 0
+    ignored = set()
+    try:
+        for chunk in _chunks(enumerate(rows, 1), batch_size):
+            batch = []
+            for number, row in chunk:
+                ignored.update(column for column in row if column != 'id' and column not in allowed)
+                batch.append((number, *_build(model, number, row, allowed)))
+            batch_created, batch_updated = _write_batch(model, batch)
+            created += batch_created
+            updated += batch_updated
+    finally:
+        if created or updated:
+            refresh_dependents(model.__name__)
+    return ImportResult(created, updated, sorted(ignored))
+
+
+def refresh_dependents(model_name):
+    """
+    Once for a whole import, what the post_save receivers in main/signals.py
+    (other than the renditions ones, see ``_write_batch``) would have done
+    for each saved ``model_name`` row: drop the cached menu
+    (invalidate_menu) and page sections (invalidate_fragments), bump the
+    page versions (bump_version) and republish those pages (republish), and
+    recount the event months (count_saved_event, which would have moved the
+    counts row by row). Banners, room rates and special offers have
+    receivers too, but can't be imported.
+    """
+    if model_name == 'RestaurantMenuItem':
+        menu.invalidate()
+    if model_name in fragments.fragment_models():
+        fragments.invalidate_model(model_name)
+    if model_name in versions.versioned_models():
+        versions.bump(model_name)
+        publish.schedule(model_name)
+    if model_name == 'Event':
+        event_archive.rebuild_month_counts()
+    logger.info('Refreshed caches and versions after a bulk import of %s', model_name)
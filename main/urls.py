@@ -1,13 +1,22 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import async_views, views
+
+if settings.ASYNC_VIEWS:
+    views = async_views
 
 urlpatterns = [
     path('', views.home, name='home'),
     path('rooms/', views.rooms, name='rooms'),
     path('about/', views.about, name='about'),
     path('events/', views.events, name='events'),
+    path('events.ics', views.events_ics, name='events_ics'),
+    path('menu.json', views.menu_json, name='menu_json'),
+    path('media/r/<str:spec>/<path:path>', views.resized_image, name='resized_image'),
     path('contact/', views.contact, name='contact'),
     path('reservation/', views.reservation, name='reservation'),
+    path('search/', views.search, name='search'),
+    path('search/suggest/', views.search_suggest, name='search_suggest'),
     path('blog/<slug:slug>/', views.blog_detail, name='blog_detail'),
     
     
@@ -0,0 +1,162 @@
+# main/versions.py
+"""
+Conditional GET for the content pages.
+
+Every save or delete of a model that a page is built from stamps that
+model's ContentVersion row (main/signals.py). ``conditional_page`` reads
+the newest stamp among the page's models and answers If-None-Match /
+If-Modified-Since with a 304 before the view runs any of its own queries or
+renders anything. That stamp is kept in the cache beside the page fragments
+and dropped, like them, once a stamping save commits, so a warm request
+runs no queries at all.
+"""
+import hashlib
+import os
+from datetime import datetime, time
+from functools import cache, wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.cache import cache as shared_cache
+from django.db import OperationalError, transaction
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+from . import fragments, warmup
+from .models import ContentVersion
+
+# URL name -> names of the models whose rows appear on that page
+PAGES = {
+    # The hero banner isn't a cached section (main/banners.py rotates it daily)
+    'home': sorted({'HeaderImage'}.union(
+        name for (page, _), names in fragments.FRAGMENTS.items() if page == 'home' for name in names
+    )),
+    'rooms': ['RoomGallery', 'RoomHeaderImage', 'RoomType', 'SpecialOffer'],
+    'about': ['AboutDescription', 'AboutHeaderImage', 'History', 'Leadership', 'Photo'],
+    'events': ['Event', 'EventsHeaderImage'],
+}
+
+
+def versioned_models():
+    return {name for names in PAGES.values() for name in names}
+
+
+def version_key(page):
+    return f'version:{page}'
+
+
+def bump(model_name, when=None):
+    ContentVersion.objects.update_or_create(model=model_name, defaults={'updated_at': when or timezone.now()})
+    keys = [version_key(page) for page, names in PAGES.items() if model_name in names]
+    # After the commit, as for the fragments: dropped earlier, a request
+    # could cache the old version again for good
+    transaction.on_commit(lambda: shared_cache.delete_many(keys))
+
+
+def bump_all(when=None):
+    """Stamp every versioned model, after changes made without signals (bulk_create, update)."""
+    when = when or timezone.now()
+    for name in sorted(versioned_models()):
+        bump(name, when)
+
+
+def compute_release():
+    """
+    Changes with every deploy that can change the HTML: Render's commit, or
+    else the templates themselves, plus the static manifest (bundle names).
+    """
+    digest = hashlib.sha1(os.environ.get('RENDER_GIT_COMMIT', '').encode())
+    if not os.environ.get('RENDER_GIT_COMMIT'):
+        for name in warmup.template_names():
+            digest.update((warmup.TEMPLATE_DIR / name).read_bytes())
+    digest.update(str(getattr(staticfiles_storage, 'manifest_hash', '')).encode())
+    return digest.hexdigest()
+
+
+deployed_release = cache(compute_release)
+
+
+def release():
+    if settings.DEBUG:
+        # runserver picks up template edits without restarting
+        return compute_release()
+    return deployed_release()
+
+
+def load_version(page):
+    return ContentVersion.objects.filter(model__in=PAGES[page]).aggregate(Max('updated_at'))['updated_at__max']
+
+
+def page_version(page):
+    """When the newest row behind ``page`` changed, or None if unknown; cached until the next bump."""
+    # Wrapped, so a page without any stamps yet is cached too
+    cached = shared_cache.get(version_key(page))
+    if cached is not None:
+        return cached[0]
+    try:
+        version = load_version(page)
+    except OperationalError:
+        return None
+    shared_cache.set(version_key(page), (version,), None)
+    return version
+
+
+def validators(page):
+    """``(etag, last_modified)`` for ``page``, or ``(None, None)`` if it has no version yet."""
+    version = page_version(page)
+    if version is None:
+        return None, None
+    # Offers, the events streams and the booking widget's dates all depend on
+    # the day, so a new day is a new version too
+    today = timezone.localdate()
+    midnight = timezone.make_aware(datetime.combine(today, time.min))
+    last_modified = max(version, midnight)
+    token = f'{page}:{version.isoformat()}:{today.isoformat()}:{release()}'
+    return quote_etag(hashlib.sha1(token.encode()).hexdigest()[:32]), int(last_modified.timestamp())
+
+
+def with_validators(response, etag, last_modified):
+    if response.status_code in (200, 304):
+        response.headers.setdefault('ETag', etag)
+        response.headers.setdefault('Last-Modified', http_date(last_modified))
+        # Browsers may keep the page but must check it is still current
+        patch_cache_control(response, no_cache=True)
+    return response
+
+
+def conditional_page(page):
+    """
+    Serve ``page`` conditionally: a 304 for a matching If-None-Match or
+    If-Modified-Since, else the view's response with ETag and Last-Modified.
+    Works on sync and async views.
+    """
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def inner(request, *args, **kwargs):
+                if request.method not in ('GET', 'HEAD'):
+                    return await view(request, *args, **kwargs)
+                etag, last_modified = await sync_to_async(validators)(page)
+                if etag is None:
+                    return await view(request, *args, **kwargs)
+                response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+                if response is None:
+                    response = await view(request, *args, **kwargs)
+                return with_validators(response, etag, last_modified)
+        else:
+            @wraps(view)
+            def inner(request, *args, **kwargs):
+                if request.method not in ('GET', 'HEAD'):
+                    return view(request, *args, **kwargs)
+                etag, last_modified = validators(page)
+                if etag is None:
+                    return view(request, *args, **kwargs)
+                response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+                if response is None:
+                    response = view(request, *args, **kwargs)
+                return with_validators(response, etag, last_modified)
+        return inner
+    return decorator
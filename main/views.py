@@ -1,16 +1,23 @@
 # main/views.py
 from django.shortcuts import render, get_object_or_404, redirect  # Add redirect import
+from django.core.exceptions import ValidationError
+from django.http import HttpResponse, JsonResponse
 from django.db import OperationalError
-from django.core.mail import send_mail
-from django.conf import settings
+from django.db.models import Q
 from django.contrib import messages
-from .forms import ContactForm
+from django.utils import timezone
+from django.utils.functional import SimpleLazyObject
+from django.views.decorators.http import require_safe
+from .forms import AvailabilityForm, ContactForm, ReservationForm
+from . import banners, event_archive, inventory, menu as site_menu, resize, search as site_search
+from .ratelimit import rate_limited_posts
+from .fragments import render_fragments
+from .versions import conditional_page
 from .models import (
     RoomGallery, RoomType, SpecialOffer, Testimonial, 
-    HeaderImage, Event, RestaurantMenuItem,
+    Event,
     AboutDescription, Leadership, Photo, History, 
-    AboutHeaderImage, EventsHeaderImage,
-    ContactInfo,ContactMessage,RoomHeaderImage,HomePageDescription,ContactHeaderImage
+    ContactInfo,ContactMessage,HomePageDescription
 )
 
 # main/views.py - Update home function
@@ -18,69 +25,80 @@ from .models import (
 from datetime import datetime, timedelta
 
 
+def get_home_content():
+    # Get home page description
+    home_content = HomePageDescription.objects.first()
+    if not home_content:
+        home_content = HomePageDescription.objects.create()
+    return home_content
+
+
+@conditional_page('home')
 def home(request):
-    try:
-        # Get active header image
-        header_image = HeaderImage.objects.filter(is_active=True).first()
-        
-        # Get home page description
-        home_content = HomePageDescription.objects.first()
-        if not home_content:
-            home_content = HomePageDescription.objects.create()
-        
-        # Get featured testimonials
-        testimonials = Testimonial.objects.filter(is_featured=True)[:3]
-        
-        # Get gallery images for photos section
-        room_gallery = RoomGallery.objects.filter(is_active=True)[:7]
-        
-        # Get events
-        events = Event.objects.filter(is_active=True)[:3]
-        
-        # Get restaurant menu items by category
-        mains = RestaurantMenuItem.objects.filter(category='mains', is_available=True)
-        desserts = RestaurantMenuItem.objects.filter(category='desserts', is_available=True)
-        drinks = RestaurantMenuItem.objects.filter(category='drinks', is_available=True)
-        
-    except OperationalError:
-        header_image = None
-        home_content = None
-        testimonials = Testimonial.objects.none()
-        room_gallery = RoomGallery.objects.none()
-        events = Event.objects.none()
-        mains = RestaurantMenuItem.objects.none()
-        desserts = RestaurantMenuItem.objects.none()
-        drinks = RestaurantMenuItem.objects.none()
-    
+    # Only queried if one of the sections below misses
+    home_content = SimpleLazyObject(get_home_content)
+
+    # Each section is cached separately and only queried on a miss
+    # (see main/fragments.py for which models invalidate which section)
+    sections, hits, misses = render_fragments('home', {
+        'meta': ('main/sections/home/meta.html', lambda: {
+            'home_content': home_content,
+        }),
+        'welcome': ('main/sections/home/welcome.html', lambda: {
+            'home_content': home_content,
+        }),
+        'photos': ('main/sections/home/photos.html', lambda: {
+            'home_content': home_content,
+            # Get gallery images for photos section
+            'room_gallery': RoomGallery.objects.filter(is_active=True)[:7],
+        }),
+        'menu': ('main/sections/home/menu.html', lambda: {
+            'home_content': home_content,
+            # Items by category, already split into the two columns
+            'menu': site_menu.get_menu().categories,
+        }),
+        'testimonials': ('main/sections/home/testimonials.html', lambda: {
+            'home_content': home_content,
+            # Get featured testimonials
+            'testimonials': Testimonial.objects.filter(is_featured=True)[:3],
+        }),
+        'events': ('main/sections/home/events.html', lambda: {
+            'home_content': home_content,
+            # Get events
+            'events': Event.objects.filter(is_active=True)[:3],
+        }),
+    })
+
     # Add dates for booking form
     today = datetime.now().date()
     tomorrow = today + timedelta(days=1)
-    
+
     context = {
-        'header_image': header_image,
-        'home_content': home_content,
-        'testimonials': testimonials,
-        'room_gallery': room_gallery,
-        'events': events,
-        'mains': mains,
-        'desserts': desserts,
-        'drinks': drinks,
+        'sections': sections,
+        # Today's banner, from memory; not a cached section as it rotates daily
+        'header_image': banners.hero('home'),
         'today': today.isoformat(),
         'tomorrow': tomorrow.isoformat(),
     }
 
-    return render(request, 'main/index.html', context)
+    response = render(request, 'main/index.html', context)
+    response['X-Fragment-Cache'] = f'hits={hits}, misses={misses}'
+    return response
 
 # main/views.py - Update the rooms function
 
+@conditional_page('rooms')
 def rooms(request):
     try:
         # Get active room header image
-        room_header = RoomHeaderImage.objects.filter(is_active=True).first()
+        room_header = banners.hero('rooms')
         
         # Get all rooms and gallery images
         all_rooms = RoomType.objects.filter(is_available=True)
-        special_offers = SpecialOffer.objects.filter(is_active=True)
+        today = timezone.localdate()
+        special_offers = SpecialOffer.objects.filter(is_active=True, valid_until__gte=today).filter(
+            Q(valid_from__isnull=True) | Q(valid_from__lte=today)
+        )
         room_gallery = RoomGallery.objects.filter(is_active=True)
     except OperationalError:
         # If tables don't exist yet, use empty querysets
@@ -102,10 +120,11 @@ def blog_detail(request, slug):
 
 # main/views.py - Update the about function
 
+@conditional_page('about')
 def about(request):
     try:
         # Get active about header image
-        about_header = AboutHeaderImage.objects.filter(is_active=True).first()
+        about_header = banners.hero('about')
         
         # Get or create the about description - FIXED VERSION
         about_description = AboutDescription.objects.first()
@@ -147,32 +166,82 @@ def about(request):
     
     return render(request, 'main/about.html', context)
 
+@conditional_page('events')
 def events(request):
+    stream = request.GET.get('stream')
+    if stream not in event_archive.STREAMS:
+        stream = 'upcoming'
+    month = event_archive.parse_month(request.GET.get('month'))
+    after, before = request.GET.get('after'), request.GET.get('before')
+
     try:
         # Get active events header image
-        events_header = EventsHeaderImage.objects.filter(is_active=True).first()
-        
-        # Get all active events, ordered by date (newest first)
-        events_list = Event.objects.filter(is_active=True).order_by('-event_date')
-        
-    except Exception as e:
-        # Fallback if there's any error
+        events_header = banners.hero('events')
+
+        # One page of the month archive or of the upcoming/past stream
+        if month:
+            events_page = event_archive.month_page(month, after, before)
+        else:
+            events_page = event_archive.stream_page(stream, after, before)
+        archive_months = list(event_archive.archive_months())
+
+    except OperationalError:
+        # Fallback if the tables don't exist yet
         events_header = None
-        events_list = Event.objects.none()
-    
+        events_page = event_archive.KeysetPage([])
+        archive_months = []
+
     context = {
         'events_header': events_header,
-        'events': events_list,
+        'events': events_page,
+        'stream': stream,
+        'month': month,
+        'archive_months': archive_months,
     }
     return render(request, 'main/events.html', context)
 
+
+def events_ics(request):
+    calendar = event_archive.ics_calendar(event_archive.ics_events(), request.get_host())
+    response = HttpResponse(calendar, content_type='text/calendar; charset=utf-8')
+    response['Content-Disposition'] = 'inline; filename="cinnamon-chalet-events.ics"'
+    return response
+
+@require_safe
+def menu_json(request):
+    """The menu for the lobby's restaurant screens, with an ETag so polling is cheap."""
+    return site_menu.json_response(request, site_menu.get_menu())
+
+
+@require_safe
+def resized_image(request, spec, path):
+    return resize.response(request, spec, path)
+
+
+def search(request):
+    query = request.GET.get('q', '').strip()
+    try:
+        results = site_search.search(query) if query else []
+    except OperationalError:
+        results = []
+    return render(request, 'main/search.html', {'query': query, 'results': results})
+
+
+def search_suggest(request):
+    try:
+        suggestions = site_search.suggest(request.GET.get('q', ''))
+    except OperationalError:
+        suggestions = []
+    return JsonResponse({'suggestions': suggestions})
+
 # main/views.py - Update the contact function
 # main/views.py - Update the contact function
 # main/views.py - Update the contact function
+@rate_limited_posts
 def contact(request):
     try:
         # Get active contact header image
-        contact_header = ContactHeaderImage.objects.filter(is_active=True).first()
+        contact_header = banners.hero('contact')
     except:
         contact_header = None
         
@@ -182,41 +251,10 @@ def contact(request):
     if request.method == 'POST':
         form = ContactForm(request.POST)
         if form.is_valid():
-            # Save the message to database
-            contact_message = form.save()
-            
-            # Send email notification to admin
-            try:
-                subject = f'New Contact Message from {contact_message.name} - Cinnamon Chalet'
-                message = f'''
-New contact form submission:
-
-Name: {contact_message.name}
-Email: {contact_message.email}
-Phone: {contact_message.phone or 'Not provided'}
-
-Message:
-{contact_message.message}
-
-Submitted: {contact_message.created_at.strftime("%Y-%m-%d %H:%M")}
-
----
-This message was sent from the Cinnamon Chalet contact form.
-                '''
-                
-                # Send to admin email
-                send_mail(
-                    subject,
-                    message,
-                    settings.DEFAULT_FROM_EMAIL,
-                    [settings.DEFAULT_FROM_EMAIL],
-                    fail_silently=False,
-                )
-                
-                messages.success(request, 'Thank you for your message! We will get back to you soon.')
-                
-            except Exception as e:
-                messages.success(request, 'Thank you for your message! We will get back to you soon.')
+            # Save the message to database; the admin email goes out from
+            # the outbox (manage.py send_contact_notifications), not this request
+            form.save()
+            messages.success(request, 'Thank you for your message! We will get back to you soon.')
             
             return redirect('contact')
     else:
@@ -231,7 +269,43 @@ This message was sent from the Cinnamon Chalet contact form.
     return render(request, 'main/contact.html', context)
 
 def reservation(request):
-    return render(request, 'main/reservation.html')
+    if request.method == 'POST':
+        booking_form = ReservationForm(request.POST)
+        if booking_form.is_valid():
+            data = booking_form.cleaned_data
+            try:
+                booked = inventory.book(
+                    data['room_type'], data['check_in'], data['check_out'],
+                    adults=data['adults'], children=data['children'],
+                    name=data['name'], email=data['email'], phone=data['phone'],
+                )
+            except ValidationError as e:
+                messages.error(request, e.messages[0])
+            else:
+                messages.success(request, f'Thank you! Your {booked.room_type.name} is reserved from {booked.check_in} to {booked.check_out}.')
+                return redirect('reservation')
+        # Show the same search again with the booking errors
+        search_form = AvailabilityForm(request.POST)
+    else:
+        booking_form = ReservationForm()
+        search_form = AvailabilityForm(request.GET or None)
+
+    results = None
+    if search_form.is_valid():
+        data = search_form.cleaned_data
+        results = inventory.search(data['check_in'], data['check_out'])
+
+    today = timezone.localdate()
+    context = {
+        'search_form': search_form,
+        'booking_form': booking_form,
+        'results': results,
+        'adults': str(search_form['adults'].value() or 2),
+        'children': str(search_form['children'].value() or 0),
+        'today': today.isoformat(),
+        'tomorrow': (today + timedelta(days=1)).isoformat(),
+    }
+    return render(request, 'main/reservation.html', context)
 
 
 
@@ -0,0 +1,44 @@
+# main/warmup.py
+"""
+Compile every template of this app once when a worker starts.
+
+The cached template loader (settings.TEMPLATES) keeps compiled templates
+per process, so without this the first request for each page in every
+fresh gunicorn/uvicorn worker pays for reading and parsing its templates.
+Called from hotel_site/wsgi.py and asgi.py after Django is set up.
+"""
+import logging
+from pathlib import Path
+from time import perf_counter
+
+from django.template import TemplateDoesNotExist, TemplateSyntaxError, engines
+from django.template.loader import get_template
+
+logger = logging.getLogger(__name__)
+
+TEMPLATE_DIR = Path(__file__).resolve().parent / 'templates'
+
+
+def template_names():
+    return sorted(path.relative_to(TEMPLATE_DIR).as_posix() for path in TEMPLATE_DIR.rglob('*.html'))
+
+
+def reset():
+    """Empty the cached loaders, as a fresh worker has them."""
+    for engine in engines.all():
+        for loader in engine.engine.template_loaders:
+            if hasattr(loader, 'reset'):
+                loader.reset()
+
+
+def warm_up():
+    started = perf_counter()
+    names = template_names()
+    for name in names:
+        try:
+            get_template(name)
+        except (TemplateDoesNotExist, TemplateSyntaxError):
+            # Leave the error to the request that renders it
+            logger.exception('Could not compile template %s', name)
+    logger.info('Compiled %d templates in %.1f ms', len(names), (perf_counter() - started) * 1000)
+    return len(names)